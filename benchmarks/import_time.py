@@ -0,0 +1,48 @@
+"""
+Measure how long importing the client takes, and which optional stacks it pulls in.
+
+Every sample imports `tusclient.client` in a fresh interpreter. Sync-only users should
+not pay for `aiohttp`, `asyncio`, `requests`, `ssl` or `tinydb`, which are imported
+when the code needing them is first used.
+
+    python benchmarks/import_time.py [--runs 20] [--module tusclient.client]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+OPTIONAL_MODULES = ("aiohttp", "asyncio", "requests", "urllib3", "httpx", "ssl", "tinydb")
+
+SAMPLE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {optional!r} if m in sys.modules))
+"""
+
+
+def sample(module: str):
+    code = SAMPLE.format(module=module, optional=OPTIONAL_MODULES)
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    elapsed, loaded = output.split(" ")
+    return float(elapsed), loaded.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--module", default="tusclient.client")
+    args = parser.parse_args()
+
+    samples = [sample(args.module) for _ in range(args.runs)]
+    times = [elapsed for elapsed, _ in samples]
+    print("import {}: median {:.1f} ms, min {:.1f} ms".format(
+        args.module, statistics.median(times) * 1e3, min(times) * 1e3
+    ))
+    print("optional modules imported: {}".format(samples[0][1] or "none"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compare the per-request overhead of the available transports.
+
+Uploads a file in many small chunks to a local tus server (see
+`tusclient.testing.TusServer`) with every transport and prints the mean time per
+PATCH request. The server's own processing time is included in every number, so
+the differences between transports are what matters.
+
+    python benchmarks/transport_overhead.py [--requests 2000] [--chunk-size 1024]
+"""
+import argparse
+import asyncio
+import io
+import time
+
+from tusclient import client
+from tusclient.testing import TusServer
+from tusclient.transport.aiohttptransport import AiohttpTransport
+from tusclient.transport.requeststransport import RequestsTransport
+from tusclient.transport.sendfiletransport import SendfileTransport
+from tusclient.transport.urllib3transport import Urllib3Transport
+from tusclient.transport import httpxtransport
+
+
+def sync_transports():
+    yield "requests", RequestsTransport()
+    yield "urllib3", Urllib3Transport()
+    yield "sendfile", SendfileTransport()
+    if httpxtransport.httpx is not None:
+        yield "httpx", httpxtransport.HttpxTransport(http2=False)
+
+
+def async_transports():
+    yield "aiohttp", AiohttpTransport()
+    if httpxtransport.httpx is not None:
+        yield "httpx (async)", httpxtransport.AsyncHttpxTransport(http2=False)
+
+
+def report(name, elapsed, requests):
+    print("{:<16} {:>10.1f} us/request".format(name, elapsed / requests * 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    args = parser.parse_args()
+    content = b"x" * args.requests * args.chunk_size
+
+    with TusServer() as server:
+        for name, transport in sync_transports():
+            tus_client = client.TusClient(server.url, transport=transport)
+            uploader = tus_client.uploader(
+                file_stream=io.BytesIO(content), chunk_size=args.chunk_size
+            )
+            uploader.set_url(uploader.create_url())
+            start = time.perf_counter()
+            uploader.upload()
+            report(name, time.perf_counter() - start, args.requests)
+            transport.close()
+
+        for name, transport in async_transports():
+            tus_client = client.TusClient(server.url, async_transport=transport)
+            uploader = tus_client.async_uploader(
+                file_stream=io.BytesIO(content), chunk_size=args.chunk_size
+            )
+
+            async def upload():
+                uploader.set_url(await uploader.create_url())
+                start = time.perf_counter()
+                await uploader.upload()
+                return time.perf_counter() - start
+
+            report(name, asyncio.run(upload()), args.requests)
+
+
+if __name__ == "__main__":
+    main()
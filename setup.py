@@ -9,7 +9,7 @@ setup(
     license='MIT',
     author='Ifedapo Olarewaju',
     install_requires=[
-        'requests>=2.18.4',
+        'requests>=2.32.0',
         'tinydb>=3.5.0',
         'aiohttp>=3.6.2'
     ],
@@ -22,6 +22,9 @@ setup(
             'pytest-cov>=2.3.1,<2.6',
             'parametrize>=0.1.1'
         ],
+        'http2': [
+            'httpx[http2]>=0.23.0'
+        ],
         'dev': [
             'tox>=2.3.1',
             'sphinx-autobuild==2021.3.14',
@@ -32,8 +35,17 @@ setup(
     description='A Python client for the tus resumable upload protocol ->  http://tus.io',
     long_description=open('README.md', encoding='utf-8').read(),
     long_description_content_type='text/markdown',
-    packages=['tusclient', 'tusclient.fingerprint', 'tusclient.storage', 'tusclient.uploader'],
+    packages=[
+        'tusclient',
+        'tusclient.fingerprint',
+        'tusclient.storage',
+        'tusclient.transport',
+        'tusclient.uploader',
+    ],
     include_package_data=True,
+    entry_points={
+        'console_scripts': ['tuspy = tusclient.cli:main'],
+    },
     platforms='any',
     classifiers=[
         'Programming Language :: Python',
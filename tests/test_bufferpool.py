@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import io
+import threading
+import unittest
+
+from parametrize import parametrize
+import pytest
+
+from tusclient import client
+from tusclient.bufferpool import BufferPool, read_into
+from tusclient.exceptions import TusUploadCancelled
+from tusclient.limiter import BandwidthLimiter
+from tusclient.testing import TusServer
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+
+
+class BufferPoolTest(unittest.TestCase):
+    def test_reuse(self):
+        pool = BufferPool(max_memory=100)
+        buffer = pool.acquire(40)
+        self.assertEqual(len(buffer), 40)
+        self.assertEqual(pool.in_use, 40)
+        pool.release(buffer)
+        self.assertEqual(pool.in_use, 0)
+        self.assertIs(pool.acquire(40), buffer)
+
+    def test_cap(self):
+        pool = BufferPool(max_memory=100)
+        buffers = [pool.acquire(40), pool.acquire(40)]
+        self.assertIsNone(pool.acquire(40, timeout=0.01))
+
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(40)))
+        waiter.start()
+        waiter.join(0.05)
+        self.assertEqual(acquired, [])
+        pool.release(buffers[0])
+        waiter.join()
+        self.assertIs(acquired[0], buffers[0])
+
+    def test_oversized_buffer(self):
+        pool = BufferPool(max_memory=100)
+        buffer = pool.acquire(150)
+        self.assertEqual(len(buffer), 150)
+        self.assertIsNone(pool.acquire(10, timeout=0))
+        pool.release(buffer)
+        # Oversized buffers are not kept.
+        self.assertIsNot(pool.acquire(150), buffer)
+
+    def test_eviction(self):
+        pool = BufferPool(max_memory=100)
+        small = [pool.acquire(30) for _ in range(3)]
+        for buffer in small:
+            pool.release(buffer)
+        large = pool.acquire(60)
+        self.assertEqual(len(large), 60)
+        self.assertLessEqual(pool._free_bytes + pool.in_use, 100)
+
+    def test_invalid_cap(self):
+        with pytest.raises(ValueError):
+            BufferPool(max_memory=0)
+
+    @parametrize(
+        "make_stream",
+        [io.BytesIO, lambda content: io.BufferedReader(io.BytesIO(content), 64)],
+    )
+    def test_read_into(self, make_stream):
+        content = bytes(range(200))
+        stream = make_stream(content)
+        buffer = memoryview(bytearray(150))
+        self.assertEqual(read_into(stream, buffer), 150)
+        self.assertEqual(buffer.tobytes(), content[:150])
+        self.assertEqual(read_into(stream, buffer), 50)
+        self.assertEqual(buffer[:50].tobytes(), content[150:])
+
+    def test_read_into_without_readinto(self):
+        class Stream:
+            def __init__(self):
+                self.blocks = [b"abc", b"de", b""]
+
+            def read(self, size):
+                return self.blocks.pop(0)
+
+        buffer = memoryview(bytearray(10))
+        self.assertEqual(read_into(Stream(), buffer), 5)
+        self.assertEqual(buffer[:5].tobytes(), b"abcde")
+
+
+class BufferPoolUploadTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.pool = BufferPool(max_memory=3 * 4096)
+        self.client = client.TusClient(self.server.url, buffer_pool=self.pool)
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.server.stop()
+
+    @parametrize("read_ahead", [0, 2])
+    def test_upload(self, read_ahead):
+        self.server.inject("reset", after_bytes=1000)
+        self.server.inject("error", count=2)
+        uploader = self.client.uploader(
+            FILEPATH_BINARY,
+            chunk_size=4096,
+            read_ahead=read_ahead,
+            retries=3,
+            retry_delay=0,
+            upload_checksum=True,
+            digest_algorithm="sha256",
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(uploader.digest, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(self.pool.in_use, 0)
+
+    def test_concurrent_uploads(self):
+        self.client.bandwidth_limiter = BandwidthLimiter(rate=None)
+        uploaders = [
+            self.client.uploader(file_stream=io.BytesIO(self.content), chunk_size=4096)
+            for _ in range(6)
+        ]
+        with self.client.scheduler(max_workers=6, policy="wfq") as scheduler:
+            for uploader in uploaders:
+                scheduler.submit(uploader)
+        for uploader in uploaders:
+            self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(self.pool.in_use, 0)
+
+    def test_async_upload(self):
+        uploaders = [
+            self.client.async_uploader(FILEPATH_BINARY, chunk_size=4096, read_ahead=1)
+            for _ in range(4)
+        ]
+
+        async def upload_all():
+            await asyncio.gather(*(uploader.upload() for uploader in uploaders))
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(upload_all())
+        loop.close()
+        for uploader in uploaders:
+            self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(self.pool.in_use, 0)
+
+    def test_cancel_while_waiting_for_buffer(self):
+        buffers = [self.pool.acquire(4096) for _ in range(3)]
+        uploader = self.client.uploader(FILEPATH_BINARY, chunk_size=4096)
+        timer = threading.Timer(0.3, uploader.cancel)
+        timer.start()
+        try:
+            with pytest.raises(TusUploadCancelled):
+                uploader.upload()
+        finally:
+            timer.cancel()
+            for buffer in buffers:
+                self.pool.release(buffer)
+        self.assertEqual(self.pool.in_use, 0)
+
+    def test_chunk_larger_than_pool(self):
+        uploader = self.client.uploader(FILEPATH_BINARY)
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(self.pool.in_use, 0)
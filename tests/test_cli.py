@@ -0,0 +1,117 @@
+import contextlib
+import hashlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from parametrize import parametrize
+import pytest
+
+from tusclient import cli
+from tusclient.testing import TusServer
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.files = {}
+        for name, size in [("a.bin", 10000), ("b.txt", 0), ("sub/c.bin", 70000), ("sub/d.log", 5)]:
+            path = os.path.join(self.root, "data", name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            content = os.urandom(size)
+            with open(path, "wb") as stream:
+                stream.write(content)
+            self.files[path] = content
+        self.summary_path = os.path.join(self.root, "summary.json")
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def run_cli(self, *args):
+        status = cli.main(
+            [self.server.url, *args, "--summary", self.summary_path, "--retry-delay", "0"]
+        )
+        with open(self.summary_path) as stream:
+            return status, json.load(stream)
+
+    def assert_uploaded(self, summary):
+        for result in summary["files"]:
+            self.assertEqual(
+                self.server.get_upload_data(result["url"]), self.files[result["path"]]
+            )
+
+    @parametrize("transport", ["sendfile", "requests"])
+    def test_directory(self, transport):
+        self.server.inject("reset", after_bytes=100)
+        status, summary = self.run_cli(
+            os.path.join(self.root, "data"), "-j", "3", "-c", "16K", "--transport", transport
+        )
+        self.assertEqual(status, 0)
+        self.assertEqual(summary["uploaded"], 4)
+        self.assertEqual(summary["bytes_sent"], sum(map(len, self.files.values())))
+        self.assertEqual(
+            [result["path"] for result in summary["files"]], sorted(self.files)
+        )
+        self.assert_uploaded(summary)
+
+    def test_glob_and_digest(self):
+        status, summary = self.run_cli(
+            os.path.join(self.root, "data", "**", "*.bin"), "--digest", "sha256", "--checksum"
+        )
+        self.assertEqual(status, 0)
+        self.assertEqual(len(summary["files"]), 2)
+        for result in summary["files"]:
+            self.assertTrue(result["path"].endswith(".bin"))
+            self.assertEqual(
+                result["digest"], hashlib.sha256(self.files[result["path"]]).hexdigest()
+            )
+        self.assert_uploaded(summary)
+
+    @parametrize("name,header", [("storage.db", b"SQLite format 3"), ("storage.json", b"{")])
+    def test_resume_with_storage(self, name, header):
+        storage = os.path.join(self.root, name)
+        data = os.path.join(self.root, "data")
+        status, summary = self.run_cli(data, "--storage", storage)
+        self.assertEqual(summary["uploaded"], 4)
+
+        requests = len(self.server.records)
+        status, summary = self.run_cli(data, "--storage", storage)
+        self.assertEqual(status, 0)
+        self.assertEqual(summary["skipped"], 4)
+        self.assertEqual(summary["bytes_sent"], 0)
+        self.assertEqual(len(self.server.records), requests)
+        with open(storage, "rb") as stream:
+            self.assertEqual(stream.read(len(header)), header)
+
+    def test_failure(self):
+        self.server.inject("error", count=100)
+        status, summary = self.run_cli(
+            os.path.join(self.root, "data", "a.bin"), "--retries", "1"
+        )
+        self.assertEqual(status, 1)
+        self.assertEqual(summary["failed"], 1)
+        self.assertIn("error", summary["files"][0])
+
+    def test_progress(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status, _ = self.run_cli(os.path.join(self.root, "data"), "--progress")
+        self.assertEqual(status, 0)
+        self.assertIn("4/4 files", stderr.getvalue())
+
+    def test_invalid_arguments(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            with pytest.raises(SystemExit) as error:
+                cli.main([self.server.url, os.path.join(self.root, "missing")])
+        self.assertEqual(error.value.code, 2)
+
+    def test_parse_size(self):
+        self.assertEqual(cli.parse_size("512"), 512)
+        self.assertEqual(cli.parse_size("64K"), 64 * 1024)
+        self.assertEqual(cli.parse_size("8MiB"), 8 * 1024 * 1024)
+        self.assertEqual(cli.parse_size("1g"), 1024 ** 3)
@@ -0,0 +1,68 @@
+import os
+import unittest
+
+from parametrize import parametrize
+import pytest
+
+from tusclient import client, exceptions
+from tusclient.concat import concatenate, split_range, upload_range
+from tusclient.testing import TusServer
+from tusclient.transport.requeststransport import RequestsTransport
+from tusclient.transport.sendfiletransport import SendfileTransport
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+
+
+class SplitRangeTest(unittest.TestCase):
+    def test_split_range(self):
+        self.assertEqual(split_range(10, 3), [(0, 3), (3, 6), (6, 10)])
+        self.assertEqual(split_range(2, 3), [(0, 0), (0, 1), (1, 2)])
+        self.assertEqual(split_range(0, 1), [(0, 0)])
+        with pytest.raises(ValueError):
+            split_range(10, 0)
+
+
+class ConcatTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.server.stop()
+
+    @parametrize("transport", [RequestsTransport, SendfileTransport])
+    def test_upload(self, transport):
+        tus_client = client.TusClient(self.server.url, transport=transport())
+        ranges = split_range(len(self.content), 3)
+        urls = [
+            upload_range(tus_client, FILEPATH_BINARY, start, end, chunk_size=1000)
+            for start, end in ranges
+        ]
+        for url, (start, end) in zip(urls, ranges):
+            self.assertEqual(self.server.get_upload_data(url), self.content[start:end])
+
+        final_url = concatenate(tus_client, urls, metadata={"filename": "binary.png"})
+        self.assertEqual(self.server.get_upload_data(final_url), self.content)
+        resp = tus_client.transport.request(
+            "HEAD", final_url, {"Tus-Resumable": "1.0.0"}
+        )
+        self.assertEqual(resp.headers["upload-concat"], "final;" + " ".join(urls))
+        tus_client.transport.close()
+
+    def test_range_clamped(self):
+        tus_client = client.TusClient(self.server.url)
+        url = upload_range(tus_client, FILEPATH_BINARY, 1000, os.path.getsize(FILEPATH_BINARY) + 50)
+        self.assertEqual(self.server.get_upload_data(url), self.content[1000:])
+
+    def test_unfinished_part(self):
+        tus_client = client.TusClient(self.server.url)
+        done = upload_range(tus_client, FILEPATH_BINARY, 0, 100)
+        uploader = tus_client.uploader(FILEPATH_BINARY, chunk_size=100, partial=True)
+        uploader.upload(stop_at=100)
+        with pytest.raises(exceptions.TusCommunicationError) as error:
+            concatenate(tus_client, [done, uploader.url])
+        self.assertEqual(error.value.status_code, 400)
+        with pytest.raises(ValueError):
+            concatenate(tus_client, [])
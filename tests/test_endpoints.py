@@ -0,0 +1,142 @@
+import asyncio
+import unittest
+
+import pytest
+
+from tusclient import client
+from tusclient.endpoints import EndpointSelector
+from tusclient.exceptions import TusCommunicationError
+from tusclient.testing import TusServer
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class EndpointSelectorTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.selector = EndpointSelector(["a", "b", "c"], clock=self.clock)
+
+    def test_untried_first(self):
+        self.assertEqual(self.selector.candidates(), ["a", "b", "c"])
+        self.selector.record("a", 0.1)
+        self.assertEqual(self.selector.candidates(), ["b", "c", "a"])
+
+    def test_latency(self):
+        for url, latency in [("a", 0.3), ("b", 0.1), ("c", 0.2)]:
+            self.selector.record(url, latency)
+        self.assertEqual(self.selector.candidates(), ["b", "c", "a"])
+        # The moving average follows the latest observations.
+        for _ in range(5):
+            self.selector.record("b", 0.5)
+        self.assertEqual(self.selector.select(), "c")
+
+    def test_error_rate(self):
+        for url in ["a", "b"]:
+            self.selector.record(url, 0.1)
+        self.selector.record("c", 0.12)
+        self.selector.record("a", success=False)
+        self.assertEqual(self.selector.candidates(), ["b", "c", "a"])
+
+    def test_ejection(self):
+        for url in ["a", "b", "c"]:
+            self.selector.record(url, 0.1)
+        self.selector.record("a", success=False)
+        self.selector.record("a", success=False)
+        self.assertEqual(self.selector.candidates()[-1], "a")
+        self.selector.record("b", success=False)
+        self.selector.record("b", success=False)
+        self.assertEqual(self.selector.candidates(), ["c", "a", "b"])
+
+        # After its ejection, an endpoint is tried again...
+        self.clock.now = 31
+        self.assertIn(self.selector.select(), ["a", "b", "c"])
+        self.assertLess(self.selector.candidates().index("a"), 3)
+        # ...and ejected again if it still fails.
+        self.selector.record("a", success=False)
+        self.assertEqual(self.selector.candidates()[-1], "a")
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            EndpointSelector([])
+        with pytest.raises(ValueError):
+            EndpointSelector(["a"], alpha=0)
+
+
+class MultiEndpointUploadTest(unittest.TestCase):
+    def setUp(self):
+        self.fast = TusServer().start()
+        self.slow = TusServer(latency=0.05).start()
+        self.client = client.TusClient([self.slow.url, self.fast.url])
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.fast.stop()
+        self.slow.stop()
+
+    def upload(self):
+        uploader = self.client.uploader(FILEPATH_BINARY, chunk_size=4096)
+        uploader.upload()
+        return uploader
+
+    def test_lowest_latency(self):
+        self.assertEqual(self.client.url, self.slow.url)
+        uploaders = [self.upload() for _ in range(5)]
+        # Both endpoints are tried once, the faster one is used afterwards.
+        self.assertTrue(uploaders[0].url.startswith(self.slow.url))
+        for uploader in uploaders[1:]:
+            self.assertTrue(uploader.url.startswith(self.fast.url))
+            self.assertEqual(self.fast.get_upload_data(uploader.url), self.content)
+
+    def test_failover(self):
+        self.slow.inject("error", count=10, method="POST", status=503)
+        uploader = self.upload()
+        self.assertTrue(uploader.url.startswith(self.fast.url))
+        self.assertEqual(self.fast.get_upload_data(uploader.url), self.content)
+
+        self.upload()
+        # The failing endpoint has been ejected, and is not asked anymore.
+        self.upload()
+        posts = [r for r in self.slow.records if r.method == "POST"]
+        self.assertEqual(len(posts), 2)
+
+    def test_all_failing(self):
+        for server in [self.slow, self.fast]:
+            server.inject("error", count=1, method="POST", status=500)
+        with pytest.raises(TusCommunicationError):
+            self.upload()
+
+    def test_pinned_upload(self):
+        # Make the slow endpoint known as the best one.
+        self.client.endpoints.record(self.slow.url, 0.001)
+        self.client.endpoints.record(self.fast.url, 1.0)
+        uploader = self.client.uploader(FILEPATH_BINARY, chunk_size=4096)
+        uploader.upload_chunk()
+        self.assertTrue(uploader.url.startswith(self.slow.url))
+
+        # Chunks keep going to the endpoint which created the upload, even once it is
+        # ejected for new uploads.
+        self.client.endpoints.record(self.slow.url, success=False)
+        self.client.endpoints.record(self.slow.url, success=False)
+        self.assertNotEqual(self.client.endpoints.select(), self.slow.url)
+        uploader.upload()
+        self.assertEqual(self.slow.get_upload_data(uploader.url), self.content)
+        self.assertEqual([r for r in self.fast.records if r.method == "PATCH"], [])
+
+    def test_async_upload(self):
+        self.slow.inject("error", count=1, method="POST", status=503)
+        uploader = self.client.async_uploader(FILEPATH_BINARY, chunk_size=4096)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(uploader.upload())
+        loop.close()
+        self.assertTrue(uploader.url.startswith(self.fast.url))
+        self.assertEqual(self.fast.get_upload_data(uploader.url), self.content)
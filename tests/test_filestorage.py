@@ -1,5 +1,6 @@
 import unittest
 import os
+from unittest import mock
 
 from tusclient.storage import filestorage
 
@@ -27,3 +28,46 @@ class FileStorageTest(unittest.TestCase):
 
         self.storage.remove_item(key)
         self.assertIsNone(self.storage.get_item(key))
+
+    def test_completed(self):
+        key = 'unique_key'
+        url = 'http://tusd.tusdemo.net/files/unique_file_id'
+        self.assertIsNone(self.storage.get_completed(key))
+
+        self.storage.set_completed(key, url, 100)
+        self.assertEqual(self.storage.get_completed(key), (url, 100, None, None))
+        self.storage.set_completed(key, url, 200, 'abcdef', 'sha256')
+        self.assertEqual(self.storage.get_completed(key), (url, 200, 'abcdef', 'sha256'))
+        self.assertEqual(self.storage.get_completed(key).size, 200)
+        # Completion records are independent from the stored urls.
+        self.assertIsNone(self.storage.get_item(key))
+
+        self.storage.remove_completed(key)
+        self.assertIsNone(self.storage.get_completed(key))
+
+    def test_completed_index(self):
+        url = 'http://tusd.tusdemo.net/files/unique_file_id'
+        for i in range(100):
+            self.storage.set_completed('key_{}'.format(i), url, i)
+        self.storage.remove_completed('key_1')
+        self.storage.set_completed('key_2', url, 1000)
+
+        # Lookups do not read the file.
+        with mock.patch.object(self.storage._db.storage, 'read', side_effect=AssertionError):
+            self.assertEqual(self.storage.get_completed('key_50'), (url, 50, None, None))
+            self.assertIsNone(self.storage.get_completed('missing'))
+
+        self.storage.close()
+        self.storage = filestorage.FileStorage(self.storage_path)
+        self.assertEqual(self.storage.get_completed('key_99').size, 99)
+        self.assertEqual(self.storage.get_completed('key_2').size, 1000)
+        self.assertIsNone(self.storage.get_completed('key_1'))
+
+    def test_offset_journal(self):
+        url = 'http://tusd.tusdemo.net/files/unique_file_id'
+        self.assertIsNone(self.storage.get_offset('key', url))
+        self.storage.set_offset('key', url, 100)
+        self.storage.set_offset('key', url, 200)
+        self.assertEqual(self.storage.get_offset('key', url), 200)
+        # The journal only applies to the upload it was written for.
+        self.assertIsNone(self.storage.get_offset('key', url + '_2'))
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+import unittest
+
+
+def imported_modules(code: str, modules):
+    """Run `code` in a fresh interpreter and return which of `modules` it imported."""
+    check = "\nimport sys\nprint(','.join(m for m in {!r} if m in sys.modules))".format(
+        tuple(modules)
+    )
+    output = subprocess.check_output([sys.executable, "-c", code + check], text=True)
+    return [m for m in output.strip().split(",") if m]
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_client(self):
+        modules = ["aiohttp", "asyncio", "requests", "urllib3", "httpx", "ssl", "tinydb"]
+        self.assertEqual(imported_modules("import tusclient.client", modules), [])
+
+    def test_sync_upload(self):
+        code = "\n".join(
+            [
+                "from tusclient import client",
+                "from tusclient.testing import TusServer",
+                "with TusServer() as server:",
+                "    uploader = client.TusClient(server.url).uploader(",
+                "        'tests/sample_files/binary.png', chunk_size=4096)",
+                "    uploader.upload()",
+            ]
+        )
+        self.assertEqual(
+            imported_modules(code, ["requests", "aiohttp", "asyncio", "tinydb"]),
+            ["requests"],
+        )
@@ -0,0 +1,242 @@
+import base64
+import os
+import tempfile
+import time
+import unittest
+
+import pytest
+
+from tusclient import client
+from tusclient.jobqueue import QueueWorkers, UploadQueue
+from tusclient.testing import TusServer
+
+
+class UploadQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.now = 1000.0
+        self.queue = UploadQueue(
+            os.path.join(self.tmp.name, "queue.db"), clock=lambda: self.now
+        )
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_visibility_timeout(self):
+        job_id = self.queue.enqueue("a", {"filename": "a.bin"})
+        self.queue.enqueue("b", delay=5)
+
+        (job,) = self.queue.receive("w1", visibility_timeout=10)
+        self.assertEqual((job.id, job.path, job.metadata), (job_id, "a", {"filename": "a.bin"}))
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(self.queue.receive("w2"), [])
+
+        self.now += 5
+        (other,) = self.queue.receive("w2", 10)
+        self.assertEqual(other.path, "b")
+        self.assertTrue(self.queue.ack(other))
+        self.now += 4
+        self.assertTrue(self.queue.extend(job, 10))
+        self.now += 9
+        self.assertEqual(self.queue.receive("w2", 10), [])
+
+        # Once its timeout expires, the job is delivered again.
+        self.now += 2
+        (again,) = self.queue.receive("w2", 10)
+        self.assertEqual((again.id, again.attempts), (job_id, 2))
+        self.assertFalse(self.queue.extend(job, 10))
+        self.assertFalse(self.queue.ack(job))
+        self.assertEqual(self.queue.count(), 1)
+        self.assertTrue(self.queue.ack(again))
+        self.assertTrue(self.queue.empty())
+
+    def test_nack_and_fail(self):
+        self.queue.enqueue("a")
+        (job,) = self.queue.receive("w", 10)
+        self.assertTrue(self.queue.nack(job, delay=3, error="boom"))
+        self.assertFalse(self.queue.nack(job))
+        self.assertEqual(self.queue.receive("w", 10), [])
+
+        self.now += 3
+        (job,) = self.queue.receive("w", 10)
+        self.assertEqual((job.attempts, job.error), (2, "boom"))
+        self.assertTrue(self.queue.fail(job, "gone"))
+        self.assertTrue(self.queue.empty())
+        self.assertEqual(self.queue.count(failed=True), 1)
+        self.assertEqual([(j.path, j.error) for j in self.queue.failed_jobs()], [("a", "gone")])
+
+        self.assertEqual(self.queue.retry_failed(), 1)
+        (job,) = self.queue.receive("w", 10)
+        self.assertEqual(job.attempts, 1)
+
+    def test_enqueue_many(self):
+        files = ("f{}".format(i) for i in range(2500))
+        self.assertEqual(self.queue.enqueue_many(files, batch_size=1000), 2500)
+        self.queue.enqueue_many([("g", {"k": "v"})])
+        self.assertEqual(self.queue.count(), 2501)
+
+        jobs = self.queue.receive("w", 10, limit=3)
+        self.assertEqual([j.path for j in jobs], ["f0", "f1", "f2"])
+        for job in self.queue.receive("w", 10, limit=3000):
+            self.queue.fail(job)
+        failed = list(self.queue.failed_jobs(batch_size=100))
+        self.assertEqual(len(failed), 2498)
+        self.assertEqual(failed[-1].metadata, {"k": "v"})
+
+        with pytest.raises(ValueError):
+            self.queue.enqueue_many([], batch_size=0)
+
+    def test_purge(self):
+        self.queue.enqueue("a")
+        self.queue.enqueue("b")
+        failed, pending = self.queue.receive("w", 10, limit=2)
+        self.queue.fail(failed)
+        self.queue.set_completed("done", "http://example.com/files/done", 5)
+        self.queue.set_item("claimed", "http://example.com/files/claimed")
+        self.assertTrue(self.queue.claim("claimed", "w", 100))
+        self.now += 50
+        self.queue.set_offset("recent", "http://example.com/files/recent", 10)
+        self.assertEqual(self.queue.purge(older_than=60), (0, 0))
+
+        self.now += 11
+        self.assertEqual(self.queue.purge(older_than=60), (1, 1))
+        self.assertEqual(self.queue.count(failed=True), 0)
+        self.assertIsNone(self.queue.get_completed("done"))
+        self.assertEqual(self.queue.get_item("claimed"), "http://example.com/files/claimed")
+        self.assertEqual(
+            self.queue.get_offset("recent", "http://example.com/files/recent"), 10
+        )
+        # Pending jobs are kept whatever their age.
+        self.assertTrue(self.queue.ack(pending))
+
+        with pytest.raises(ValueError):
+            self.queue.purge(older_than=-1)
+
+    def test_reopen(self):
+        self.queue.enqueue("a", {"k": "v"})
+        self.queue.set_item("key", "http://example.com/files/a")
+        self.queue.close()
+        self.queue = UploadQueue(os.path.join(self.tmp.name, "queue.db"))
+        self.assertEqual([j.metadata for j in self.queue.receive("w")], [{"k": "v"}])
+        self.assertEqual(self.queue.get_item("key"), "http://example.com/files/a")
+
+
+class QueueWorkersTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "queue.db")
+        self.queue = UploadQueue(self.db_path)
+        self.paths = []
+        for i, size in enumerate([10000, 0, 30000, 5, 20000, 100]):
+            path = os.path.join(self.tmp.name, "file{}".format(i))
+            with open(path, "wb") as stream:
+                stream.write(os.urandom(size))
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.queue.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def drain(self, **kwargs):
+        workers = QueueWorkers(
+            self.client, self.queue, workers=3, exit_when_empty=True, poll_interval=0.05,
+            chunk_size=4096, retry_delay=0, **kwargs
+        )
+        workers.start()
+        self.assertTrue(workers.join(timeout=30))
+        return workers
+
+    def assert_uploaded(self, url, path):
+        with open(path, "rb") as stream:
+            self.assertEqual(self.server.get_upload_data(url), stream.read())
+
+    def test_drain(self):
+        self.queue.enqueue_many(
+            (path, {"filename": os.path.basename(path)}) for path in self.paths
+        )
+        urls = {}
+        workers = self.drain(on_uploaded=lambda job, url: urls.update({job.path: url}))
+
+        self.assertEqual(workers.uploaded, len(self.paths))
+        self.assertTrue(self.queue.empty())
+        self.assertEqual(len(self.server.uploads), len(self.paths))
+        for path in self.paths:
+            self.assert_uploaded(urls[path], path)
+            upload = self.server.uploads[urls[path].rsplit("/", 1)[-1]]
+            filename = base64.b64encode(os.path.basename(path).encode()).decode()
+            self.assertEqual(upload.metadata, "filename " + filename)
+
+        # Files enqueued again are found uploaded.
+        self.queue.enqueue_many(self.paths)
+        workers = self.drain()
+        self.assertEqual((workers.uploaded, workers.skipped), (0, len(self.paths)))
+        self.assertEqual(len(self.server.uploads), len(self.paths))
+
+    def test_duplicate_jobs(self):
+        self.server.latency = 0.05
+        path = self.paths[2]
+        self.queue.enqueue_many([path] * 3)
+        urls = []
+        workers = self.drain(on_uploaded=lambda job, url: urls.append(url))
+
+        # The file was uploaded by one of the jobs, and found uploaded by the others.
+        self.assertEqual((workers.uploaded, workers.skipped), (1, 2))
+        self.assertEqual(len(self.server.uploads), 1)
+        self.assertEqual(len(set(urls)), 1)
+        self.assert_uploaded(urls[0], path)
+
+        # Once purged, the file is uploaded again.
+        self.assertEqual(self.queue.purge(older_than=0), (0, 1))
+        self.queue.enqueue(path)
+        self.assertEqual(self.drain().uploaded, 1)
+        self.assertEqual(len(self.server.uploads), 2)
+
+    def test_resume_crashed_worker(self):
+        now = [1000.0]
+        self.queue.close()
+        self.queue = UploadQueue(self.db_path, clock=lambda: now[0])
+        path = self.paths[2]
+        self.queue.enqueue(path)
+        # A worker received the job and sent part of the file before it crashed.
+        (job,) = self.queue.receive("crashed", visibility_timeout=60)
+        uploader = self.client.uploader(
+            path, chunk_size=4096, store_url=True, url_storage=self.queue
+        )
+        uploader.upload(stop_at=8192)
+
+        self.assertEqual(self.queue.receive("w"), [])
+
+        now[0] += 61
+        workers = self.drain()
+        self.assertEqual(workers.uploaded, 1)
+        self.assertTrue(self.queue.empty())
+        # The upload was resumed rather than started over.
+        self.assertEqual(len(self.server.uploads), 1)
+        self.assert_uploaded(uploader.url, path)
+
+    def test_failed_jobs(self):
+        self.queue.enqueue(os.path.join(self.tmp.name, "missing"))
+        self.queue.enqueue(self.paths[0])
+        workers = self.drain(max_attempts=2, backoff=0)
+
+        self.assertEqual((workers.uploaded, workers.failed), (1, 1))
+        (job,) = self.queue.failed_jobs()
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("missing", job.error)
+
+    def test_stop_cancel(self):
+        self.server.latency = 0.2
+        self.queue.enqueue(self.paths[2])
+        workers = QueueWorkers(self.client, self.queue, workers=1, chunk_size=1000)
+        with workers:
+            while not any(r.method == "PATCH" for r in self.server.records):
+                time.sleep(0.01)
+            workers.stop(cancel=True)
+        self.assertEqual(workers.uploaded, 0)
+        # The job was given back, to be resumed.
+        (job,) = self.queue.receive("w")
+        self.assertEqual(job.attempts, 2)
@@ -0,0 +1,123 @@
+import asyncio
+import io
+import threading
+import time
+import unittest
+
+import pytest
+
+from tusclient import client
+from tusclient.limiter import BandwidthLimiter
+from tusclient.request import ThrottledBody
+from tusclient.testing import TusServer
+
+
+class BandwidthLimiterTest(unittest.TestCase):
+    def test_burst_passes_without_delay(self):
+        limiter = BandwidthLimiter(rate=1000, burst=500)
+        start = time.monotonic()
+        limiter.consume(500)
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    def test_rate(self):
+        limiter = BandwidthLimiter(rate=10000, burst=1000)
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.consume(1000)
+        # The first block is covered by the burst.
+        self.assertGreaterEqual(time.monotonic() - start, 0.4 - 0.01)
+
+    def test_unlimited(self):
+        limiter = BandwidthLimiter(rate=None)
+        start = time.monotonic()
+        limiter.consume(10**12)
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    def test_set_rate(self):
+        limiter = BandwidthLimiter(rate=100, burst=100)
+        limiter.consume(100)
+        limiter.set_rate(100000, burst=1000)
+        start = time.monotonic()
+        limiter.consume(1000)
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertEqual(limiter.rate, 100000)
+        self.assertEqual(limiter.burst, 1000)
+
+        with pytest.raises(ValueError):
+            limiter.set_rate(0)
+
+    def test_shared_between_threads(self):
+        limiter = BandwidthLimiter(rate=20000, burst=1000)
+
+        def consume():
+            for _ in range(5):
+                limiter.consume(1000)
+
+        threads = [threading.Thread(target=consume) for _ in range(2)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.45 - 0.01)
+
+    def test_consume_async(self):
+        limiter = BandwidthLimiter(rate=10000, burst=1000)
+
+        async def consume():
+            await asyncio.gather(*(limiter.consume_async(1000) for _ in range(4)))
+
+        loop = asyncio.new_event_loop()
+        start = time.monotonic()
+        loop.run_until_complete(consume())
+        loop.close()
+        self.assertGreaterEqual(time.monotonic() - start, 0.3 - 0.01)
+
+    def test_throttled_body(self):
+        limiter = BandwidthLimiter(rate=None)
+        chunk = b"x" * 100000
+        body = ThrottledBody(chunk, limiter)
+        self.assertEqual(len(body), 100000)
+        blocks = list(iter(lambda: body.read(40000), b""))
+        self.assertEqual([len(block) for block in blocks], [40000, 40000, 20000])
+        # The blocks are views of the chunk rather than copies.
+        self.assertTrue(all(block.obj is chunk for block in blocks))
+
+
+class ThrottledUploadTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.limiter = BandwidthLimiter(rate=200 * 1024, burst=16 * 1024)
+        self.client = client.TusClient(self.server.url, bandwidth_limiter=self.limiter)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_upload(self):
+        content = b"x" * 32 * 1024
+        start = time.monotonic()
+        uploaders = [
+            self.client.uploader(file_stream=io.BytesIO(content), chunk_size=16 * 1024)
+            for _ in range(2)
+        ]
+        threads = [threading.Thread(target=u.upload) for u in uploaders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 64 KiB at 200 KiB/s, minus the initial burst.
+        self.assertGreaterEqual(time.monotonic() - start, 0.24 - 0.01)
+        for uploader in uploaders:
+            self.assertEqual(self.server.get_upload_data(uploader.url), content)
+
+    def test_async_upload(self):
+        content = b"x" * 64 * 1024
+        uploader = self.client.async_uploader(file_stream=io.BytesIO(content))
+        loop = asyncio.new_event_loop()
+        start = time.monotonic()
+        loop.run_until_complete(uploader.upload())
+        loop.close()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.24 - 0.01)
+        self.assertEqual(self.server.get_upload_data(uploader.url), content)
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import io
+import unittest
+from base64 import b64encode
+from unittest import mock
+
+import pytest
+
+from tusclient import client
+from tusclient.testing import TusServer
+from tusclient.uploader.prefetch import ChunkPrefetcher
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+
+
+class ChunkPrefetcherTest(unittest.TestCase):
+    def setUp(self):
+        self.content = bytes(range(256)) * 40
+        self.uploader = mock.Mock(
+            file_stream=None,
+            chunk_size=1000,
+            stop_at=len(self.content),
+            upload_checksum=False,
+            buffer_pool=None,
+        )
+        self.uploader.get_file_stream.side_effect = lambda: io.BytesIO(self.content)
+        self.prefetcher = ChunkPrefetcher(self.uploader, 2)
+
+    def tearDown(self):
+        self.prefetcher.close()
+
+    def test_sequential(self):
+        offset = 0
+        while offset < len(self.content):
+            length = min(1000, len(self.content) - offset)
+            chunk = self.prefetcher.get(offset, length)
+            self.assertEqual(chunk.offset, offset)
+            self.assertEqual(chunk.data, self.content[offset : offset + length])
+            self.assertIsNone(chunk.checksum)
+            offset += length
+        # All chunks were read by the same thread.
+        self.assertEqual(self.uploader.get_file_stream.call_count, 1)
+
+    def test_same_chunk_again(self):
+        chunk = self.prefetcher.get(0, 1000)
+        self.assertIs(self.prefetcher.get(0, 1000), chunk)
+
+    def test_restart_at_other_offset(self):
+        self.prefetcher.get(0, 1000)
+        chunk = self.prefetcher.get(500, 1000)
+        self.assertEqual(chunk.data, self.content[500:1500])
+        chunk = self.prefetcher.get(1500, 1000)
+        self.assertEqual(chunk.data, self.content[1500:2500])
+        self.assertEqual(self.uploader.get_file_stream.call_count, 2)
+
+    def test_checksum(self):
+        self.uploader.upload_checksum = True
+        self.uploader.checksum_algorithm_name = "sha1"
+        self.uploader.checksum_algorithm = hashlib.sha1
+        chunk = self.prefetcher.get(0, 1000)
+        expected = "sha1 " + b64encode(hashlib.sha1(self.content[:1000]).digest()).decode()
+        self.assertEqual(chunk.checksum, expected)
+
+    def test_read_error(self):
+        self.uploader.get_file_stream.side_effect = OSError("disk on fire")
+        with pytest.raises(OSError):
+            self.prefetcher.get(0, 1000)
+
+
+class ReadAheadUploadTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_upload(self):
+        uploader = self.client.uploader(
+            FILEPATH_BINARY, chunk_size=4096, read_ahead=2, upload_checksum=True
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertIsNone(uploader._prefetcher)
+
+    def test_upload_retry(self):
+        self.server.inject("error", count=2)
+        self.server.inject("reset", after_bytes=100)
+        uploader = self.client.uploader(
+            FILEPATH_BINARY, chunk_size=4096, read_ahead=3, retries=3, retry_delay=0
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+
+    def test_upload_deferred_length(self):
+        uploader = self.client.uploader(
+            file_stream=io.BytesIO(self.content),
+            chunk_size=4096,
+            read_ahead=2,
+            upload_length_deferred=True,
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(uploader.stop_at, len(self.content))
+
+    def test_async_upload(self):
+        uploader = self.client.async_uploader(
+            FILEPATH_BINARY, chunk_size=4096, read_ahead=2, upload_checksum=True
+        )
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(uploader.upload())
+        loop.close()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
@@ -0,0 +1,107 @@
+import asyncio
+import io
+import os
+import unittest
+
+from parametrize import parametrize
+import pytest
+
+from tusclient import client, exceptions
+from tusclient.testing import TusServer
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+CHUNK_SIZE = 4096
+
+
+class RecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        self.file_size = os.path.getsize(FILEPATH_BINARY)
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def upload(self, **kwargs):
+        uploader = self.client.uploader(
+            FILEPATH_BINARY, chunk_size=CHUNK_SIZE, retry_delay=0, **kwargs
+        )
+        uploader.upload()
+        return uploader
+
+    def async_upload(self, **kwargs):
+        uploader = self.client.async_uploader(
+            FILEPATH_BINARY, chunk_size=CHUNK_SIZE, retry_delay=0, **kwargs
+        )
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(uploader.upload())
+        finally:
+            loop.close()
+        return uploader
+
+    def test_upload_without_faults(self):
+        uploader = self.upload()
+        report = self.server.report()
+
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(report.faults, 0)
+        self.assertEqual(report.time_to_recover, 0)
+        self.assertEqual(report.bytes_sent, self.file_size)
+        self.assertEqual(report.bytes_resent, 0)
+
+    @parametrize(
+        "kind,options",
+        [
+            ("error", {"status": 503}),
+            ("lock", {}),
+            ("conflict", {}),
+            ("reset", {"after_bytes": 1024}),
+        ],
+    )
+    def test_recovery(self, kind: str, options: dict):
+        self.server.inject(kind, count=2, **options)
+        uploader = self.upload(retries=2)
+        report = self.server.report()
+
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(report.faults, 2)
+        self.assertEqual(len(report.recoveries), 1)
+        self.assertGreater(report.time_to_recover, 0)
+        self.assertEqual(report.bytes_stored, self.file_size)
+        self.assertLessEqual(report.bytes_resent, 2 * CHUNK_SIZE)
+
+    def test_recovery_async(self):
+        self.server.inject("error", count=2, status=502)
+        self.server.inject("reset", after_bytes=100)
+        uploader = self.async_upload(retries=3)
+        report = self.server.report()
+
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(report.faults, 3)
+        self.assertEqual(report.bytes_resent, 2 * CHUNK_SIZE + 100)
+
+    def test_burst_exceeds_retries(self):
+        self.server.inject("error", count=3)
+        with pytest.raises(exceptions.TusCommunicationError):
+            self.upload(retries=2)
+
+    def test_latency(self):
+        self.server.latency = 0.05
+        self.upload(retries=1)
+        report = self.server.report()
+        for record in self.server.records:
+            self.assertGreaterEqual(record.end - record.start, 0.05)
+        self.assertEqual(report.faults, 0)
+
+    def test_bandwidth(self):
+        self.server.bandwidth = 256 * 1024
+        uploader = self.client.uploader(
+            file_stream=io.BytesIO(b"x" * 64 * 1024), retry_delay=0
+        )
+        uploader.upload()
+        patch = [r for r in self.server.records if r.method == "PATCH"][0]
+        self.assertGreaterEqual(patch.end - patch.start, 0.25)
@@ -0,0 +1,125 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from urllib3 import connectionpool
+
+from tusclient import client, exceptions
+from tusclient.resume import probe_stored_urls, resume_uploaders
+from tusclient.storage import filestorage
+from tusclient.testing import TusServer
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        fd, self.storage_path = tempfile.mkstemp()
+        os.close(fd)
+        self.storage = filestorage.FileStorage(self.storage_path)
+
+    def tearDown(self):
+        self.storage.close()
+        os.remove(self.storage_path)
+        self.server.stop()
+
+    def create_stored_uploads(self, count):
+        """Start `count` uploads, sending `i % 9 + 1` bytes of the i-th, and store their urls."""
+        for i in range(count):
+            uploader = self.client.uploader(
+                file_stream=io.BytesIO(b"upload %03d" % i),
+                store_url=True,
+                url_storage=self.storage,
+            )
+            uploader.upload(stop_at=i % 9 + 1)
+
+    def make_uploaders(self, count):
+        return [
+            self.client.uploader(
+                file_stream=io.BytesIO(b"upload %03d" % i),
+                store_url=True,
+                url_storage=self.storage,
+                resolve_offset=False,
+            )
+            for i in range(count)
+        ]
+
+    def test_resume_uploaders(self):
+        self.create_stored_uploads(20)
+        uploaders = self.make_uploaders(20)
+        self.assertFalse(any(r.method == "HEAD" for r in self.server.records))
+        self.assertTrue(all(uploader.offset == 0 for uploader in uploaders))
+
+        report = resume_uploaders(uploaders, max_workers=4)
+        self.assertEqual([u.offset for u in uploaders], [i % 9 + 1 for i in range(20)])
+        self.assertEqual(report.offsets, {u: u.offset for u in uploaders})
+        self.assertEqual(report.removed, [])
+        self.assertEqual(report.errors, {})
+
+        for uploader in uploaders:
+            uploader.upload()
+            self.assertEqual(
+                self.server.get_upload_data(uploader.url),
+                uploader.get_file_stream().read(),
+            )
+
+    def test_dead_urls(self):
+        self.create_stored_uploads(4)
+        uploaders = self.make_uploaders(5)
+        dead = uploaders[1]
+        del self.server.uploads[dead.url.rsplit("/", 1)[-1]]
+
+        report = resume_uploaders(uploaders)
+        self.assertEqual(report.removed, [dead])
+        self.assertIsNone(dead.url)
+        self.assertIsNone(self.storage.get_item(dead.storage_key))
+        # The last uploader has no stored url and is skipped.
+        self.assertEqual(len(report.offsets), 3)
+        dead.upload()
+        self.assertEqual(self.server.get_upload_data(dead.url), b"upload 001")
+
+    def test_errors(self):
+        uploader = self.client.uploader(
+            file_stream=io.BytesIO(b"x"), url=self.server.url + "missing", resolve_offset=False
+        )
+        self.server.stop()
+        report = resume_uploaders([uploader])
+        self.assertIsInstance(report.errors[uploader], exceptions.TusCommunicationError)
+        self.assertEqual(uploader.url, self.server.url + "missing")
+
+    def test_probe_stored_urls(self):
+        self.create_stored_uploads(6)
+        keys = [u.storage_key for u in self.make_uploaders(6)]
+        dead_key = keys[2]
+        del self.server.uploads[self.storage.get_item(dead_key).rsplit("/", 1)[-1]]
+
+        report = probe_stored_urls(self.client, self.storage, keys + ["unknown"])
+        self.assertEqual(report.offsets, {k: i + 1 for i, k in enumerate(keys) if k != dead_key})
+        self.assertEqual(report.removed, [dead_key])
+        self.assertEqual(report.errors, {})
+        self.assertIsNone(self.storage.get_item(dead_key))
+
+    def test_concurrency(self):
+        self.create_stored_uploads(16)
+        uploaders = self.make_uploaders(16)
+        self.server.latency = 0.05
+        start = time.monotonic()
+        resume_uploaders(uploaders, max_workers=16)
+        # Sequential probing would take 16 * 50 ms.
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_default_max_workers(self):
+        self.create_stored_uploads(48)
+        uploaders = self.make_uploaders(48)
+        self.server.latency = 0.02
+        new_conn = connectionpool.HTTPConnectionPool._new_conn
+        with mock.patch.object(
+            connectionpool.HTTPConnectionPool, "_new_conn", autospec=True, side_effect=new_conn
+        ) as connect:
+            report = resume_uploaders(uploaders)
+        self.assertEqual(len(report.offsets), 48)
+        # No more requests at once than the transport keeps connections for.
+        self.assertLessEqual(connect.call_count, self.client.transport.pool_maxsize)
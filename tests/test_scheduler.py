@@ -0,0 +1,169 @@
+import io
+import threading
+import unittest
+from urllib.parse import urlsplit
+
+import pytest
+
+from tusclient import client, exceptions
+from tusclient.scheduler import UploadScheduler
+from tusclient.testing import TusServer
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def uploader(self, size, chunk_size=100, **kwargs):
+        return self.client.uploader(
+            file_stream=io.BytesIO(bytes(range(256)) * (size // 256) + b"x" * (size % 256)),
+            chunk_size=chunk_size,
+            **kwargs
+        )
+
+    def patch_order(self):
+        """Return the upload ids of the PATCH requests, in the order they were received."""
+        return [r.path.rsplit("/", 1)[-1] for r in self.server.records if r.method == "PATCH"]
+
+    def completion_order(self, jobs):
+        order = self.patch_order()
+        last = {job: max(i for i, p in enumerate(order) if job.result().endswith(p)) for job in jobs}
+        return sorted(jobs, key=last.get)
+
+    def test_upload(self):
+        uploaders = [self.uploader(size) for size in (0, 1, 250, 1000)]
+        with self.client.scheduler(max_workers=3) as scheduler:
+            jobs = [scheduler.submit(uploader) for uploader in uploaders]
+        for job, uploader in zip(jobs, uploaders):
+            self.assertEqual(job.result(), uploader.url)
+            self.assertEqual(
+                self.server.get_upload_data(uploader.url), uploader.get_file_stream().read()
+            )
+
+    def test_error(self):
+        self.server.inject("error", status=500)
+        scheduler = UploadScheduler()
+        uploader = self.uploader(300)
+        finish = uploader.finish
+        unlocked = []
+
+        def probe():
+            acquired = scheduler._condition.acquire(blocking=False)
+            if acquired:
+                scheduler._condition.release()
+            unlocked.append(acquired)
+
+        def finish_unlocked():
+            # Probed from another thread, as the lock is reentrant.
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            finish()
+
+        uploader.finish = finish_unlocked
+        job = scheduler.submit(uploader)
+        with pytest.raises(exceptions.TusUploadFailed):
+            job.result(timeout=5)
+        scheduler.close()
+        # The uploader was finished once, without blocking the other workers.
+        self.assertEqual(unlocked, [True])
+
+    def test_shortest_job_first(self):
+        scheduler = UploadScheduler(max_workers=1, policy="sjf")
+        self.server.latency = 0.005
+        large = scheduler.submit(self.uploader(3000))
+        small = [scheduler.submit(self.uploader(size)) for size in (500, 200)]
+        scheduler.close()
+        self.assertEqual(self.completion_order([large] + small), small[::-1] + [large])
+
+    def test_priority_preemption(self):
+        scheduler = UploadScheduler(max_workers=1, policy="fifo")
+        started = threading.Event()
+        large_uploader = self.uploader(5000)
+        upload_chunk = large_uploader.upload_chunk
+
+        def upload_chunk_and_signal():
+            upload_chunk()
+            started.set()
+
+        large_uploader.upload_chunk = upload_chunk_and_signal
+        large = scheduler.submit(large_uploader)
+        started.wait()
+        urgent = scheduler.submit(self.uploader(300), priority=10)
+        urgent.result()
+        self.assertFalse(large.done())
+        scheduler.close()
+        self.assertEqual(self.completion_order([large, urgent]), [urgent, large])
+        self.assertEqual(
+            self.server.get_upload_data(large.result()), large_uploader.get_file_stream().read()
+        )
+
+    def test_weighted_fair_queueing(self):
+        scheduler = UploadScheduler(max_workers=1, policy="wfq")
+        self.server.latency = 0.002
+        heavy = scheduler.submit(self.uploader(4000), weight=3)
+        light = scheduler.submit(self.uploader(4000), weight=1)
+        scheduler.close()
+        heavy_id = heavy.result().rsplit("/", 1)[-1]
+        # While both are backlogged, the heavy job gets three chunks for each of the light one.
+        first = self.patch_order()[:20]
+        self.assertIn(first.count(heavy_id), (14, 15, 16))
+
+    def test_per_host_limit(self):
+        self.server.latency = 0.01
+        with UploadScheduler(max_workers=4, per_host=2) as scheduler:
+            for _ in range(4):
+                scheduler.submit(self.uploader(500))
+        patches = [r for r in self.server.records if r.method == "PATCH"]
+        concurrency = max(
+            sum(1 for other in patches if other.start <= r.start < other.end) for r in patches
+        )
+        self.assertLessEqual(concurrency, 2)
+
+    def test_per_host_limit_with_endpoints(self):
+        other = TusServer().start()
+        self.addCleanup(other.stop)
+        tus_client = client.TusClient([self.server.url, other.url])
+        self.server.latency = other.latency = 0.01
+        uploaders = [
+            tus_client.uploader(file_stream=io.BytesIO(b"x" * 500), chunk_size=100)
+            for _ in range(4)
+        ]
+        with UploadScheduler(max_workers=4, per_host=1) as scheduler:
+            jobs = [scheduler.submit(uploader) for uploader in uploaders]
+        hosts = {urlsplit(server.url).netloc: server for server in (self.server, other)}
+        for job in jobs:
+            self.assertIn(job.result().rsplit("/", 1)[-1], hosts[job.host].uploads)
+
+        patches = {
+            host: [r for r in server.records if r.method == "PATCH"]
+            for host, server in hosts.items()
+        }
+        self.assertTrue(all(patches.values()))
+        for records in patches.values():
+            concurrency = max(
+                sum(1 for other in records if other.start <= r.start < other.end)
+                for r in records
+            )
+            self.assertEqual(concurrency, 1)
+        # Each endpoint has its own limit, so both were uploaded to at the same time.
+        first, second = patches.values()
+        self.assertTrue(
+            any(a.start < b.end and b.start < a.end for a in first for b in second)
+        )
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            UploadScheduler(policy="random")
+        with pytest.raises(ValueError):
+            UploadScheduler(max_workers=0)
+        scheduler = UploadScheduler()
+        with pytest.raises(ValueError):
+            scheduler.submit(self.uploader(1), weight=0)
+        scheduler.close()
+        with pytest.raises(RuntimeError):
+            scheduler.submit(self.uploader(1))
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from tusclient.storage.sqlitestorage import SQLiteStorage
+
+
+class SQLiteStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "storage.db")
+        self.now = 1000.0
+        self.storage = SQLiteStorage(self.path, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def test_set_get_remove_item(self):
+        url = 'http://tusd.tusdemo.net/files/unique_file_id'
+        key = 'unique_key'
+
+        url_2 = 'http://tusd.tusdemo.net/files/unique_file_id_2'
+        key_2 = 'unique_key_2'
+        self.storage.set_item(key, url)
+        self.storage.set_item(key_2, url_2)
+
+        self.assertEqual(self.storage.get_item(key), url)
+        self.assertEqual(self.storage.get_item(key_2), url_2)
+
+        self.storage.remove_item(key)
+        self.assertIsNone(self.storage.get_item(key))
+        self.storage.set_item(key_2, None)
+        self.assertIsNone(self.storage.get_item(key_2))
+
+    def test_completed(self):
+        key = 'unique_key'
+        url = 'http://tusd.tusdemo.net/files/unique_file_id'
+        self.assertIsNone(self.storage.get_completed(key))
+
+        self.storage.set_completed(key, url, 100)
+        self.assertEqual(self.storage.get_completed(key), (url, 100, None, None))
+        self.storage.set_completed(key, url, 200, 'abcdef', 'sha256')
+        self.assertEqual(self.storage.get_completed(key), (url, 200, 'abcdef', 'sha256'))
+        self.assertIsNone(self.storage.get_item(key))
+
+        self.storage.remove_completed(key)
+        self.assertIsNone(self.storage.get_completed(key))
+
+    def test_shared_between_instances(self):
+        # Each process opens the database with its own instance.
+        other = SQLiteStorage(self.path)
+        try:
+            self.storage.set_item('key', 'http://tusd.tusdemo.net/files/abc')
+            self.assertEqual(other.get_item('key'), 'http://tusd.tusdemo.net/files/abc')
+        finally:
+            other.close()
+
+    def test_claim(self):
+        self.assertTrue(self.storage.claim('key', 'worker-1', 30))
+        # Claiming again extends the own lease.
+        self.assertTrue(self.storage.claim('key', 'worker-1', 30))
+        self.assertFalse(self.storage.claim('key', 'worker-2', 30))
+        self.assertTrue(self.storage.claim('other', 'worker-2', 30))
+
+        self.storage.release('key', 'worker-2')
+        self.assertFalse(self.storage.claim('key', 'worker-2', 30))
+        self.storage.release('key', 'worker-1')
+        self.assertTrue(self.storage.claim('key', 'worker-2', 30))
+
+    def test_expiry(self):
+        self.assertTrue(self.storage.claim('key', 'worker-1', 30))
+        self.now += 20
+        self.assertTrue(self.storage.renew('key', 'worker-1', 30))
+        self.now += 20
+        self.assertFalse(self.storage.claim('key', 'worker-2', 30))
+
+        # worker-1 crashed; its lease expires and is reassigned.
+        self.now += 20
+        self.assertTrue(self.storage.claim('key', 'worker-2', 30))
+        self.assertFalse(self.storage.renew('key', 'worker-1', 30))
+        self.assertTrue(self.storage.renew('key', 'worker-2', 30))
+
+    def test_offset_journal(self):
+        url = 'http://tusd.tusdemo.net/files/unique_file_id'
+        self.assertIsNone(self.storage.get_offset('key', url))
+        self.storage.set_offset('key', url, 100)
+        self.storage.set_offset('key', url, 200)
+        self.assertEqual(self.storage.get_offset('key', url), 200)
+        # The journal only applies to the upload it was written for.
+        self.assertIsNone(self.storage.get_offset('key', url + '_2'))
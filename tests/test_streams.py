@@ -0,0 +1,248 @@
+from unittest import mock
+import array
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import unittest
+
+import pytest
+
+from tusclient import client
+from tusclient.bufferpool import BufferPool
+from tusclient.limiter import BandwidthLimiter
+from tusclient.streams import FileSection, MemoryStream, ReplayBuffer, is_buffer, is_seekable
+from tusclient.testing import TusServer
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+
+
+def generate(content: bytes, block_size: int):
+    for i in range(0, len(content), block_size):
+        yield content[i : i + block_size]
+
+
+class ReplayBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.content = bytes(range(256)) * 10
+        self.buffer = ReplayBuffer(generate(self.content, 100))
+
+    def test_is_seekable(self):
+        self.assertTrue(is_seekable(io.BytesIO(b"")))
+        self.assertFalse(is_seekable(self.buffer))
+        self.assertFalse(is_seekable(generate(b"", 1)))
+        self.assertFalse(is_seekable([b"a", b"b"]))
+
+    def test_read(self):
+        self.assertEqual(self.buffer.read(250), self.content[:250])
+        self.assertEqual(self.buffer.tell(), 250)
+        self.assertEqual(self.buffer.read(), self.content[250:])
+        self.assertEqual(self.buffer.read(10), b"")
+
+    def test_replay(self):
+        self.buffer.read(300)
+        self.buffer.seek(120)
+        self.assertEqual(self.buffer.read(100), self.content[120:220])
+
+    def test_release(self):
+        self.buffer.read(300)
+        self.buffer.release(200)
+        self.assertEqual(self.buffer.start, 200)
+        with pytest.raises(ValueError):
+            self.buffer.seek(199)
+        self.buffer.seek(200)
+        self.assertEqual(self.buffer.read(200), self.content[200:400])
+
+    def test_memory_bounded(self):
+        for offset in range(0, len(self.content), 500):
+            self.buffer.seek(offset)
+            self.buffer.read(500)
+            self.buffer.release(offset + 500)
+            self.assertLessEqual(len(self.buffer._buffer), 100)
+
+    def test_file_source(self):
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(write_fd, "wb") as writer:
+            writer.write(self.content[:1000])
+        with os.fdopen(read_fd, "rb") as reader:
+            buffer = ReplayBuffer(reader)
+            self.assertEqual(buffer.read(600), self.content[:600])
+            buffer.seek(100)
+            self.assertEqual(buffer.read(), self.content[100:1000])
+
+
+class NonSeekableUploadTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_requires_deferred_length(self):
+        with pytest.raises(ValueError):
+            self.client.uploader(file_stream=generate(self.content, 1000))
+
+    def test_generator(self):
+        self.server.inject("error", count=2)
+        self.server.inject("reset", after_bytes=100)
+        uploader = self.client.uploader(
+            file_stream=generate(self.content, 1000),
+            chunk_size=4096,
+            upload_length_deferred=True,
+            retries=3,
+            retry_delay=0,
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(uploader.stop_at, len(self.content))
+        self.assertEqual(uploader.file_stream.start, len(self.content))
+
+    def test_pipe(self):
+        read_fd, write_fd = os.pipe()
+
+        def write():
+            with os.fdopen(write_fd, "wb") as writer:
+                writer.write(self.content)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        with os.fdopen(read_fd, "rb") as reader:
+            uploader = self.client.uploader(
+                file_stream=reader,
+                chunk_size=4096,
+                upload_length_deferred=True,
+                read_ahead=2,
+            )
+            uploader.upload()
+        writer.join()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+
+    def test_async_generator_source(self):
+        self.server.inject("conflict")
+        uploader = self.client.async_uploader(
+            file_stream=generate(self.content, 1000),
+            chunk_size=4096,
+            upload_length_deferred=True,
+            retries=1,
+            retry_delay=0,
+        )
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(uploader.upload())
+        loop.close()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(uploader.stop_at, len(self.content))
+
+
+class MemoryStreamTest(unittest.TestCase):
+    def test_is_buffer(self):
+        for source in [b"abc", bytearray(3), memoryview(b"abc"), array.array("d", [1.0])]:
+            self.assertTrue(is_buffer(source))
+        for source in [io.BytesIO(b"abc"), "abc", generate(b"abc", 1)]:
+            self.assertFalse(is_buffer(source))
+
+    def test_read(self):
+        content = bytearray(range(100))
+        stream = MemoryStream(content)
+        self.assertEqual(stream.nbytes, 100)
+        data = stream.read(40)
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(data, content[:40])
+        # Reads are views of the buffer, not copies.
+        content[0] = 255
+        self.assertEqual(data[0], 255)
+        self.assertEqual(stream.read(), content[40:])
+        self.assertEqual(stream.read(10), b"")
+        self.assertEqual(stream.seek(-10, os.SEEK_END), 90)
+        view = bytearray(20)
+        self.assertEqual(stream.readinto(view), 10)
+        self.assertEqual(view[:10], content[90:])
+
+    def test_multi_byte_items(self):
+        source = array.array("d", [1.5, 2.5, 3.5])
+        stream = MemoryStream(source)
+        self.assertEqual(stream.nbytes, 24)
+        self.assertEqual(stream.read(), source.tobytes())
+
+    def test_non_contiguous(self):
+        with pytest.raises(ValueError):
+            MemoryStream(memoryview(b"abcdef")[::2])
+
+
+class FileSectionTest(unittest.TestCase):
+    def test_read(self):
+        content = bytes(range(100))
+        section = FileSection(io.BytesIO(content), 30, 40)
+        self.assertEqual(section.length, 40)
+        self.assertEqual(section.read(10), content[30:40])
+        self.assertEqual(section.read(), content[40:70])
+        self.assertEqual(section.read(10), b"")
+        self.assertEqual(section.seek(-5, os.SEEK_END), 35)
+        view = bytearray(20)
+        self.assertEqual(section.readinto(view), 5)
+        self.assertEqual(view[:5], content[65:70])
+
+    def test_clamped(self):
+        section = FileSection(io.BytesIO(bytes(100)), 90, 40)
+        self.assertEqual(section.length, 10)
+        self.assertEqual(FileSection(io.BytesIO(bytes(100)), 120, 40).length, 0)
+        with pytest.raises(ValueError):
+            FileSection(io.BytesIO(bytes(100)), -1, 40)
+
+
+class MemoryUploadTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_upload(self):
+        self.server.inject("reset", after_bytes=100)
+        seek = MemoryStream.seek
+        with mock.patch.object(MemoryStream, "seek", autospec=True, side_effect=seek) as mocked:
+            uploader = self.client.uploader(
+                file_stream=bytearray(self.content),
+                chunk_size=4096,
+                upload_checksum=True,
+                digest_algorithm="sha256",
+                retries=2,
+                retry_delay=0,
+            )
+        self.assertEqual(uploader.file_size, len(self.content))
+        # The size is known without seeking to the end.
+        self.assertNotIn((os.SEEK_END,), [call.args[2:] for call in mocked.call_args_list])
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(uploader.digest, hashlib.sha256(self.content).hexdigest())
+
+    def test_chunks_are_not_copied(self):
+        uploader = self.client.uploader(file_stream=self.content, chunk_size=4096)
+        uploader.upload_chunk()
+        self.assertIsInstance(uploader.request.data, memoryview)
+        self.assertIs(uploader.request.data.obj, self.content)
+
+    def test_read_ahead_and_pool(self):
+        self.client.buffer_pool = BufferPool(4 * 4096)
+        self.client.bandwidth_limiter = BandwidthLimiter(rate=None)
+        uploader = self.client.uploader(
+            file_stream=memoryview(self.content), chunk_size=4096, read_ahead=2
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        # In-memory chunks are not copied into the pool's buffers.
+        self.assertEqual(self.client.buffer_pool._free_bytes, 0)
+
+    def test_async_upload(self):
+        uploader = self.client.async_uploader(file_stream=self.content, chunk_size=4096)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(uploader.upload())
+        loop.close()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
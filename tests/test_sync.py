@@ -0,0 +1,133 @@
+from base64 import b64encode
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tusclient import client, sync
+from tusclient.fingerprint import fingerprint
+from tusclient.fingerprint.statfingerprint import StatFingerprint, stat_key
+from tusclient.sync import SyncManifest, scan, sync_directory
+from tusclient.testing import TusServer
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "tree")
+        self.manifest = SyncManifest(os.path.join(self.tmp.name, "manifest.db"))
+        for path, size in [("a", 1000), ("b/c", 30000), ("b/d/e", 0), ("f", 5)]:
+            self.write(path, os.urandom(size))
+
+    def tearDown(self):
+        self.manifest.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as stream:
+            stream.write(content)
+
+    def sync(self, **kwargs):
+        return sync_directory(
+            self.client, self.root, self.manifest, chunk_size=8192, retry_delay=0, **kwargs
+        )
+
+    def assert_uploaded(self, path):
+        with open(os.path.join(self.root, path), "rb") as stream:
+            content = stream.read()
+        field = "relativePath " + b64encode(path.encode()).decode()
+        uploads = [u for u in self.server.uploads.values() if field in u.metadata]
+        self.assertTrue(uploads, "{} was not uploaded".format(path))
+        # The latest upload of the path is the one of its current content.
+        self.assertEqual(bytes(uploads[-1].data), content)
+
+    def test_sync(self):
+        report = self.sync()
+        self.assertEqual(report.uploaded, ["a", "b/c", "b/d/e", "f"])
+        self.assertEqual(report.unchanged, 0)
+        self.assertEqual(report.errors, {})
+        for path in report.uploaded:
+            self.assert_uploaded(path)
+
+        # Unchanged files are neither opened nor sent again.
+        requests = len(self.server.records)
+        with mock.patch("builtins.open", side_effect=AssertionError):
+            report = self.sync()
+        self.assertEqual(report.uploaded, [])
+        self.assertEqual(report.unchanged, 4)
+        self.assertEqual(len(self.server.records), requests)
+
+    def test_changes(self):
+        self.sync()
+        self.write("a", b"modified")
+        self.write("b/new", b"new file")
+        os.remove(os.path.join(self.root, "f"))
+
+        report = self.sync()
+        self.assertEqual(report.uploaded, ["a", "b/new"])
+        self.assertEqual(report.unchanged, 2)
+        self.assertEqual(report.deleted, ["f"])
+        self.assert_uploaded("a")
+        self.assert_uploaded("b/new")
+        self.assertNotIn("f", self.manifest.entries())
+
+    def test_resume_interrupted_upload(self):
+        self.server.inject("error", count=1, method="PATCH")
+        report = self.sync(retries=0, max_workers=1)
+        self.assertIn("a", report.errors)
+        posts = [r for r in self.server.records if r.method == "POST"]
+
+        report = self.sync()
+        self.assertEqual(report.uploaded, ["a"])
+        self.assertEqual(report.unchanged, 3)
+        # The upload recorded in the manifest was resumed, not created again.
+        self.assertEqual([r for r in self.server.records if r.method == "POST"], posts)
+        self.assert_uploaded("a")
+
+    def test_max_workers(self):
+        with mock.patch(
+            "tusclient.sync.resume_uploaders", wraps=sync.resume_uploaders
+        ) as resume:
+            self.sync(max_workers=2)
+        self.assertEqual(resume.call_args.kwargs["max_workers"], 2)
+
+    @unittest.skipUnless(hasattr(os, "link"), "hard links are not supported")
+    def test_hard_links(self):
+        os.link(os.path.join(self.root, "b/c"), os.path.join(self.root, "g"))
+        report = self.sync()
+        self.assertEqual(report.uploaded, ["a", "b/c", "b/d/e", "f", "g"])
+        self.assertEqual(len(self.server.uploads), 4)
+        self.assert_uploaded("b/c")
+
+        # New links of an uploaded file are not uploaded again.
+        os.link(os.path.join(self.root, "b/c"), os.path.join(self.root, "h"))
+        report = self.sync()
+        self.assertEqual((report.uploaded, report.unchanged), (["h"], 5))
+        self.assertEqual(len(self.server.uploads), 4)
+        self.assertEqual(self.sync().unchanged, 6)
+
+    def test_scan(self):
+        result = scan(self.root, self.manifest)
+        self.assertEqual(result.changed, ["a", "b/c", "b/d/e", "f"])
+        # Files which were not uploaded remain to be uploaded.
+        self.assertEqual(scan(self.root, self.manifest).changed, result.changed)
+
+
+class StatFingerprintTest(unittest.TestCase):
+    def test_get_fingerprint(self):
+        path = "tests/sample_files/binary.png"
+        stat = os.stat(path)
+        with open(path, "rb") as stream:
+            self.assertEqual(
+                StatFingerprint().get_fingerprint(stream),
+                stat_key(stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns),
+            )
+            self.assertNotEqual(
+                StatFingerprint().get_fingerprint(stream),
+                fingerprint.Fingerprint().get_fingerprint(stream),
+            )
@@ -0,0 +1,134 @@
+import asyncio
+import ssl
+import threading
+import unittest
+from unittest import mock
+
+from parametrize import parametrize
+
+from tusclient import client, tls
+from tusclient.testing import TusServer
+from tusclient.transport.aiohttptransport import AiohttpTransport
+from tusclient.transport.httpxtransport import AsyncHttpxTransport, HttpxTransport
+from tusclient.transport.requeststransport import RequestsTransport
+from tusclient.transport.sendfiletransport import SendfileTransport
+from tusclient.transport.urllib3transport import Urllib3Transport
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+# Self-signed certificate and key, used by the server and as client certificate.
+CERT = "tests/sample_files/localhost.pem"
+
+
+def server_context():
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(CERT)
+    context.verify_mode = ssl.CERT_REQUIRED
+    context.load_verify_locations(CERT)
+    return context
+
+
+class SSLContextCacheTest(unittest.TestCase):
+    def test_get(self):
+        cache = tls.SSLContextCache()
+        context = cache.get(True, CERT)
+        self.assertIs(cache.get(True, CERT), context)
+        self.assertIsNot(cache.get(False, CERT), context)
+        self.assertEqual(cache.get(False).verify_mode, ssl.CERT_NONE)
+        cache.clear()
+        self.assertIsNot(cache.get(True, CERT), context)
+
+    def test_shared_by_client_transports(self):
+        my_client = client.TusClient("https://tus.example/files/")
+        self.assertIs(my_client.transport.ssl_contexts, my_client.ssl_contexts)
+        self.assertIs(my_client.async_transport.ssl_contexts, my_client.ssl_contexts)
+
+        # The cache of a transport shared with another client is kept.
+        other = client.TusClient("https://tus.example/files/", transport=my_client.transport)
+        self.assertIs(other.ssl_contexts, my_client.ssl_contexts)
+        self.assertIs(other.async_transport.ssl_contexts, my_client.ssl_contexts)
+
+
+class ClientCertificateTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer(ssl_context=server_context()).start()
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.server.stop()
+
+    @parametrize(
+        "transport", [RequestsTransport, SendfileTransport, Urllib3Transport, HttpxTransport]
+    )
+    def test_upload(self, transport):
+        my_client = client.TusClient(
+            self.server.url, client_cert=CERT, transport=transport()
+        )
+        with mock.patch.object(
+            tls, "create_ssl_context", wraps=tls.create_ssl_context
+        ) as create:
+            uploader = my_client.uploader(
+                FILEPATH_BINARY, chunk_size=4096, verify_tls_cert=False
+            )
+            uploader.upload()
+        my_client.transport.close()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(create.call_count, 1)
+
+    @parametrize("transport", [AiohttpTransport, AsyncHttpxTransport])
+    def test_async_upload(self, transport):
+        my_client = client.TusClient(
+            self.server.url, client_cert=CERT, async_transport=transport()
+        )
+        with mock.patch.object(
+            tls, "create_ssl_context", wraps=tls.create_ssl_context
+        ) as create:
+            uploader = my_client.async_uploader(
+                FILEPATH_BINARY, chunk_size=4096, verify_tls_cert=False
+            )
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(uploader.upload())
+            loop.close()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertEqual(create.call_count, 1)
+
+    def test_requests_context_reused(self):
+        my_client = client.TusClient(self.server.url, client_cert=CERT)
+        loaded = []
+        load_cert_chain = ssl.SSLContext.load_cert_chain
+
+        def load(context, *args, **kwargs):
+            loaded.append(context)
+            return load_cert_chain(context, *args, **kwargs)
+
+        with mock.patch.object(
+            tls, "create_ssl_context", wraps=tls.create_ssl_context
+        ) as create, mock.patch.object(ssl.SSLContext, "load_cert_chain", load):
+            for _ in range(2):
+                my_client.uploader(
+                    FILEPATH_BINARY, chunk_size=4096, verify_tls_cert=False
+                ).upload()
+                # The next upload connects again.
+                my_client.transport.close()
+        self.assertEqual(len(self.server.uploads), 2)
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(len(loaded), 1)
+
+    def test_session_resumption(self):
+        transport = SendfileTransport()
+        my_client = client.TusClient(self.server.url, client_cert=CERT, transport=transport)
+
+        def upload():
+            my_client.uploader(
+                FILEPATH_BINARY, chunk_size=4096, verify_tls_cert=False
+            ).upload()
+
+        upload()
+        # Connections are per thread, so another thread opens a new one.
+        thread = threading.Thread(target=upload)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(transport._connections), 2)
+        self.assertTrue(transport._connections[1].sock.session_reused)
+        transport.close()
@@ -0,0 +1,195 @@
+import asyncio
+import io
+import os
+import unittest
+
+import requests
+
+from tusclient import client
+from tusclient.replay import group_uploads, load_trace, replay
+from tusclient.testing import TusServer
+from tusclient.trace import Tracer
+from tusclient.transport.requeststransport import RequestsTransport
+from tusclient.transport.sendfiletransport import SendfileTransport
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+CHUNK_SIZE = 10000
+
+
+class TraceTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.stream = io.StringIO()
+        self.client = client.TusClient(
+            self.server.url, transport=SendfileTransport(), tracer=Tracer(self.stream)
+        )
+        self.size = os.path.getsize(FILEPATH_BINARY)
+
+    def tearDown(self):
+        self.client.transport.close()
+        self.server.stop()
+
+    def events(self):
+        return load_trace(io.StringIO(self.stream.getvalue()))
+
+    def test_events(self):
+        uploader = self.client.uploader(
+            FILEPATH_BINARY, chunk_size=CHUNK_SIZE, upload_checksum=True
+        )
+        uploader.upload()
+        events = self.events()
+
+        post = events[0]
+        self.assertEqual(post["event"], "POST")
+        self.assertEqual(post["url"], self.server.url)
+        self.assertEqual(post["length"], self.size)
+        self.assertEqual(post["status"], 201)
+        self.assertIn("connect", post["phases"])
+
+        patches = events[1:]
+        self.assertEqual(len(patches), -(-self.size // CHUNK_SIZE))
+        self.assertEqual([e["offset"] for e in patches], list(range(0, self.size, CHUNK_SIZE)))
+        self.assertEqual(sum(e["length"] for e in patches), self.size)
+        for event in patches:
+            self.assertEqual(event["event"], "PATCH")
+            self.assertEqual(event["url"], uploader.url)
+            self.assertEqual(event["status"], 204)
+            self.assertTrue(
+                {"read", "checksum", "request", "send", "wait"} <= set(event["phases"])
+            )
+            self.assertGreaterEqual(event["duration"], event["phases"]["request"])
+
+    def test_requests_phases(self):
+        for session in [None, requests.Session()]:
+            transport = RequestsTransport(session=session)
+            tus_client = client.TusClient(
+                self.server.url, transport=transport, tracer=self.client.tracer
+            )
+            tus_client.uploader(FILEPATH_BINARY, chunk_size=CHUNK_SIZE).upload()
+            transport.close()
+        events = self.events()
+        count = len(events) // 2
+
+        traced, untraced = events[:count], events[count:]
+        self.assertEqual({"request", "connect", "send", "wait"}, set(traced[0]["phases"]))
+        # The connection is kept alive for the following requests.
+        for event in traced[1:]:
+            phases = event["phases"]
+            self.assertTrue({"request", "send", "wait"} <= set(phases))
+            self.assertNotIn("connect", phases)
+            self.assertGreaterEqual(phases["request"], phases["send"] + phases["wait"])
+        # The adapters of a given session are kept, so only the whole request is timed.
+        for event in untraced:
+            self.assertTrue({"connect", "send", "wait"}.isdisjoint(event["phases"]))
+            self.assertIn("request", event["phases"])
+
+    def test_retry_events(self):
+        self.server.inject("error", status=503)
+        self.client.uploader(
+            FILEPATH_BINARY, chunk_size=CHUNK_SIZE, retries=1, retry_delay=0
+        ).upload()
+        events = self.events()
+
+        self.assertEqual([e["event"] for e in events[:4]], ["POST", "PATCH", "retry", "HEAD"])
+        self.assertEqual(events[1]["status"], 503)
+        self.assertEqual(events[2]["status"], 503)
+        self.assertEqual(events[2]["attempt"], 1)
+        self.assertEqual(events[2]["offset"], 0)
+        self.assertEqual(events[3]["offset"], "0")
+
+    def test_reset_event(self):
+        self.server.inject("reset", after_bytes=100)
+        self.client.uploader(
+            FILEPATH_BINARY, chunk_size=CHUNK_SIZE, retries=1, retry_delay=0
+        ).upload()
+        failed = self.events()[1]
+
+        self.assertEqual(failed["event"], "PATCH")
+        self.assertNotIn("status", failed)
+        self.assertIn("error", failed)
+
+    def test_async_events(self):
+        uploader = self.client.async_uploader(FILEPATH_BINARY, chunk_size=CHUNK_SIZE)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(uploader.upload())
+        finally:
+            loop.close()
+        events = self.events()
+
+        self.assertEqual(events[0]["event"], "POST")
+        self.assertEqual(sum(e["length"] for e in events[1:]), self.size)
+        for event in events[1:]:
+            self.assertEqual(event["status"], 204)
+            self.assertIn("read", event["phases"])
+            self.assertIn("request", event["phases"])
+
+    def test_untraced(self):
+        self.client.tracer = None
+        self.client.uploader(FILEPATH_BINARY, chunk_size=CHUNK_SIZE).upload()
+        self.assertEqual(self.stream.getvalue(), "")
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.stream = io.StringIO()
+        self.client = client.TusClient(
+            self.server.url, transport=SendfileTransport(), tracer=Tracer(self.stream)
+        )
+
+    def tearDown(self):
+        self.client.transport.close()
+        self.server.stop()
+
+    def trace(self):
+        return load_trace(io.StringIO(self.stream.getvalue()))
+
+    def test_group_uploads(self):
+        self.client.uploader(FILEPATH_BINARY, chunk_size=CHUNK_SIZE).upload()
+        self.client.uploader(FILEPATH_BINARY, chunk_size=2 * CHUNK_SIZE).upload()
+        uploads = group_uploads(self.trace())
+
+        self.assertEqual(len(uploads), 2)
+        self.assertEqual([u.chunk_size for u in uploads], [CHUNK_SIZE, 2 * CHUNK_SIZE])
+        for upload in uploads:
+            self.assertEqual(upload.length, os.path.getsize(FILEPATH_BINARY))
+            self.assertEqual(upload.start_offset, 0)
+
+    def test_replay_timing(self):
+        self.server.latency = 0.05
+        self.server.inject("error", status=503)
+        self.client.uploader(
+            FILEPATH_BINARY, chunk_size=CHUNK_SIZE, retries=1, retry_delay=0
+        ).upload()
+        trace = self.trace()
+
+        replayed = io.StringIO()
+        (result,) = replay(trace, tracer=Tracer(replayed))
+        events = load_trace(io.StringIO(replayed.getvalue()))
+
+        self.assertIsNone(result.error)
+        self.assertEqual(result.requests, len([e for e in trace if "duration" in e]))
+        self.assertEqual([e["event"] for e in events], [e["event"] for e in trace])
+        self.assertEqual(
+            [e.get("status") for e in events], [e.get("status") for e in trace]
+        )
+        # Every request waits for the traced latency again.
+        self.assertGreaterEqual(result.replayed, 0.05 * result.requests)
+        self.assertAlmostEqual(result.replayed, result.traced, delta=0.5 * result.traced)
+
+    def test_replay_resumed(self):
+        uploader = self.client.uploader(FILEPATH_BINARY, chunk_size=CHUNK_SIZE)
+        uploader.upload(stop_at=CHUNK_SIZE)
+        self.stream.seek(0)
+        self.stream.truncate()
+        resumed = self.client.uploader(FILEPATH_BINARY, chunk_size=CHUNK_SIZE, url=uploader.url)
+        resumed.upload()
+        trace = self.trace()
+
+        (upload,) = group_uploads(trace)
+        self.assertEqual(upload.start_offset, CHUNK_SIZE)
+        (result,) = replay(trace)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.requests, len(trace))
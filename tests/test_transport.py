@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import http.client
+import io
+import socket
+import unittest
+from base64 import b64encode
+from unittest import mock
+
+from parametrize import parametrize
+import pytest
+
+from tusclient import client, exceptions
+from tusclient.limiter import BandwidthLimiter
+from tusclient.request import FileRangeBody, ThrottledBody
+from tusclient.testing import TusServer
+from tusclient.transport.aiohttptransport import AiohttpTransport
+from tusclient.transport.requeststransport import RequestsTransport
+from tusclient.transport.sendfiletransport import SendfileTransport
+from tusclient.transport.urllib3transport import Urllib3Transport
+from tusclient.transport import httpxtransport
+from tusclient.uploader import Uploader
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+
+SYNC_TRANSPORTS = [RequestsTransport, Urllib3Transport, SendfileTransport]
+ASYNC_TRANSPORTS = [AiohttpTransport]
+if httpxtransport.httpx is not None:
+    SYNC_TRANSPORTS.append(httpxtransport.HttpxTransport)
+    ASYNC_TRANSPORTS.append(httpxtransport.AsyncHttpxTransport)
+
+
+def unused_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return "http://127.0.0.1:{}/files/".format(sock.getsockname()[1])
+
+
+class TransportTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def run_async(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    @parametrize("transport_class", SYNC_TRANSPORTS)
+    def test_requests(self, transport_class):
+        transport = transport_class()
+        headers = {"Tus-Resumable": "1.0.0"}
+        resp = transport.request(
+            "POST", self.server.url, dict(headers, **{"Upload-Length": "15"})
+        )
+        self.assertEqual(resp.status_code, 201)
+        url = self.server.url + resp.headers["location"].rsplit("/", 1)[-1]
+
+        patch_headers = dict(
+            headers,
+            **{"Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"}
+        )
+        resp = transport.request("PATCH", url, patch_headers, data=b"hello")
+        self.assertEqual(resp.status_code, 204)
+        self.assertEqual(resp.headers["upload-offset"], "5")
+
+        body = ThrottledBody(b"world", BandwidthLimiter(rate=None))
+        patch_headers["Upload-Offset"] = "5"
+        resp = transport.request("PATCH", url, patch_headers, data=body)
+        self.assertEqual(resp.headers["upload-offset"], "10")
+
+        with open(FILEPATH_BINARY, "rb") as stream:
+            body = FileRangeBody(stream, 2, 5)
+            patch_headers["Upload-Offset"] = "10"
+            resp = transport.request("PATCH", url, patch_headers, data=body)
+        self.assertEqual(resp.headers["upload-offset"], "15")
+
+        resp = transport.request("HEAD", url, headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            self.server.get_upload_data(url), b"helloworld" + self.content[2:7]
+        )
+        transport.close()
+
+    @parametrize("transport_class", SYNC_TRANSPORTS)
+    def test_file_range_without_pread(self, transport_class):
+        # Like on Windows, file ranges are read with seek and read.
+        tus_client = client.TusClient(self.server.url, transport=transport_class())
+        uploader = tus_client.uploader(FILEPATH_BINARY, chunk_size=20000)
+        with mock.patch("tusclient.request._os_pread", None):
+            with open(FILEPATH_BINARY, "rb") as stream:
+                stream.seek(100)
+                body = FileRangeBody(stream, 2, 40000)
+                self.assertEqual(b"".join(iter(body.read, b"")), self.content[2:40002])
+                self.assertEqual(stream.tell(), 100)
+            uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        tus_client.transport.close()
+
+    @parametrize("transport_class", SYNC_TRANSPORTS)
+    def test_connection_error(self, transport_class):
+        with pytest.raises(exceptions.TusCommunicationError):
+            transport_class().request("HEAD", unused_url(), {})
+
+    @parametrize("transport_class", SYNC_TRANSPORTS)
+    def test_upload(self, transport_class):
+        self.server.inject("reset", after_bytes=10)
+        self.server.inject("error", status=503)
+        tus_client = client.TusClient(self.server.url, transport=transport_class())
+        uploader = tus_client.uploader(
+            FILEPATH_BINARY, chunk_size=8192, retries=2, retry_delay=0
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+
+    @parametrize("transport_class", ASYNC_TRANSPORTS)
+    def test_async_upload(self, transport_class):
+        self.server.inject("error", status=503)
+        tus_client = client.TusClient(self.server.url, async_transport=transport_class())
+        tus_client.bandwidth_limiter = BandwidthLimiter(rate=None)
+        uploader = tus_client.async_uploader(
+            FILEPATH_BINARY, chunk_size=8192, retries=1, retry_delay=0
+        )
+        self.run_async(uploader.upload())
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+
+    @parametrize("transport_class", ASYNC_TRANSPORTS)
+    def test_async_request_outside_of_context(self, transport_class):
+        transport = transport_class()
+        resp = self.run_async(
+            transport.request(
+                "POST", self.server.url, {"Tus-Resumable": "1.0.0", "Upload-Length": "1"}
+            )
+        )
+        self.assertEqual(resp.status_code, 201)
+
+    @parametrize("transport_class", ASYNC_TRANSPORTS)
+    def test_async_connection_error(self, transport_class):
+        with pytest.raises(exceptions.TusCommunicationError):
+            self.run_async(transport_class().request("HEAD", unused_url(), {}))
+
+    def test_standalone_uploader(self):
+        tus_client = client.TusClient(self.server.url)
+        url = tus_client.uploader(file_stream=io.BytesIO(b"x")).create_url()
+
+        uploader = Uploader(file_stream=io.BytesIO(b"x"), url=url)
+        self.assertIsInstance(uploader.transport, RequestsTransport)
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(url), b"x")
+
+
+class SendfileTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url, transport=SendfileTransport())
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+        patcher = mock.patch.object(
+            socket.socket, "sendfile", autospec=True, side_effect=socket.socket.sendfile
+        )
+        self.sendfile = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.client.transport.close()
+        self.server.stop()
+
+    def test_file_path(self):
+        self.server.inject("reset", after_bytes=10)
+        uploader = self.client.uploader(
+            FILEPATH_BINARY, chunk_size=8192, retries=1, retry_delay=0
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertGreaterEqual(self.sendfile.call_count, len(self.content) // 8192)
+
+    def test_bandwidth_limiter(self):
+        self.client.bandwidth_limiter = BandwidthLimiter(rate=10 * 1024 * 1024)
+        uploader = self.client.uploader(FILEPATH_BINARY, chunk_size=8192)
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.assertGreater(self.sendfile.call_count, len(self.content) // 8192)
+
+    def test_in_memory_stream(self):
+        uploader = self.client.uploader(
+            file_stream=io.BytesIO(self.content), chunk_size=8192
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.sendfile.assert_not_called()
+
+    def test_checksum(self):
+        uploader = self.client.uploader(
+            FILEPATH_BINARY, chunk_size=8192, upload_checksum=True
+        )
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.sendfile.assert_not_called()
+
+    def test_precomputed_checksum(self):
+        def get_precomputed_checksum(offset, length):
+            digest = hashlib.sha1(self.content[offset : offset + length]).digest()
+            return "sha1 " + b64encode(digest).decode("ascii")
+
+        uploader = self.client.uploader(
+            FILEPATH_BINARY, chunk_size=8192, upload_checksum=True
+        )
+        uploader.get_precomputed_checksum = get_precomputed_checksum
+        uploader.upload()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        self.sendfile.assert_called()
+
+
+    @parametrize(
+        "method,step,error,retried",
+        [
+            ("PATCH", "send", BrokenPipeError(), True),
+            ("PATCH", "send", ConnectionResetError(), True),
+            ("HEAD", "getresponse", http.client.RemoteDisconnected(), True),
+            # The server may have received the whole request.
+            ("HEAD", "getresponse", ConnectionResetError(), False),
+            ("HEAD", "getresponse", socket.timeout(), False),
+            # Uploads must not be created twice.
+            ("POST", "send", BrokenPipeError(), False),
+        ],
+    )
+    def test_stale_connection(self, method, step, error, retried):
+        transport = self.client.transport
+        headers = {"Tus-Resumable": "1.0.0"}
+        resp = transport.request("POST", self.server.url, dict(headers, **{"Upload-Length": "5"}))
+        url = self.server.url + resp.headers["location"].rsplit("/", 1)[-1]
+        if method == "PATCH":
+            patch_headers = {
+                "Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"
+            }
+            args = (url, dict(headers, **patch_headers), b"hello")
+        elif method == "HEAD":
+            args = (url, headers)
+        else:
+            args = (self.server.url, dict(headers, **{"Upload-Length": "5"}))
+
+        # The kept-alive connection fails once.
+        if step == "send":
+            target, original = SendfileTransport, SendfileTransport._send
+        else:
+            target, original = http.client.HTTPConnection, http.client.HTTPConnection.getresponse
+        calls = []
+
+        def fail_once(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise error
+            return original(*args, **kwargs)
+
+        with mock.patch.object(target, original.__name__, fail_once):
+            if retried:
+                resp = transport.request(method, *args)
+                self.assertLess(resp.status_code, 300)
+            else:
+                with pytest.raises(exceptions.TusCommunicationError):
+                    transport.request(method, *args)
+        self.assertEqual(len(calls), 2 if retried else 1)
+
+
+class ChecksumTrailerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def upload(self, transport, **kwargs):
+        tus_client = client.TusClient(self.server.url, transport=transport)
+        uploader = tus_client.uploader(
+            FILEPATH_BINARY, chunk_size=10000, upload_checksum=True, checksum_trailer=True,
+            **kwargs
+        )
+        uploader.upload()
+        transport.close()
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.content)
+        return uploader
+
+    def test_trailer(self):
+        with mock.patch.object(
+            SendfileTransport, "_send_chunked", autospec=True,
+            side_effect=SendfileTransport._send_chunked,
+        ) as send_chunked:
+            uploader = self.upload(SendfileTransport())
+        self.assertEqual(send_chunked.call_count, -(-len(self.content) // 10000))
+        # The chunks were streamed, never read as a whole.
+        self.assertIsNone(uploader.request.data)
+
+    def test_reset(self):
+        self.server.inject("reset", after_bytes=5000)
+        self.upload(SendfileTransport(), retries=1, retry_delay=0)
+
+    def test_without_trailer_support(self):
+        uploader = self.upload(RequestsTransport())
+        self.assertIsNotNone(uploader.request.data)
+
+    def test_checksum_mismatch(self):
+        resp = RequestsTransport().request(
+            "POST", self.server.url, {"Tus-Resumable": "1.0.0", "Upload-Length": "5"}
+        )
+        url = self.server.url + resp.headers["location"].rsplit("/", 1)[1]
+        host, port = self.server.url.split("/")[2].split(":")
+        conn = http.client.HTTPConnection(host, int(port))
+        conn.putrequest("PATCH", url)
+        for name, value in (
+            ("Tus-Resumable", "1.0.0"),
+            ("Upload-Offset", "0"),
+            ("Content-Type", "application/offset+octet-stream"),
+            ("Transfer-Encoding", "chunked"),
+            ("Trailer", "Upload-Checksum"),
+        ):
+            conn.putheader(name, value)
+        conn.endheaders()
+        digest = b64encode(hashlib.sha1(b"other").digest()).decode("ascii")
+        conn.send(b"5\r\nhello\r\n0\r\nUpload-Checksum: sha1 " + digest.encode() + b"\r\n\r\n")
+        self.assertEqual(conn.getresponse().status, 460)
+        conn.close()
+        self.assertEqual(self.server.get_upload_data(url), b"")
@@ -1,6 +1,10 @@
+import asyncio
+import gc
 import os
 import io
+import hashlib
 import tempfile
+import unittest
 from base64 import b64encode
 from unittest import mock
 
@@ -9,8 +13,10 @@ from responses import matchers
 from parametrize import parametrize
 import pytest
 
-from tusclient import exceptions
+from tusclient import client, exceptions
+from tusclient.fingerprint import fingerprint
 from tusclient.storage import filestorage
+from tusclient.testing import TusServer
 from tests import mixin
 
 
@@ -295,3 +301,382 @@ class UploaderTest(mixin.Mixin):
         uploader.upload()
         self.assertEqual(uploader.offset, 5)
         self.assertEqual(uploader.stop_at, 5)
+
+
+class FileHandleTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    @staticmethod
+    def count_fds():
+        return len(os.listdir("/proc/self/fd"))
+
+    @pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="requires procfs")
+    def test_fd_count_stays_flat(self):
+        # Descriptors of earlier tests' garbage must not be collected while counting.
+        gc.collect()
+        uploader = self.client.uploader(FILEPATH_BINARY, chunk_size=1024)
+        uploader.upload_chunk()
+        fds = self.count_fds()
+        while uploader.offset < uploader.file_size:
+            uploader.upload_chunk()
+            self.assertEqual(self.count_fds(), fds)
+        uploader.close()
+        self.assertEqual(self.count_fds(), fds - 1)
+
+    def test_single_open_per_upload(self):
+        with mock.patch(
+            "tusclient.uploader.baseuploader.open", create=True, wraps=open
+        ) as open_mock:
+            uploader = self.client.uploader(FILEPATH_BINARY, chunk_size=1024)
+            # Nothing is opened until data is needed.
+            self.assertEqual(open_mock.call_count, 0)
+            uploader.upload()
+        self.assertEqual(open_mock.call_count, 1)
+        self.assertIsNone(uploader._file_handle)
+
+    def test_closed_when_init_fails(self):
+        handles = []
+
+        def tracked_open(*args, **kwargs):
+            handles.append(open(*args, **kwargs))
+            return handles[-1]
+
+        storage = mock.Mock()
+        storage.get_completed.side_effect = OSError("storage unavailable")
+        with mock.patch(
+            "tusclient.uploader.baseuploader.open", create=True, new=tracked_open
+        ):
+            with pytest.raises(OSError):
+                self.client.uploader(FILEPATH_BINARY, store_url=True, url_storage=storage)
+        self.assertEqual(len(handles), 1)
+        self.assertTrue(handles[0].closed)
+
+    def test_context_manager(self):
+        with self.client.uploader(FILEPATH_BINARY, chunk_size=1024) as uploader:
+            uploader.upload_chunk()
+            handle = uploader._file_handle
+            self.assertFalse(handle.closed)
+        self.assertTrue(handle.closed)
+
+    def test_file_stream_left_open(self):
+        with open(FILEPATH_BINARY, "rb") as stream:
+            with self.client.uploader(file_stream=stream, chunk_size=8192) as uploader:
+                uploader.upload()
+            self.assertFalse(stream.closed)
+
+
+class CompletionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        fd, self.storage_path = tempfile.mkstemp()
+        os.close(fd)
+        self.storage = filestorage.FileStorage(self.storage_path)
+
+    def tearDown(self):
+        self.storage.close()
+        os.remove(self.storage_path)
+        self.server.stop()
+
+    def uploader(self, **kwargs):
+        return self.client.uploader(
+            FILEPATH_BINARY, chunk_size=4096, store_url=True, url_storage=self.storage, **kwargs
+        )
+
+    def test_completed_upload_is_skipped(self):
+        uploader = self.uploader()
+        self.assertFalse(uploader.completed)
+        uploader.upload()
+        self.assertTrue(uploader.completed)
+        requests = len(self.server.records)
+
+        # Even a removed in-progress entry does not matter.
+        self.storage.remove_item(uploader._get_fingerprint())
+        again = self.uploader()
+        self.assertTrue(again.completed)
+        self.assertEqual(again.url, uploader.url)
+        self.assertEqual(again.offset, uploader.file_size)
+        again.upload()
+        self.assertEqual(len(self.server.records), requests)
+
+    def test_partial_upload_is_not_completed(self):
+        uploader = self.uploader()
+        uploader.upload(stop_at=4096)
+        self.assertFalse(uploader.completed)
+        again = self.uploader()
+        self.assertFalse(again.completed)
+        self.assertEqual(again.offset, 4096)
+        again.upload()
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.assertEqual(self.server.get_upload_data(again.url), stream.read())
+
+    def test_removed_completion_record(self):
+        uploader = self.uploader()
+        uploader.upload()
+        self.storage.remove_completed(uploader._get_fingerprint())
+        again = self.uploader()
+        self.assertFalse(again.completed)
+        self.assertEqual(again.offset, uploader.file_size)
+        self.assertEqual(self.server.records[-1].method, "HEAD")
+
+    def test_chunk_by_chunk(self):
+        uploader = self.uploader(read_ahead=2)
+        uploader.begin()
+        self.assertFalse(uploader.finished)
+        chunks = 0
+        while not uploader.finished:
+            uploader.upload_chunk()
+            chunks += 1
+        self.assertFalse(uploader.completed)
+        uploader.finish()
+        self.assertTrue(uploader.completed)
+        self.assertIsNone(uploader._file_handle)
+        self.assertEqual(chunks, -(-uploader.file_size // 4096))
+        self.assertIsNotNone(self.storage.get_completed(uploader.storage_key))
+
+    def test_finish_unfinished(self):
+        uploader = self.uploader()
+        uploader.begin(stop_at=4096)
+        uploader.upload_chunk()
+        self.assertTrue(uploader.finished)
+        uploader.finish()
+        # Only part of the file was uploaded.
+        self.assertFalse(uploader.completed)
+        self.assertIsNone(self.storage.get_completed(uploader.storage_key))
+
+
+class OffsetJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        fd, self.storage_path = tempfile.mkstemp()
+        os.close(fd)
+        self.storage = filestorage.FileStorage(self.storage_path)
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+
+    def tearDown(self):
+        self.storage.close()
+        os.remove(self.storage_path)
+        self.server.stop()
+
+    def uploader(self, factory=None, **kwargs):
+        return (factory or self.client.uploader)(
+            FILEPATH_BINARY, chunk_size=4096, store_url=True, url_storage=self.storage,
+            offset_journal=True, **kwargs
+        )
+
+    def methods(self):
+        return [record.method for record in self.server.records]
+
+    def test_resume_without_head(self):
+        uploader = self.uploader()
+        uploader.upload(stop_at=8192)
+        self.assertEqual(
+            self.storage.get_offset(uploader._get_fingerprint(), uploader.url), 8192
+        )
+        requests = len(self.server.records)
+
+        again = self.uploader()
+        self.assertEqual(again.offset, 8192)
+        self.assertTrue(again.offset_from_journal)
+        self.assertEqual(len(self.server.records), requests)
+        again.upload()
+        self.assertFalse(again.offset_from_journal)
+        self.assertNotIn("HEAD", self.methods())
+        self.assertEqual(self.server.get_upload_data(again.url), self.content)
+
+    def test_journal_behind_server(self):
+        uploader = self.uploader()
+        uploader.upload(stop_at=8192)
+        # The process stopped after the server acknowledged the chunk, before journaling it.
+        self.storage.set_offset(uploader._get_fingerprint(), uploader.url, 4096)
+
+        again = self.uploader()
+        self.assertEqual(again.offset, 4096)
+        again.upload()
+        statuses = [(r.method, r.status) for r in self.server.records]
+        self.assertIn(("PATCH", 409), statuses)
+        self.assertEqual(self.methods().count("HEAD"), 1)
+        self.assertEqual(again.url, uploader.url)
+        self.assertEqual(self.server.get_upload_data(again.url), self.content)
+
+    def test_expired_upload(self):
+        uploader = self.uploader()
+        uploader.upload(stop_at=8192)
+        self.server.reset()
+
+        again = self.uploader()
+        self.assertTrue(again.offset_from_journal)
+        again.upload()
+        self.assertNotEqual(again.url, uploader.url)
+        self.assertEqual(self.server.get_upload_data(again.url), self.content)
+        self.assertEqual(self.storage.get_item(again._get_fingerprint()), again.url)
+
+    @parametrize("kind", ["error", "reset"])
+    def test_recovery_head_retried(self, kind):
+        uploader = self.uploader()
+        uploader.upload(stop_at=8192)
+        self.storage.set_offset(uploader._get_fingerprint(), uploader.url, 4096)
+        # The HEAD fetching the server's offset fails once, with 500 or a reset.
+        self.server.inject(kind, method="HEAD")
+
+        again = self.uploader(retries=1, retry_delay=0)
+        again.upload()
+        self.assertEqual(self.methods().count("HEAD"), 2)
+        self.assertEqual(again.url, uploader.url)
+        self.assertEqual(self.server.get_upload_data(again.url), self.content)
+
+    @parametrize("journaled", [4096, 20000])
+    def test_recovery_reading_ahead(self, journaled):
+        uploader = self.uploader()
+        uploader.upload(stop_at=8192)
+        self.storage.set_offset(uploader._get_fingerprint(), uploader.url, journaled)
+        if journaled > 8192:
+            # Past the server's offset: the upload is recreated from scratch.
+            self.server.reset()
+
+        fingerprinter = mock.Mock(wraps=fingerprint.Fingerprint())
+        again = self.uploader(read_ahead=2, fingerprinter=fingerprinter)
+        again.upload()
+        # The stream shared with the read-ahead thread is fingerprinted only once.
+        self.assertEqual(fingerprinter.get_fingerprint.call_count, 1)
+        self.assertEqual(self.server.get_upload_data(again.url), self.content)
+
+    def run_async(self, uploader):
+        loop = asyncio.new_event_loop()
+        # Offsets are fetched without blocking the event loop on the sync transport.
+        blocking = mock.patch.object(
+            self.client.transport, "request", side_effect=AssertionError("blocking request")
+        )
+        try:
+            with blocking:
+                loop.run_until_complete(uploader.upload())
+        finally:
+            loop.close()
+
+    def test_async(self):
+        uploader = self.uploader()
+        uploader.upload(stop_at=8192)
+        self.storage.set_offset(uploader._get_fingerprint(), uploader.url, 4096)
+
+        again = self.uploader(self.client.async_uploader)
+        self.assertEqual(again.offset, 4096)
+        self.run_async(again)
+        self.assertEqual(self.methods().count("HEAD"), 1)
+        self.assertEqual(self.server.get_upload_data(again.url), self.content)
+
+    def test_async_head_retried(self):
+        uploader = self.uploader()
+        uploader.upload(stop_at=8192)
+        self.storage.set_offset(uploader._get_fingerprint(), uploader.url, 4096)
+        self.server.inject("error", method="HEAD", status=503)
+
+        again = self.uploader(self.client.async_uploader, retries=1, retry_delay=0)
+        self.run_async(again)
+        self.assertEqual(self.methods().count("HEAD"), 2)
+        self.assertEqual(self.server.get_upload_data(again.url), self.content)
+
+    def test_journal_requires_store_url(self):
+        with pytest.raises(ValueError):
+            self.client.uploader(FILEPATH_BINARY, chunk_size=4096, offset_journal=True)
+        with pytest.raises(ValueError):
+            self.client.uploader(
+                FILEPATH_BINARY, chunk_size=4096, offset_journal=True, url_storage=self.storage
+            )
+
+
+class DigestTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.content = stream.read()
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def uploader(self, **kwargs):
+        kwargs.setdefault("chunk_size", 4096)
+        return self.client.uploader(FILEPATH_BINARY, digest_algorithm="sha256", **kwargs)
+
+    def test_digest(self):
+        uploader = self.uploader()
+        self.assertIsNone(uploader.digest)
+        with mock.patch.object(
+            uploader, "get_file_stream", wraps=uploader.get_file_stream
+        ) as get_file_stream:
+            uploader.upload()
+            self.assertEqual(uploader.digest, self.sha256)
+        # The data sent was hashed, without reading the file again.
+        patches = [r for r in self.server.records if r.method == "PATCH"]
+        self.assertEqual(get_file_stream.call_count, len(patches))
+
+    def test_no_digest(self):
+        uploader = self.client.uploader(FILEPATH_BINARY)
+        uploader.upload()
+        self.assertIsNone(uploader.digest)
+
+    @parametrize("read_ahead", [0, 2])
+    def test_retries(self, read_ahead):
+        self.server.inject("reset", after_bytes=1000)
+        self.server.inject("error", count=2)
+        uploader = self.uploader(retries=3, retry_delay=0, read_ahead=read_ahead)
+        uploader.upload()
+        self.assertEqual(uploader.digest, self.sha256)
+
+    def test_resume(self):
+        uploader = self.uploader()
+        uploader.upload(stop_at=8192)
+        self.assertIsNone(uploader.digest)
+        resumed = self.uploader(url=uploader.url)
+        self.assertEqual(resumed.offset, 8192)
+        resumed.upload()
+        self.assertEqual(resumed.digest, self.sha256)
+
+    def test_stream(self):
+        def generate():
+            for i in range(0, len(self.content), 1000):
+                yield self.content[i : i + 1000]
+
+        uploader = self.client.uploader(
+            file_stream=generate(),
+            chunk_size=4096,
+            upload_length_deferred=True,
+            digest_algorithm="md5",
+        )
+        uploader.upload()
+        self.assertEqual(uploader.digest, hashlib.md5(self.content).hexdigest())
+
+    def test_send_digest(self):
+        uploader = self.uploader(send_digest=True)
+        with mock.patch.object(
+            uploader.transport, "request", wraps=uploader.transport.request
+        ) as request:
+            uploader.upload()
+        patches = [c for c in request.call_args_list if c.args[0] == "PATCH"]
+        expected = "sha-256=:{}:".format(
+            b64encode(hashlib.sha256(self.content).digest()).decode("ascii")
+        )
+        self.assertEqual(patches[-1].args[2]["repr-digest"], expected)
+        self.assertTrue(all("repr-digest" not in c.args[2] for c in patches[:-1]))
+
+    def test_completion_record(self):
+        fd, storage_path = tempfile.mkstemp()
+        os.close(fd)
+        storage = filestorage.FileStorage(storage_path)
+        try:
+            self.uploader(store_url=True, url_storage=storage).upload()
+            again = self.uploader(store_url=True, url_storage=storage)
+            with mock.patch.object(again, "get_file_stream") as get_file_stream:
+                self.assertEqual(again.digest, self.sha256)
+            get_file_stream.assert_not_called()
+        finally:
+            storage.close()
+            os.remove(storage_path)
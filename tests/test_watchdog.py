@@ -0,0 +1,242 @@
+import asyncio
+import io
+import threading
+import time
+import unittest
+from unittest import mock
+
+from parametrize import parametrize
+import pytest
+
+from tusclient import client
+from tusclient.exceptions import (
+    TusCommunicationError,
+    TusUploadCancelled,
+    TusUploadStalled,
+)
+from tusclient.limiter import BandwidthLimiter
+from tusclient.testing import TusServer
+from tusclient.transport.interface import Timeouts, to_timeouts
+from tusclient.transport.requeststransport import RequestsTransport
+from tusclient.transport.sendfiletransport import SendfileTransport
+from tusclient.transport.urllib3transport import Urllib3Transport
+from tusclient.watchdog import TransferMonitor
+
+
+FILEPATH_BINARY = "tests/sample_files/binary.png"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TransferMonitorTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("tusclient.watchdog.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_steady(self):
+        monitor = TransferMonitor(min_rate=1000, window=1.0)
+        for _ in range(10):
+            monitor.consume(500)
+            self.clock.now += 0.5
+
+    def test_stalled(self):
+        monitor = TransferMonitor(min_rate=1000, window=1.0)
+        monitor.consume(500)
+        self.clock.now += 0.5
+        monitor.consume(100)
+        self.clock.now += 0.6
+        with pytest.raises(TusUploadStalled):
+            monitor.consume(100)
+
+    def test_throttling_is_not_a_stall(self):
+        limiter = mock.Mock(rate=100)
+        limiter.consume.side_effect = lambda count: setattr(
+            self.clock, "now", self.clock.now + count / 100
+        )
+        monitor = TransferMonitor(limiter, min_rate=1000, window=1.0)
+        for _ in range(5):
+            monitor.consume(1000)
+            self.clock.now += 0.5
+        self.assertEqual(limiter.consume.call_count, 5)
+
+    def test_cancelled(self):
+        cancelled = threading.Event()
+        monitor = TransferMonitor(cancelled=cancelled)
+        monitor.consume(1000)
+        cancelled.set()
+        with pytest.raises(TusUploadCancelled):
+            monitor.consume(1000)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            TransferMonitor(min_rate=0)
+        with pytest.raises(ValueError):
+            TransferMonitor(window=0)
+
+
+class TimeoutsTest(unittest.TestCase):
+    def test_to_timeouts(self):
+        self.assertEqual(to_timeouts(5), Timeouts(5, 5))
+        self.assertEqual(to_timeouts((1, None)), Timeouts(1, None))
+        self.assertEqual(to_timeouts(None), Timeouts(None, None))
+
+    def setUp(self):
+        self.server = TusServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    @parametrize("transport", [RequestsTransport, Urllib3Transport, SendfileTransport])
+    def test_read_timeout(self, transport):
+        tus_client = client.TusClient(self.server.url, transport=transport(timeout=(5, 0.2)))
+        self.server.pace("PATCH", latency=1.0)
+        uploader = tus_client.uploader(FILEPATH_BINARY, retry_delay=0)
+        start = time.monotonic()
+        with pytest.raises(TusCommunicationError):
+            uploader.upload()
+        self.assertLess(time.monotonic() - start, 0.9)
+
+        # The server is still busy with the request which timed out for a while.
+        uploader = tus_client.uploader(FILEPATH_BINARY, retries=1, retry_delay=1)
+        self.server.pace("PATCH", latency=1.0)
+        uploader.upload()
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.assertEqual(self.server.get_upload_data(uploader.url), stream.read())
+        tus_client.transport.close()
+
+    def test_async_read_timeout(self):
+        tus_client = client.TusClient(self.server.url, timeout=(5, 0.2))
+        self.server.pace("PATCH", latency=1.0)
+        uploader = tus_client.async_uploader(FILEPATH_BINARY, retries=1, retry_delay=1)
+        asyncio.run(uploader.upload())
+        self.assertEqual(
+            [r.status for r in self.server.records if r.method == "PATCH"][-1], 204
+        )
+
+
+    def test_async_write_timeout(self):
+        tus_client = client.TusClient(self.server.url, timeout=(5, 0.3))
+        # The server stops reading the body; the socket buffers fill up.
+        self.server.pace("PATCH", bandwidth=1)
+        data = b"x" * 32 * 1024 * 1024
+        uploader = tus_client.async_uploader(
+            file_stream=io.BytesIO(data), chunk_size=len(data), retry_delay=0
+        )
+        start = time.monotonic()
+        with pytest.raises(TusCommunicationError):
+            asyncio.run(uploader.upload())
+        self.assertLess(time.monotonic() - start, 3.0)
+
+
+class StallTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        # Large enough to fill the socket buffers, which hide slow servers at first.
+        self.data = b"x" * 8 * 1024 * 1024
+
+    def tearDown(self):
+        self.server.stop()
+
+    @parametrize("transport", [RequestsTransport, SendfileTransport])
+    def test_resumed_after_stall(self, transport):
+        tus_client = client.TusClient(self.server.url, transport=transport())
+        self.server.pace("PATCH", bandwidth=100 * 1024)
+        uploader = tus_client.uploader(
+            file_stream=io.BytesIO(self.data),
+            chunk_size=len(self.data),
+            min_rate=1024 * 1024,
+            stall_window=0.5,
+            retries=3,
+            retry_delay=0,
+        )
+        uploader.upload()
+
+        self.assertIn("HEAD", [r.method for r in self.server.records])
+        self.assertEqual(self.server.get_upload_data(uploader.url), self.data)
+        tus_client.transport.close()
+
+
+class CancelTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def cancel_later(self, uploader, delay):
+        timer = threading.Timer(delay, uploader.cancel)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def assert_cancelled(self, upload, uploader, within):
+        start = time.monotonic()
+        with pytest.raises(TusUploadCancelled):
+            upload()
+        self.assertLess(time.monotonic() - start, within)
+        self.assertTrue(uploader.cancelled)
+
+    def test_between_chunks(self):
+        self.server.latency = 0.1
+        uploader = self.client.uploader(FILEPATH_BINARY, chunk_size=1000)
+        self.cancel_later(uploader, 0.3)
+        self.assert_cancelled(uploader.upload, uploader, within=1.0)
+        # A cancelled uploader does not start again.
+        with pytest.raises(TusUploadCancelled):
+            uploader.upload_chunk()
+
+        # The upload can be resumed from where it stopped.
+        resumed = self.client.uploader(FILEPATH_BINARY, url=uploader.url, chunk_size=10000)
+        self.assertGreater(resumed.offset, 0)
+        resumed.upload()
+        with open(FILEPATH_BINARY, "rb") as stream:
+            self.assertEqual(self.server.get_upload_data(uploader.url), stream.read())
+
+    def test_while_sending(self):
+        self.client.bandwidth_limiter = BandwidthLimiter(rate=20000, burst=1000)
+        uploader = self.client.uploader(FILEPATH_BINARY)
+        self.cancel_later(uploader, 0.3)
+        self.assert_cancelled(uploader.upload, uploader, within=1.0)
+
+    def test_unwatched_body(self):
+        uploader = self.client.uploader(FILEPATH_BINARY, chunk_size=10000)
+        with mock.patch.object(
+            RequestsTransport, "request", autospec=True, side_effect=RequestsTransport.request
+        ) as request:
+            uploader.upload()
+        # Neither throttled nor watched for stalls: the chunks are sent as they are, and
+        # the upload can only be cancelled between them.
+        bodies = [call.kwargs["data"] for call in request.call_args_list[1:]]
+        self.assertTrue(bodies)
+        self.assertTrue(all(isinstance(body, bytes) for body in bodies))
+        self.assertIsNone(uploader.get_transfer_monitor(cancellable=True))
+
+    def test_during_retry_delay(self):
+        self.server.inject("error", status=503)
+        uploader = self.client.uploader(FILEPATH_BINARY, retries=1, retry_delay=30)
+        self.cancel_later(uploader, 0.2)
+        self.assert_cancelled(uploader.upload, uploader, within=1.0)
+
+    def test_async(self):
+        self.server.latency = 2.0
+        uploader = self.client.async_uploader(FILEPATH_BINARY)
+
+        async def upload():
+            asyncio.get_running_loop().call_later(0.2, uploader.cancel)
+            await uploader.upload()
+
+        self.assert_cancelled(lambda: asyncio.run(upload()), uploader, within=1.0)
+
+    def test_async_from_another_thread(self):
+        self.server.latency = 2.0
+        uploader = self.client.async_uploader(FILEPATH_BINARY)
+        self.cancel_later(uploader, 0.2)
+        self.assert_cancelled(lambda: asyncio.run(uploader.upload()), uploader, within=1.0)
@@ -0,0 +1,161 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from tusclient import client
+from tusclient.exceptions import TusLeaseLost
+from tusclient.fingerprint import fingerprint
+from tusclient.storage.sqlitestorage import SQLiteStorage
+from tusclient.testing import TusServer
+from tusclient.workers import Lease, upload_files
+
+
+def _worker(server_url, paths, db_path, owner):
+    storage = SQLiteStorage(db_path)
+    try:
+        report = upload_files(
+            client.TusClient(server_url), paths, storage, owner=owner,
+            poll_interval=0.05, chunk_size=4096, retry_delay=0,
+        )
+    finally:
+        storage.close()
+    return report.uploaded, report.skipped, {p: str(e) for p, e in report.errors.items()}
+
+
+class WorkersTest(unittest.TestCase):
+    def setUp(self):
+        self.server = TusServer().start()
+        self.client = client.TusClient(self.server.url)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "storage.db")
+        self.now = 1000.0
+        self.storage = SQLiteStorage(self.db_path, clock=lambda: self.now)
+        self.paths = []
+        for i, size in enumerate([10000, 0, 30000, 5, 20000, 100]):
+            path = os.path.join(self.tmp.name, "file{}".format(i))
+            with open(path, "wb") as stream:
+                stream.write(os.urandom(size))
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.storage.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def key(self, path):
+        with open(path, "rb") as stream:
+            return fingerprint.Fingerprint().get_fingerprint(stream)
+
+    def assert_uploaded_once(self):
+        self.assertEqual(len(self.server.uploads), len(self.paths))
+        contents = sorted(bytes(u.data) for u in self.server.uploads.values())
+        expected = []
+        for path in self.paths:
+            with open(path, "rb") as stream:
+                expected.append(stream.read())
+        self.assertEqual(contents, sorted(expected))
+
+    def test_upload_files(self):
+        report = upload_files(
+            self.client, self.paths, self.storage, owner="w", chunk_size=4096
+        )
+        self.assertEqual(report.uploaded, self.paths)
+        self.assertEqual(report.errors, {})
+        self.assert_uploaded_once()
+        for path in self.paths:
+            self.assertIsNotNone(self.storage.get_completed(self.key(path)))
+
+        report = upload_files(
+            self.client, self.paths, self.storage, owner="w", chunk_size=4096
+        )
+        self.assertEqual(report.uploaded, [])
+        self.assertEqual(report.skipped, self.paths)
+
+    def test_processes(self):
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(3) as pool:
+            results = pool.starmap(
+                _worker,
+                [(self.server.url, self.paths, self.db_path, "w{}".format(i)) for i in range(3)],
+            )
+        uploaded = [path for result in results for path in result[0]]
+        self.assertEqual(sorted(uploaded), sorted(self.paths))
+        for worker_uploaded, skipped, errors in results:
+            self.assertEqual(errors, {})
+            # Each worker waits for the files claimed by the others.
+            self.assertEqual(sorted(worker_uploaded + skipped), sorted(self.paths))
+        self.assert_uploaded_once()
+
+    def test_reassign_crashed_claim(self):
+        path = self.paths[2]
+        key = self.key(path)
+        # A worker created the upload and sent part of it before it crashed.
+        uploader = self.client.uploader(
+            path, chunk_size=4096, store_url=True, url_storage=self.storage
+        )
+        uploader.upload(stop_at=8192)
+        self.assertTrue(self.storage.claim(key, "crashed", 30))
+
+        self.now += 31
+        report = upload_files(self.client, [path], self.storage, owner="w")
+        self.assertEqual(report.uploaded, [path])
+        # The upload was resumed rather than started over.
+        self.assertEqual(len(self.server.uploads), 1)
+        with open(path, "rb") as stream:
+            self.assertEqual(self.server.get_upload_data(uploader.url), stream.read())
+
+    def test_wait_for_other_worker(self):
+        path = self.paths[0]
+        key = self.key(path)
+        self.assertTrue(self.storage.claim(key, "other", 30))
+
+        def finish():
+            time.sleep(0.2)
+            other = SQLiteStorage(self.db_path)
+            other.set_completed(key, "http://example.com/files/abc", 10000)
+            other.release(key, "other")
+            other.close()
+
+        thread = threading.Thread(target=finish)
+        thread.start()
+        report = upload_files(
+            self.client, [path], self.storage, owner="w", poll_interval=0.05
+        )
+        thread.join()
+        self.assertEqual(report.skipped, [path])
+        self.assertEqual(self.server.uploads, {})
+
+
+class LeaseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.tmp.name, "storage.db"))
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def test_heartbeat(self):
+        with Lease(self.storage, "key", "w1", ttl=0.2) as lease:
+            time.sleep(0.5)
+            # The lease outlived its ttl because it was renewed.
+            self.assertFalse(self.storage.claim("key", "w2", 0.2))
+            self.assertFalse(lease.lost)
+        self.assertTrue(self.storage.claim("key", "w2", 0.2))
+        with self.assertRaises(TusLeaseLost):
+            with Lease(self.storage, "key", "w1", ttl=0.2):
+                pass
+
+    def test_lost(self):
+        lease = Lease(self.storage, "key", "w1", ttl=10, interval=0.05)
+        self.assertTrue(lease.acquire())
+        # Another worker took the lease over, e.g. after w1 stalled.
+        self.storage.release("key", "w1")
+        self.assertTrue(self.storage.claim("key", "w2", 10))
+        time.sleep(0.2)
+        self.assertTrue(lease.lost)
+        lease.release()
+        self.assertFalse(self.storage.claim("key", "w1", 10))
@@ -0,0 +1,5 @@
+import sys
+
+from tusclient.cli import main
+
+sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Pool of reusable chunk buffers.
+
+Reading every chunk into a freshly allocated `bytes` object churns the allocator when
+chunks are large, and nothing bounds the memory held by many concurrent uploads. A
+<tusclient.bufferpool.BufferPool> hands out preallocated buffers that chunks are read
+into with `readinto`, takes them back once the chunk has been sent, and caps the total
+size of the buffers in use, so that uploads wait for a free buffer instead of
+allocating more.
+"""
+from typing import Dict, List, Optional
+import threading
+import time
+
+
+class BufferPool:
+    """
+    Thread-safe pool of `bytearray` buffers with a cap on the memory they use.
+
+    Buffers are kept per size, so uploaders sharing a pool should use the same
+    `chunk_size` to get the most reuse. Free buffers of other sizes are dropped when
+    their memory is needed for a new buffer.
+
+    :Attributes:
+        - max_memory (int):
+            The maximum number of bytes held by buffers, in use or free. A buffer larger
+            than this is still handed out when no other buffer is in use, so that a single
+            upload can always progress.
+    :Constructor Args:
+        - max_memory (int)
+    """
+
+    def __init__(self, max_memory: int):
+        if max_memory <= 0:
+            raise ValueError("'max_memory' must be positive.")
+        self.max_memory = max_memory
+        self._condition = threading.Condition()
+        self._free: Dict[int, List[bytearray]] = {}
+        self._free_bytes = 0
+        self._in_use_bytes = 0
+
+    @property
+    def in_use(self) -> int:
+        """The number of bytes held by buffers which are in use."""
+        return self._in_use_bytes
+
+    def acquire(self, size: int, timeout: Optional[float] = None) -> Optional[bytearray]:
+        """
+        Return a buffer of `size` bytes, waiting until enough memory is free.
+
+        :Args:
+            - size (int)
+            - timeout (Optional[float]):
+                The maximum number of seconds to wait, or None to wait as long as needed.
+        :Returns: bytearray, or None if no buffer became available within `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                free = self._free.get(size)
+                if free:
+                    buffer = free.pop()
+                    self._free_bytes -= size
+                    self._in_use_bytes += size
+                    return buffer
+                if self._in_use_bytes == 0 or self._in_use_bytes + size <= self.max_memory:
+                    self._evict(self._in_use_bytes + self._free_bytes + size - self.max_memory)
+                    self._in_use_bytes += size
+                    return bytearray(size)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def release(self, buffer: bytearray):
+        """Give a buffer obtained from `acquire` back to the pool."""
+        size = len(buffer)
+        with self._condition:
+            self._in_use_bytes -= size
+            if self._in_use_bytes + self._free_bytes + size <= self.max_memory:
+                self._free.setdefault(size, []).append(buffer)
+                self._free_bytes += size
+            self._condition.notify_all()
+
+    def _evict(self, excess: int):
+        """Drop free buffers until `excess` bytes have been freed, or none are left."""
+        for size in list(self._free):
+            free = self._free[size]
+            while free and excess > 0:
+                free.pop()
+                self._free_bytes -= size
+                excess -= size
+            if not free:
+                del self._free[size]
+
+
+def read_into(stream, buffer: memoryview) -> int:
+    """
+    Fill `buffer` from `stream` and return the number of bytes read, which is only
+    less than the size of the buffer at the end of the stream.
+
+    Streams without `readinto` are read with `read` and copied into the buffer.
+    """
+    readinto = getattr(stream, "readinto", None)
+    filled = 0
+    while filled < len(buffer):
+        if readinto is not None:
+            count = readinto(buffer[filled:])
+        else:
+            data = stream.read(len(buffer) - filled)
+            count = len(data)
+            buffer[filled : filled + count] = data
+        if not count:
+            break
+        filled += count
+    return filled
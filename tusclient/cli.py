@@ -0,0 +1,373 @@
+"""
+Command line bulk uploader.
+
+Uploads files, directories and glob patterns to a tus server, with several uploads in
+flight at once::
+
+    python -m tusclient https://tusd.tusdemo.net/files/ data/ 'logs/**/*.gz' \\
+        --parallel 8 --chunk-size 64M --storage uploads.db --summary summary.json
+
+With `--storage`, interrupted uploads are resumed and completed ones skipped when the
+command is run again. The storage is an SQLite database (see
+<tusclient.storage.sqlitestorage.SQLiteStorage>), which records each URL with a single
+row update and may be shared by several runs at once. Files ending in `.json` are opened
+as a <tusclient.storage.filestorage.FileStorage> instead, for storages written by
+earlier versions; that one rewrites the whole file for every upload and is only suited
+to small runs. Live throughput is shown on stderr when it is a terminal (see
+`--progress`). The exit status is 0 if all files were uploaded, 1 if any failed and 2
+for invalid arguments.
+"""
+from typing import Dict, Iterable, List, Optional
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import tusclient
+from tusclient.bufferpool import BufferPool
+from tusclient.client import TusClient
+from tusclient.limiter import BandwidthLimiter
+from tusclient.resume import resume_uploaders
+from tusclient.scheduler import POLICIES
+from tusclient.storage.interface import Storage
+
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+TRANSPORTS = ("sendfile", "urllib3", "requests", "httpx")
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a size in bytes such as "512", "64K", "8M", "8MiB" or "1G" (binary units).
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([KMGT]?)(?:i?B)?\s*", value, re.IGNORECASE)
+    if match is None:
+        raise argparse.ArgumentTypeError("invalid size: {!r}".format(value))
+    return int(match.group(1)) * SIZE_UNITS[match.group(2).upper()]
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024:
+            return "{:.1f} {}".format(size, unit)
+        size /= 1024
+    return "{:.1f} TiB".format(size)
+
+
+def parse_header(value: str):
+    name, sep, header_value = value.partition(":")
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError("invalid header: {!r}".format(value))
+    return name.strip(), header_value.strip()
+
+
+def find_files(patterns: Iterable[str]) -> List[str]:
+    """
+    Return the files designated by paths, directories (searched recursively) and glob
+    patterns, in order and without duplicates.
+    """
+    files = []
+    seen = set()
+
+    def add(path):
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    add(os.path.join(root, name))
+        elif os.path.isfile(path) and path not in seen:
+            seen.add(path)
+            files.append(path)
+
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                add(path)
+        elif os.path.exists(pattern):
+            add(pattern)
+        else:
+            raise FileNotFoundError("no such file or directory: {}".format(pattern))
+    return files
+
+
+def make_transport(name: str):
+    if name == "sendfile":
+        from tusclient.transport.sendfiletransport import SendfileTransport
+
+        return SendfileTransport()
+    if name == "urllib3":
+        from tusclient.transport.urllib3transport import Urllib3Transport
+
+        return Urllib3Transport()
+    if name == "httpx":
+        from tusclient.transport.httpxtransport import HttpxTransport
+
+        return HttpxTransport()
+    from tusclient.transport.requeststransport import RequestsTransport
+
+    return RequestsTransport()
+
+
+def open_storage(path: str) -> Storage:
+    if path.lower().endswith(".json"):
+        from tusclient.storage.filestorage import FileStorage
+
+        return FileStorage(path)
+    from tusclient.storage.sqlitestorage import SQLiteStorage
+
+    return SQLiteStorage(path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="tuspy", description="Upload files to a tus server."
+    )
+    parser.add_argument("url", help="the creation url of the tus server")
+    parser.add_argument(
+        "paths", nargs="+", help="files, directories or glob patterns to upload"
+    )
+    parser.add_argument(
+        "-j", "--parallel", type=int, default=4, help="uploads in flight at once (4)"
+    )
+    parser.add_argument(
+        "--per-host", type=int, help="maximum requests in flight to the server"
+    )
+    parser.add_argument(
+        "-c", "--chunk-size", type=parse_size, default=parse_size("16M"),
+        help="size of the PATCH requests, e.g. 64M (16M)",
+    )
+    parser.add_argument(
+        "--policy", choices=POLICIES, default="fifo", help="order of the uploads (fifo)"
+    )
+    parser.add_argument(
+        "--read-ahead", type=int,
+        help="chunks read ahead per upload (default: 1 when chunks have to be read, "
+        "0 when the transport can send them with sendfile)",
+    )
+    parser.add_argument(
+        "--storage",
+        help="SQLite database to store upload urls in, to resume and skip uploads "
+        "(a JSON file if it ends in .json)",
+    )
+    parser.add_argument(
+        "-H", "--header", type=parse_header, action="append", default=[],
+        help="extra request header, e.g. 'Authorization: Bearer ...'",
+    )
+    parser.add_argument("--retries", type=int, default=3, help="retries per chunk (3)")
+    parser.add_argument(
+        "--retry-delay", type=float, default=5, help="seconds between retries (5)"
+    )
+    parser.add_argument(
+        "--rate", type=parse_size, help="bandwidth limit in bytes per second, e.g. 10M"
+    )
+    parser.add_argument(
+        "--checksum", action="store_true", help="send an Upload-Checksum per chunk"
+    )
+    parser.add_argument(
+        "--digest", metavar="ALGORITHM",
+        help="compute a whole-file digest (e.g. sha256) and report it in the summary",
+    )
+    parser.add_argument(
+        "--transport", choices=TRANSPORTS, default="sendfile",
+        help="HTTP implementation (sendfile)",
+    )
+    parser.add_argument(
+        "--insecure", action="store_true", help="do not verify TLS certificates"
+    )
+    parser.add_argument(
+        "--summary", metavar="FILE", help="write a JSON summary to FILE ('-' for stdout)"
+    )
+    parser.add_argument(
+        "--progress", action="store_true", default=None,
+        help="show live throughput on stderr (default: if it is a terminal)",
+    )
+    parser.add_argument("--no-progress", action="store_false", dest="progress")
+    parser.add_argument("--version", action="version", version=tusclient.__version__)
+    return parser
+
+
+class Progress:
+    """
+    Periodically writes the number of finished files, the bytes sent and the current
+    throughput to a stream.
+    """
+
+    INTERVAL = 0.5
+
+    def __init__(self, uploaders: list, total: int, stream=None):
+        self._uploaders = uploaders
+        self._initial = [uploader.offset for uploader in uploaders]
+        self._total = total
+        self._stream = stream or sys.stderr
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sent(self) -> int:
+        return sum(u.offset - o for u, o in zip(self._uploaders, self._initial))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._write(self.sent(), None)
+        self._stream.write("\n")
+        self._stream.flush()
+
+    def _run(self):
+        last_time, last_sent = time.monotonic(), 0
+        while not self._stop.wait(self.INTERVAL):
+            now, sent = time.monotonic(), self.sent()
+            self._write(sent, (sent - last_sent) / (now - last_time))
+            last_time, last_sent = now, sent
+
+    def _write(self, sent: int, rate: Optional[float]):
+        finished = sum(1 for uploader in self._uploaders if uploader.completed)
+        line = "{}/{} files  {} / {}".format(
+            finished, len(self._uploaders), format_size(sent), format_size(self._total)
+        )
+        if rate is not None:
+            line += "  {}/s".format(format_size(rate))
+        self._stream.write("\r\033[K" + line)
+        self._stream.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.parallel < 1:
+        parser.error("--parallel must be at least 1")
+    try:
+        paths = find_files(args.paths)
+    except FileNotFoundError as error:
+        parser.error(str(error))
+
+    transport = make_transport(args.transport)
+    if args.read_ahead is None:
+        # Chunks read ahead are in memory already, so they are not sent with sendfile.
+        reads_chunks = args.checksum or args.digest or not transport.supports_sendfile
+        args.read_ahead = 1 if reads_chunks else 0
+    tus_client = TusClient(
+        args.url,
+        headers=dict(args.header),
+        transport=transport,
+        bandwidth_limiter=BandwidthLimiter(args.rate) if args.rate else None,
+        buffer_pool=BufferPool(args.parallel * (args.read_ahead + 2) * args.chunk_size),
+    )
+    storage = None
+    if args.storage:
+        storage = open_storage(args.storage)
+    try:
+        return run(args, tus_client, storage, paths)
+    finally:
+        tus_client.transport.close()
+        if storage is not None:
+            storage.close()
+
+
+def run(args, tus_client: TusClient, storage: Optional[Storage], paths: List[str]) -> int:
+    started = time.monotonic()
+    results: Dict[str, dict] = {}
+    uploaders = []
+    for path in paths:
+        try:
+            uploaders.append(
+                tus_client.uploader(
+                    path,
+                    chunk_size=args.chunk_size,
+                    metadata={"filename": os.path.basename(path)},
+                    retries=args.retries,
+                    retry_delay=args.retry_delay,
+                    verify_tls_cert=not args.insecure,
+                    store_url=storage is not None,
+                    url_storage=storage,
+                    upload_checksum=args.checksum,
+                    read_ahead=args.read_ahead,
+                    resolve_offset=False,
+                    digest_algorithm=args.digest,
+                )
+            )
+        except Exception as error:
+            results[path] = {"path": path, "status": "failed", "error": str(error)}
+
+    # Stored uploads are probed all at once rather than one by one.
+    report = resume_uploaders(uploaders, max_workers=args.parallel * 4)
+    for uploader, error in report.errors.items():
+        results[uploader.file_path] = {
+            "path": uploader.file_path, "status": "failed", "error": str(error)
+        }
+    pending = [u for u in uploaders if u.file_path not in results]
+
+    total = sum(u.file_size - u.offset for u in pending if not u.completed)
+    show_progress = args.progress if args.progress is not None else sys.stderr.isatty()
+    progress = Progress(pending, total) if show_progress else None
+    if progress is not None:
+        progress.start()
+
+    jobs = []
+    with tus_client.scheduler(
+        max_workers=args.parallel, per_host=args.per_host, policy=args.policy
+    ) as scheduler:
+        for uploader in pending:
+            if uploader.completed:
+                results[uploader.file_path] = summarize(uploader, "skipped")
+                continue
+            jobs.append((uploader, scheduler.submit(uploader), uploader.offset))
+    if progress is not None:
+        progress.stop()
+
+    for uploader, job, initial in jobs:
+        error = job.future.exception()
+        if error is None:
+            results[uploader.file_path] = summarize(
+                uploader, "uploaded", sent=uploader.offset - initial
+            )
+        else:
+            results[uploader.file_path] = dict(
+                summarize(uploader, "failed"), error=str(error)
+            )
+
+    elapsed = time.monotonic() - started
+    files = [results[path] for path in paths]
+    sent = sum(result.get("sent", 0) for result in files)
+    summary = {
+        "files": files,
+        "uploaded": sum(1 for result in files if result["status"] == "uploaded"),
+        "skipped": sum(1 for result in files if result["status"] == "skipped"),
+        "failed": sum(1 for result in files if result["status"] == "failed"),
+        "bytes_sent": sent,
+        "seconds": round(elapsed, 3),
+        "throughput": round(sent / elapsed) if elapsed else 0,
+    }
+    write_summary(args.summary, summary)
+    return 1 if summary["failed"] else 0
+
+
+def summarize(uploader, status: str, sent: int = 0) -> dict:
+    result = {
+        "path": uploader.file_path,
+        "status": status,
+        "url": uploader.url,
+        "size": uploader.file_size,
+        "sent": sent,
+    }
+    if uploader.digest_algorithm:
+        result["digest"] = uploader.digest
+        result["digest_algorithm"] = uploader.digest_algorithm
+    return result
+
+
+def write_summary(path: Optional[str], summary: dict):
+    if path is None:
+        return
+    if path == "-":
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    with open(path, "w") as stream:
+        json.dump(summary, stream, indent=2)
@@ -1,6 +1,18 @@
-from typing import Dict, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from tusclient.uploader import Uploader, AsyncUploader
+from tusclient.bufferpool import BufferPool
+from tusclient.endpoints import EndpointSelector
+from tusclient.limiter import BandwidthLimiter
+from tusclient.scheduler import UploadScheduler
+from tusclient.tls import SSLContextCache
+from tusclient.trace import Tracer
+from tusclient.transport.interface import (
+    DEFAULT_TIMEOUTS,
+    AsyncTransport,
+    Transport,
+    TimeoutsType,
+)
 
 
 class TusClient:
@@ -10,7 +22,12 @@ class TusClient:
     :Attributes:
         - url (str):
             represents the tus server's create extension url. On instantiation this argument
-            must be passed to the constructor.
+            must be passed to the constructor. A list of several creation urls, e.g. of
+            server replicas, may be passed instead, see `endpoints`; `url` is then the first.
+        - endpoints (Optional[<tusclient.endpoints.EndpointSelector>]):
+            With several creation urls, the selector ranking them by latency and error rate.
+            Each new upload is created on the best endpoint, failing over to the next ones
+            if the creation request fails. None with a single url.
         - headers (dict):
             This can be used to set the server specific headers. These headers would be sent
             along with every request made by the cleint to the server. This may be used to set
@@ -21,16 +38,113 @@ class TusClient:
             key file. The PEM encoded key of the certificate can either be included in the
             certificate itself or be provided in a seperate file.
             Only unencrypted keys are supported!
+        - bandwidth_limiter (<tusclient.limiter.BandwidthLimiter>):
+            If set, the upload data sent by all uploaders of this client, sync and async,
+            is throttled by this limiter. The same limiter may also be shared between
+            several clients.
+        - buffer_pool (<tusclient.bufferpool.BufferPool>):
+            If set, the chunks of all uploaders of this client are read into buffers of this
+            pool with `readinto`, instead of into new `bytes` objects, and uploaders wait for a
+            free buffer once the memory cap of the pool is reached. The same pool may also be
+            shared between several clients. Chunks larger than the cap are read as without a
+            pool.
+        - transport (<tusclient.transport.interface.Transport>):
+            The transport performing the HTTP requests of the client's uploaders. Defaults to
+            a <tusclient.transport.requeststransport.RequestsTransport>. Other implementations
+            are available in the `tusclient.transport` package, and custom ones can be written
+            by implementing the interface. The default transport is only created, and
+            `requests` imported, when it is first used.
+        - async_transport (<tusclient.transport.interface.AsyncTransport>):
+            The transport performing the HTTP requests of the client's async uploaders.
+            Defaults to a <tusclient.transport.aiohttptransport.AiohttpTransport>, created when
+            first used, so that sync-only users never import `aiohttp`.
+        - ssl_contexts (<tusclient.tls.SSLContextCache>):
+            The SSL contexts shared by both transports, so that the TLS configuration and
+            the client certificate are loaded once rather than for every request.
+        - tracer (Optional[<tusclient.trace.Tracer>]):
+            If set, every request and retry decision of the client's uploaders is written
+            to this tracer, see <tusclient.trace>.
+        - timeout (float | Tuple[float, float] | <tusclient.transport.interface.Timeouts>):
+            The connect and read timeouts of the default transports, in seconds, see
+            <tusclient.transport.interface.Timeouts>. Transports passed to the client
+            use their own timeouts. Defaults to
+            <tusclient.transport.interface.DEFAULT_TIMEOUTS>.
     :Constructor Args:
-        - url (str)
+        - url (str | List[str])
         - headers (Optiional[dict])
         - client_cert (Optional[str | Tuple[str, str]])
+        - bandwidth_limiter (Optional[<tusclient.limiter.BandwidthLimiter>])
+        - buffer_pool (Optional[<tusclient.bufferpool.BufferPool>])
+        - transport (Optional[<tusclient.transport.interface.Transport>])
+        - async_transport (Optional[<tusclient.transport.interface.AsyncTransport>])
+        - tracer (Optional[<tusclient.trace.Tracer>])
+        - timeout (Optional[float | Tuple[float, float] | <tusclient.transport.interface.Timeouts>])
     """
 
-    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, client_cert: Optional[Union[str, Tuple[str, str]]] = None):
-        self.url = url
+    def __init__(
+        self,
+        url: Union[str, List[str]],
+        headers: Optional[Dict[str, str]] = None,
+        client_cert: Optional[Union[str, Tuple[str, str]]] = None,
+        bandwidth_limiter: Optional[BandwidthLimiter] = None,
+        transport: Optional[Transport] = None,
+        async_transport: Optional[AsyncTransport] = None,
+        buffer_pool: Optional[BufferPool] = None,
+        tracer: Optional[Tracer] = None,
+        timeout: TimeoutsType = DEFAULT_TIMEOUTS,
+    ):
+        if isinstance(url, str):
+            self.url = url
+            self.endpoints = None
+        else:
+            self.endpoints = EndpointSelector(list(url))
+            self.url = self.endpoints.endpoints[0].url
         self.headers = headers or {}
         self.client_cert = client_cert
+        self.bandwidth_limiter = bandwidth_limiter
+        self.buffer_pool = buffer_pool
+        self.tracer = tracer
+        self.timeout = timeout
+        transports = [t for t in (transport, async_transport) if t is not None]
+        self.ssl_contexts = next(
+            (t.ssl_contexts for t in transports if getattr(t, "ssl_contexts", None)),
+            None,
+        ) or SSLContextCache()
+        # The default transports are created when first used, so that their HTTP
+        # libraries are only imported if needed.
+        self._transport = None
+        self._async_transport = None
+        self.transport = transport
+        self.async_transport = async_transport
+
+    @property
+    def transport(self) -> Transport:
+        if self._transport is None:
+            from tusclient.transport.requeststransport import RequestsTransport
+
+            self.transport = RequestsTransport(timeout=self.timeout)
+        return self._transport
+
+    @transport.setter
+    def transport(self, transport: Optional[Transport]):
+        self._transport = self._share_ssl_contexts(transport)
+
+    @property
+    def async_transport(self) -> AsyncTransport:
+        if self._async_transport is None:
+            from tusclient.transport.aiohttptransport import AiohttpTransport
+
+            self.async_transport = AiohttpTransport(timeout=self.timeout)
+        return self._async_transport
+
+    @async_transport.setter
+    def async_transport(self, transport: Optional[AsyncTransport]):
+        self._async_transport = self._share_ssl_contexts(transport)
+
+    def _share_ssl_contexts(self, transport):
+        if transport is not None and getattr(transport, "ssl_contexts", None) is None:
+            transport.ssl_contexts = self.ssl_contexts
+        return transport
 
     def set_headers(self, headers: Dict[str, str]):
         """
@@ -61,3 +175,16 @@ class TusClient:
     def async_uploader(self, *args, **kwargs) -> AsyncUploader:
         kwargs["client"] = self
         return AsyncUploader(*args, **kwargs)
+
+    def scheduler(self, *args, **kwargs) -> UploadScheduler:
+        """
+        Return a scheduler running many uploads concurrently, by priority and policy.
+
+        Uploaders created with `uploader` are submitted to it with
+        `UploadScheduler.submit`. A scheduler may run uploaders of several clients, in
+        which case its per-host limits apply to each of their endpoints.
+
+        :Args:
+            see tusclient.scheduler.UploadScheduler for the optional arguments.
+        """
+        return UploadScheduler(*args, **kwargs)
@@ -0,0 +1,108 @@
+"""
+Uploads of a file in parts, with the concatenation extension of the tus protocol.
+
+A large file on storage shared by several machines can be uploaded by all of them at
+once: each machine uploads some byte ranges of the file as partial uploads with
+<tusclient.concat.upload_range>, and a coordinator gathers the urls of the parts and
+concatenates them into the final upload with <tusclient.concat.concatenate>. The server
+must support the `concatenation` extension.
+
+.. code:: python
+
+    ranges = split_range(os.path.getsize(path), parts=8)
+    # On each machine, for its share of the ranges:
+    url = upload_range(client, path, *ranges[i], chunk_size=64 * 1024 * 1024)
+    # On the coordinator, with the urls of all parts, in order:
+    final_url = concatenate(client, urls, metadata={"filename": "data.bin"})
+"""
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urljoin
+
+from tusclient.exceptions import TusCommunicationError
+from tusclient.streams import FileSection
+from tusclient.uploader.baseuploader import BaseUploader, encode_metadata
+
+if TYPE_CHECKING:
+    from tusclient.client import TusClient
+
+
+def split_range(size: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split `size` bytes into `parts` contiguous ranges of nearly equal sizes.
+
+    :Returns: list of (start, end) pairs, `end` being exclusive.
+    """
+    if parts < 1:
+        raise ValueError("'parts' must be at least 1.")
+    bounds = [size * i // parts for i in range(parts + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def upload_range(
+    client: "TusClient", file_path: str, start: int, end: int, **uploader_kwargs
+) -> str:
+    """
+    Upload the bytes [start, end) of a file as a partial upload, and return its url.
+
+    The range is uploaded like a whole file, by an uploader with `partial=True` reading a
+    <tusclient.streams.FileSection> of the file, so transports supporting it send it with
+    `sendfile`. The range is clamped to the end of the file.
+
+    :Args:
+        - client (<tusclient.client.TusClient>)
+        - file_path (str)
+        - start (int)
+        - end (int)
+        - uploader_kwargs: Further arguments of the uploader, e.g. `chunk_size`.
+    :Returns: str, the url of the partial upload.
+    """
+    if end < start:
+        raise ValueError("The end of the range cannot be before its start.")
+    with open(file_path, "rb") as stream:
+        uploader = client.uploader(
+            file_stream=FileSection(stream, start, end - start),
+            partial=True,
+            **uploader_kwargs
+        )
+        uploader.upload()
+    return uploader.url
+
+
+def concatenate(
+    client: "TusClient",
+    urls: List[str],
+    metadata: Optional[Dict] = None,
+    metadata_encoding: str = "utf-8",
+    verify_tls_cert: bool = True,
+) -> str:
+    """
+    Create the final upload made of the given partial uploads, in order, and return
+    its url.
+
+    The partial uploads must be finished. The final upload is created on the client's
+    creation url, which must be on the same server as the partial uploads.
+
+    :Args:
+        - client (<tusclient.client.TusClient>)
+        - urls (list[str]): The urls of the partial uploads.
+        - metadata (Optional[dict]): The metadata of the final upload.
+        - metadata_encoding (str): Defaults to 'utf-8'.
+        - verify_tls_cert (bool): Whether or not to verify the TLS certificate of the server.
+    :Returns: str, the url of the final upload.
+    """
+    if not urls:
+        raise ValueError("At least one partial upload is required.")
+    headers = dict(BaseUploader.DEFAULT_HEADERS, **client.headers)
+    headers["upload-concat"] = "final;" + " ".join(urls)
+    if metadata:
+        headers["upload-metadata"] = ",".join(encode_metadata(metadata, metadata_encoding))
+    resp = client.transport.request(
+        "POST", client.url, headers, verify=verify_tls_cert, cert=client.client_cert
+    )
+    location = resp.headers.get("location")
+    if not 200 <= resp.status_code < 300 or location is None:
+        msg = "Attempt to concatenate the partial uploads fails with status {}".format(
+            resp.status_code
+        )
+        raise TusCommunicationError(msg, resp.status_code, resp.content)
+    return urljoin(client.url, location)
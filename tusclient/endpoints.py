@@ -0,0 +1,127 @@
+"""
+Selection between several creation endpoints.
+
+A <tusclient.client.TusClient> configured with several creation urls, e.g. of tus
+server replicas, creates each new upload on the endpoint which currently looks best,
+according to a moving average of the latency and error rate of its creation requests.
+Endpoints failing too often are ejected for a while. Once created, an upload stays on
+its endpoint, as its url points there.
+"""
+from typing import Callable, List, Optional
+import threading
+import time
+
+
+class Endpoint:
+    """
+    Health statistics of a creation endpoint.
+
+    :Attributes:
+        - url (str): The creation url of the endpoint.
+        - latency (Optional[float]):
+            The exponentially weighted moving average of the duration of successful
+            creation requests, in seconds. None until one has succeeded.
+        - error_rate (float):
+            The exponentially weighted moving average of the share of failed requests.
+        - ejected_until (float):
+            The time (of the selector's clock) until which the endpoint is not selected.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.ejected_until = 0.0
+
+    def __repr__(self):
+        return "Endpoint({!r}, latency={}, error_rate={:.2f})".format(
+            self.url, self.latency, self.error_rate
+        )
+
+
+class EndpointSelector:
+    """
+    Thread-safe ranking of creation endpoints by observed latency and error rate.
+
+    Endpoints without any successful request yet are tried first, in the configured
+    order. The others are ranked by their average latency divided by their success
+    rate. An endpoint whose error rate rises above `max_error_rate` is ejected for
+    `ejection_time` seconds; after that it is tried again, and ejected again right
+    away if its next request fails.
+
+    :Attributes:
+        - endpoints (list[<tusclient.endpoints.Endpoint>])
+        - alpha (float):
+            The weight of the latest observation in the moving averages, between 0 and 1.
+        - max_error_rate (float)
+        - ejection_time (float)
+    :Constructor Args:
+        - urls (list[str])
+        - alpha (Optional[float]): Defaults to 0.3.
+        - max_error_rate (Optional[float]): Defaults to 0.5, i.e. two failures in a row.
+        - ejection_time (Optional[float]): Defaults to 30 seconds.
+        - clock (Optional[Callable[[], float]]): Defaults to `time.monotonic`.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        alpha: float = 0.3,
+        max_error_rate: float = 0.5,
+        ejection_time: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not urls:
+            raise ValueError("At least one endpoint url is required.")
+        if not 0 < alpha <= 1:
+            raise ValueError("'alpha' must be between 0 and 1.")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.ejection_time = ejection_time
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def candidates(self) -> List[str]:
+        """
+        Return the urls of the endpoints from best to worst, ejected ones last (by the
+        end of their ejection), so that a creation request can fail over to the next.
+        """
+        now = self._clock()
+        with self._lock:
+            available = [e for e in self.endpoints if e.ejected_until <= now]
+            ejected = [e for e in self.endpoints if e.ejected_until > now]
+            untried = [e for e in available if e.latency is None]
+            ranked = sorted(
+                (e for e in available if e.latency is not None), key=self._cost
+            )
+            ejected.sort(key=lambda e: e.ejected_until)
+        return [e.url for e in untried + ranked + ejected]
+
+    def select(self) -> str:
+        """Return the url of the best endpoint."""
+        return self.candidates()[0]
+
+    def record(self, url: str, latency: Optional[float] = None, success: bool = True):
+        """
+        Record the outcome of a request to the endpoint with the given url.
+
+        :Args:
+            - url (str)
+            - latency (Optional[float]): The duration of the request, if it succeeded.
+            - success (bool)
+        """
+        with self._lock:
+            endpoint = next(e for e in self.endpoints if e.url == url)
+            endpoint.error_rate += self.alpha * ((0.0 if success else 1.0) - endpoint.error_rate)
+            if success and latency is not None:
+                if endpoint.latency is None:
+                    endpoint.latency = latency
+                else:
+                    endpoint.latency += self.alpha * (latency - endpoint.latency)
+            if not success and endpoint.error_rate > self.max_error_rate:
+                endpoint.ejected_until = self._clock() + self.ejection_time
+
+    @staticmethod
+    def _cost(endpoint: Endpoint) -> float:
+        return endpoint.latency / max(1.0 - endpoint.error_rate, 0.01)
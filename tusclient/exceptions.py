@@ -33,3 +33,25 @@ class TusCommunicationError(Exception):
 
 class TusUploadFailed(TusCommunicationError):
     """Should be raised when an attempted upload fails"""
+
+
+class TusLeaseLost(Exception):
+    """
+    Should be raised when a worker's lease on an upload expired and was taken by
+    another worker, which then continues the upload.
+    """
+
+
+class TusUploadStalled(TusCommunicationError):
+    """
+    Should be raised when the data of a request is sent slower than the minimum rate
+    of the uploader (see `min_rate`). The request is aborted, and retried like any
+    failed request.
+    """
+
+
+class TusUploadCancelled(Exception):
+    """
+    Should be raised when an upload stops because it was cancelled, see
+    <tusclient.uploader.baseuploader.BaseUploader.cancel>.
+    """
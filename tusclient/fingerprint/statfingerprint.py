@@ -0,0 +1,37 @@
+"""
+An implementation of <tusclient.fingerprint.interface.Fingerprint>, based on the
+metadata of a file rather than its content.
+"""
+from typing import IO
+import os
+
+from . import interface
+
+
+def stat_key(device: int, inode: int, size: int, mtime_ns: int) -> str:
+    """
+    Return the fingerprint of a file from its `stat` metadata, which changes when the
+    file is replaced or modified. Inode numbers are only unique within a device.
+    """
+    return "device:{}--inode:{}--size:{}--mtime:{}".format(device, inode, size, mtime_ns)
+
+
+class StatFingerprint(interface.Fingerprint):
+    """
+    Fingerprint made of the device, inode, size and modification time of a file. Hard
+    links of a file share its fingerprint.
+
+    Unlike <tusclient.fingerprint.fingerprint.Fingerprint>, nothing is read from the
+    file, but only streams of actual files, with a `fileno`, are supported.
+    """
+
+    def get_fingerprint(self, fs: IO):
+        """
+        Return a unique fingerprint string value based on the file stream recevied
+
+        :Args:
+            - fs[IO]: The file stream instance of the file for which a fingerprint would be generated.
+        :Returns: fingerprint[str]
+        """
+        stat = os.fstat(fs.fileno())
+        return stat_key(stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,617 @@
+"""
+Durable queue of uploads, drained by background workers.
+
+Files enqueued in an <tusclient.jobqueue.UploadQueue> are kept in an SQLite database
+until they are uploaded, so that the queue survives crashes and restarts of the
+application. A <tusclient.jobqueue.QueueWorkers> pool drains it in background threads,
+sharing the connections of one client, and any number of processes may drain the same
+database.
+
+Jobs are delivered at least once. A worker receiving a job makes it invisible to the
+others for a visibility timeout, which it extends while the upload runs, and deletes
+the job once the file is uploaded. The jobs of workers which crash become visible again
+once their timeout expires, and are delivered to another worker, which resumes the
+upload from the url stored in the queue. Files found uploaded already, e.g. by a worker
+which crashed before deleting its job, are not uploaded again, and jobs of the same file
+wait for each other rather than uploading it at once. The records of finished uploads and
+failed jobs are kept until they are purged.
+"""
+from typing import (
+    Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union,
+    TYPE_CHECKING,
+)
+import itertools
+import json
+import threading
+import time
+
+from tusclient.exceptions import TusUploadCancelled
+from tusclient.fingerprint import fingerprint, interface
+from tusclient.storage.sqlitestorage import SQLiteStorage
+from tusclient.workers import default_owner
+
+if TYPE_CHECKING:
+    from tusclient.client import TusClient
+
+
+DEFAULT_VISIBILITY_TIMEOUT = 60.0
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Job(NamedTuple):
+    """
+    A file to upload, as received from an <tusclient.jobqueue.UploadQueue>.
+
+    :Attributes:
+        - id (int): The id of the job in the queue.
+        - path (str): The path of the file.
+        - metadata (dict): The upload metadata of the file.
+        - attempts (int): The number of times the job was delivered, this one included.
+        - owner (Optional[str]): The worker the job was delivered to.
+        - error (Optional[str]): Why the last attempt failed, if it did.
+    """
+
+    id: int
+    path: str
+    metadata: Dict[str, str]
+    attempts: int
+    owner: Optional[str]
+    error: Optional[str]
+
+
+class UploadQueue(SQLiteStorage):
+    """
+    Queue of files to upload, kept in an SQLite database.
+
+    The queue is also a <tusclient.storage.sqlitestorage.SQLiteStorage>, which uploaders
+    of its jobs use as url storage, so that uploads interrupted along with their worker
+    are resumed by the next one. Like the storage, it may be opened by several
+    processes and shared by several threads.
+
+    Jobs are received in the order they became visible. Receiving, counting and listing
+    jobs only reads the jobs concerned from the database, so that queues of millions of
+    files are never loaded into memory.
+
+    Acknowledged jobs are deleted at once, but the url storage keeps the records of their
+    uploads, so that files enqueued again are found uploaded, and failed jobs are kept to
+    be retried. Both are deleted by `purge`.
+
+    :Constructor Args:
+        - path (str): The path of the database file.
+        - timeout (Optional[float]):
+            The number of seconds to wait for the database to be unlocked. Defaults to 30.
+        - clock (Optional[Callable[[], float]]):
+            The clock of the visibility timeouts. It must agree between all processes
+            sharing the queue. Defaults to `time.time`.
+    """
+
+    def __init__(
+        self, path: str, timeout: float = 30.0, clock: Callable[[], float] = time.time
+    ):
+        super().__init__(path, timeout=timeout, clock=clock)
+        with self._lock, self._transaction():
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "path TEXT NOT NULL, metadata TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, visible REAL NOT NULL, owner TEXT, "
+                "failed INTEGER NOT NULL DEFAULT 0, error TEXT)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_visible ON jobs (failed, visible, id)"
+            )
+            # When the records of each file in the url storage were last written.
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS activity (key TEXT PRIMARY KEY, time REAL NOT NULL)"
+            )
+
+    def enqueue(
+        self, path: str, metadata: Optional[Dict[str, str]] = None, delay: float = 0.0
+    ) -> int:
+        """
+        Add a file to the queue.
+
+        :Args:
+            - path[str]: The path of the file.
+            - metadata[Optional[dict]]: The upload metadata of the file.
+            - delay[float]: The number of seconds before the job becomes visible.
+        :Returns: int, the id of the job.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (path, metadata, visible) VALUES (?, ?, ?)",
+                (path, json.dumps(metadata or {}), self._clock() + delay),
+            )
+        return cursor.lastrowid
+
+    def enqueue_many(
+        self,
+        files: Iterable[Union[str, Tuple[str, Dict[str, str]]]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """
+        Add files to the queue, as paths or (path, metadata) pairs.
+
+        The files are consumed lazily and inserted in transactions of `batch_size`
+        files, so that generators of any length may be enqueued.
+
+        :Returns: int, the number of files enqueued.
+        """
+        if batch_size < 1:
+            raise ValueError("'batch_size' must be at least 1.")
+        files = iter(files)
+        count = 0
+        while True:
+            batch = list(itertools.islice(files, batch_size))
+            if not batch:
+                return count
+            rows = []
+            for item in batch:
+                path, metadata = (item, None) if isinstance(item, str) else item
+                rows.append((path, json.dumps(metadata or {})))
+            with self._lock, self._transaction():
+                now = self._clock()
+                self._db.executemany(
+                    "INSERT INTO jobs (path, metadata, visible) VALUES (?, ?, ?)",
+                    [row + (now,) for row in rows],
+                )
+            count += len(rows)
+
+    def receive(
+        self,
+        owner: str,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+        limit: int = 1,
+    ) -> List[Job]:
+        """
+        Take up to `limit` visible jobs, and hide them from other workers for
+        `visibility_timeout` seconds.
+
+        Unless it is deleted with `ack` before, or its timeout is extended with `extend`,
+        a job becomes visible again once its timeout expires, and is delivered again.
+
+        :Args:
+            - owner[str]: The unique id of the worker receiving the jobs.
+            - visibility_timeout[float]
+            - limit[int]
+        :Returns: list[<tusclient.jobqueue.Job>], empty if no job is visible.
+        """
+        with self._lock, self._transaction(immediate=True):
+            now = self._clock()
+            rows = self._db.execute(
+                "SELECT id, path, metadata, attempts, error FROM jobs "
+                "WHERE failed = 0 AND visible <= ? ORDER BY visible, id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE jobs SET visible = ?, owner = ?, attempts = attempts + 1 WHERE id = ?",
+                [(now + visibility_timeout, owner, row[0]) for row in rows],
+            )
+        return [
+            Job(job_id, path, json.loads(metadata), attempts + 1, owner, error)
+            for job_id, path, metadata, attempts, error in rows
+        ]
+
+    def extend(self, job: Job, visibility_timeout: float) -> bool:
+        """
+        Keep a received job hidden for `visibility_timeout` seconds from now.
+
+        :Returns: bool, False if the job was lost, i.e. its timeout expired and it was
+            delivered again, or it was deleted.
+        """
+        return self._update_delivery(
+            job, "visible = ?", (self._clock() + visibility_timeout,)
+        )
+
+    def ack(self, job: Job) -> bool:
+        """
+        Delete a received job, once it is done.
+
+        :Returns: bool, False if the job was lost and may be delivered again.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE id = ? AND owner = ? AND attempts = ?",
+                (job.id, job.owner, job.attempts),
+            )
+        return cursor.rowcount == 1
+
+    def nack(self, job: Job, delay: float = 0.0, error: Optional[str] = None) -> bool:
+        """
+        Give a received job back, to be delivered again in `delay` seconds.
+
+        :Returns: bool, False if the job was lost.
+        """
+        return self._update_delivery(
+            job, "visible = ?, owner = NULL, error = ?", (self._clock() + delay, error)
+        )
+
+    def fail(self, job: Job, error: Optional[str] = None) -> bool:
+        """
+        Set a received job aside as failed, so that it is not delivered anymore.
+        Failed jobs are listed by `failed_jobs`, requeued with `retry_failed` and deleted
+        with `purge`.
+
+        :Returns: bool, False if the job was lost.
+        """
+        # Failed jobs are never visible; the column keeps the time they failed instead.
+        return self._update_delivery(
+            job, "failed = 1, owner = NULL, error = ?, visible = ?", (error, self._clock())
+        )
+
+    def count(self, failed: bool = False) -> int:
+        """Return the number of pending jobs, visible or not, or of failed ones."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE failed = ?", (int(failed),)
+            ).fetchone()
+        return row[0]
+
+    def empty(self) -> bool:
+        """Return whether no job is pending, leaving failed jobs out."""
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM jobs WHERE failed = 0 LIMIT 1").fetchone()
+        return row is None
+
+    def failed_jobs(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Job]:
+        """Iterate over the failed jobs, reading `batch_size` of them at a time."""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, path, metadata, attempts, error FROM jobs "
+                    "WHERE failed = 1 AND id > ? ORDER BY id LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            for job_id, path, metadata, attempts, error in rows:
+                yield Job(job_id, path, json.loads(metadata), attempts, None, error)
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    def retry_failed(self) -> int:
+        """
+        Make the failed jobs visible again, with their attempts reset.
+
+        :Returns: int, the number of jobs requeued.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET failed = 0, attempts = 0, visible = ? WHERE failed = 1",
+                (self._clock(),),
+            )
+        return cursor.rowcount
+
+    def purge(self, older_than: float) -> Tuple[int, int]:
+        """
+        Delete the jobs which failed at least `older_than` seconds ago, and the records of
+        the uploads not written to for as long, e.g. of files uploaded before, unless an
+        upload of their file is claimed.
+
+        Files enqueued again after their records were purged are uploaded again.
+
+        :Args:
+            - older_than[float]: The number of seconds to keep the jobs and records for.
+        :Returns: tuple[int, int], the number of jobs and of files whose records were deleted.
+        """
+        if older_than < 0:
+            raise ValueError("'older_than' must not be negative.")
+        with self._lock, self._transaction(immediate=True):
+            now = self._clock()
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE failed = 1 AND visible <= ?", (now - older_than,)
+            )
+            jobs = cursor.rowcount
+            # The activity of the files is deleted last, as it selects them.
+            for table in ("urls", "completed", "offsets", "leases", "activity"):
+                cursor = self._db.execute(
+                    "DELETE FROM " + table + " WHERE key IN (SELECT key FROM activity "
+                    "WHERE time <= ? AND key NOT IN "
+                    "(SELECT key FROM leases WHERE expires > ?))",
+                    (now - older_than, now),
+                )
+            files = cursor.rowcount
+        return jobs, files
+
+    def set_item(self, key: str, url: str):
+        with self._lock, self._transaction():
+            super().set_item(key, url)
+            self._touch(key)
+
+    def set_completed(
+        self,
+        key: str,
+        url: str,
+        size: int,
+        digest: Optional[str] = None,
+        digest_algorithm: Optional[str] = None,
+    ):
+        with self._lock, self._transaction():
+            super().set_completed(key, url, size, digest, digest_algorithm)
+            self._touch(key)
+
+    def set_offset(self, key: str, url: str, offset: int):
+        with self._lock, self._transaction():
+            super().set_offset(key, url, offset)
+            self._touch(key)
+
+    def _touch(self, key: str):
+        self._db.execute(
+            "INSERT OR REPLACE INTO activity (key, time) VALUES (?, ?)", (key, self._clock())
+        )
+
+    def _update_delivery(self, job: Job, assignments: str, values: tuple) -> bool:
+        # A delivery is identified by its attempt, so that a worker whose job was
+        # delivered again, even to itself, cannot change it anymore.
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET " + assignments
+                + " WHERE id = ? AND owner = ? AND attempts = ? AND failed = 0",
+                values + (job.id, job.owner, job.attempts),
+            )
+        return cursor.rowcount == 1
+
+
+class _Delivery:
+    def __init__(self, job: Job, owner: str):
+        self.job = job
+        # The lease of the file is held per delivery, as threads of a pool share owners.
+        self.lease = "{}:{}:{}".format(owner, job.id, job.attempts)
+        self.key = None
+        self.uploader = None
+        self.stopped = False
+        self.lost = False
+
+    def stop(self):
+        self.stopped = True
+        if self.uploader is not None:
+            self.uploader.cancel()
+
+
+class QueueWorkers:
+    """
+    Pool of threads uploading the jobs of an <tusclient.jobqueue.UploadQueue>.
+
+    Each thread receives one job at a time and uploads its file with an uploader of the
+    client, resuming it from the url stored in the queue, if any. All threads share the
+    client, and hence the connection pool of its transport. While uploads run, a
+    background thread extends the visibility timeout of their jobs every third of the
+    timeout. Should a job be lost anyway, its upload is cancelled and left to the worker
+    the job was delivered to next.
+
+    Before uploading a file, a worker claims it in the queue (see
+    <tusclient.storage.sqlitestorage.SQLiteStorage.claim>), so that jobs of the same file
+    are not uploaded at once. A job whose file is claimed is given back, and delivered
+    again after `poll_interval` seconds, by when the file may be found uploaded.
+
+    Failed uploads are given back to the queue, to be delivered again after
+    `backoff` seconds times the number of attempts, until `max_attempts` deliveries
+    failed, after which the job is set aside as failed. The uploaders' own `retries`
+    are attempted within each delivery.
+
+    Use it as a context manager, which starts the threads on entry, and stops them and
+    waits for them on exit, or with `start`, `stop` and `join`.
+
+    :Attributes:
+        - uploaded (int): The number of files uploaded.
+        - skipped (int): The number of files found uploaded already.
+        - failed (int): The number of jobs set aside as failed.
+    :Constructor Args:
+        - client (<tusclient.client.TusClient>)
+        - queue (<tusclient.jobqueue.UploadQueue>)
+        - workers (int): The number of threads. Defaults to 4.
+        - visibility_timeout (float): Defaults to 60 seconds.
+        - max_attempts (int): Defaults to 5.
+        - backoff (float): Defaults to 5 seconds.
+        - poll_interval (float):
+            The number of seconds to wait for jobs when none is visible. Defaults to 1.
+        - exit_when_empty (bool):
+            Whether the threads stop once no job is pending, rather than waiting for
+            more. Defaults to False.
+        - owner (Optional[str]): The unique id of the pool. Defaults to a new one.
+        - fingerprinter (Optional[<tusclient.fingerprint.interface.Fingerprint>])
+        - on_uploaded (Optional[Callable[[Job, str], None]]):
+            Called from the worker threads with each job whose file was uploaded, or
+            found uploaded, and the url of the upload.
+        - uploader_kwargs: Further arguments of the uploaders, e.g. `chunk_size`.
+    """
+
+    def __init__(
+        self,
+        client: "TusClient",
+        queue: UploadQueue,
+        workers: int = 4,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+        max_attempts: int = 5,
+        backoff: float = 5.0,
+        poll_interval: float = 1.0,
+        exit_when_empty: bool = False,
+        owner: Optional[str] = None,
+        fingerprinter: Optional[interface.Fingerprint] = None,
+        on_uploaded: Optional[Callable[[Job, str], None]] = None,
+        **uploader_kwargs
+    ):
+        if workers < 1:
+            raise ValueError("'workers' must be at least 1.")
+        if visibility_timeout <= 0:
+            raise ValueError("'visibility_timeout' must be positive.")
+        if max_attempts < 1:
+            raise ValueError("'max_attempts' must be at least 1.")
+        self.client = client
+        self.queue = queue
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.exit_when_empty = exit_when_empty
+        self.owner = owner or default_owner()
+        self.fingerprinter = fingerprinter or fingerprint.Fingerprint()
+        self.on_uploaded = on_uploaded
+        self.uploader_kwargs = uploader_kwargs
+        self.uploaded = 0
+        self.skipped = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._running = 0
+        self._deliveries: Dict[int, _Delivery] = {}
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "QueueWorkers":
+        """Start the worker threads."""
+        if self._threads:
+            raise RuntimeError("The workers are already started.")
+        self._stop.clear()
+        self._done.clear()
+        self._running = self.workers
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)
+        ]
+        self._threads.append(threading.Thread(target=self._heartbeat, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, cancel: bool = False):
+        """
+        Ask the worker threads to stop once their current upload is done.
+
+        :Args:
+            - cancel (bool):
+                Whether to cancel the current uploads instead. Their jobs are given back
+                to the queue at once, and their uploads resumed by the next workers.
+        """
+        self._stop.set()
+        if cancel:
+            with self._lock:
+                for delivery in self._deliveries.values():
+                    delivery.stop()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the worker threads to stop, e.g. after `stop` or, with
+        `exit_when_empty`, once the queue is drained.
+
+        :Returns: bool, whether all threads stopped within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        if any(thread.is_alive() for thread in self._threads):
+            return False
+        self._threads = []
+        return True
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+        self.join()
+
+    def _work(self):
+        try:
+            while not self._stop.is_set():
+                jobs = self.queue.receive(self.owner, self.visibility_timeout)
+                if jobs:
+                    self._process(jobs[0])
+                elif self.exit_when_empty and self.queue.empty():
+                    return
+                else:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            with self._lock:
+                self._running -= 1
+                if not self._running:
+                    self._done.set()
+
+    def _process(self, job: Job):
+        delivery = _Delivery(job, self.owner)
+        with self._lock:
+            self._deliveries[job.id] = delivery
+        try:
+            uploader = self.client.uploader(
+                job.path,
+                metadata=job.metadata,
+                store_url=True,
+                url_storage=self.queue,
+                fingerprinter=self.fingerprinter,
+                **self.uploader_kwargs
+            )
+            with self._lock:
+                delivery.uploader = uploader
+                if delivery.stopped:
+                    uploader.cancel()
+            url = uploader.url
+            if uploader.completed:
+                uploader.close()
+                skipped = True
+            elif not self.queue.claim(
+                uploader.storage_key, delivery.lease, self.visibility_timeout
+            ):
+                # Another job uploads the file.
+                uploader.close()
+                self.queue.nack(job, self.poll_interval)
+                return
+            else:
+                with self._lock:
+                    delivery.key = uploader.storage_key
+                completed = self.queue.get_completed(uploader.storage_key)
+                if completed is not None:
+                    # Another job uploaded the file since the uploader was created.
+                    uploader.close()
+                    url = completed.url
+                    skipped = True
+                else:
+                    uploader.upload()
+                    url = uploader.url
+                    skipped = False
+        except TusUploadCancelled:
+            if not delivery.lost:
+                self.queue.nack(job)
+            return
+        except Exception as error:
+            if delivery.lost:
+                return
+            if job.attempts >= self.max_attempts:
+                if self.queue.fail(job, str(error)):
+                    with self._lock:
+                        self.failed += 1
+            else:
+                self.queue.nack(job, self.backoff * job.attempts, str(error))
+            return
+        finally:
+            with self._lock:
+                del self._deliveries[job.id]
+            if delivery.key is not None:
+                self.queue.release(delivery.key, delivery.lease)
+
+        # If the job was lost, the next worker finds the file uploaded.
+        self.queue.ack(job)
+        with self._lock:
+            if skipped:
+                self.skipped += 1
+            else:
+                self.uploaded += 1
+        if self.on_uploaded is not None:
+            self.on_uploaded(job, url)
+
+    def _heartbeat(self):
+        while not self._done.wait(self.visibility_timeout / 3):
+            with self._lock:
+                deliveries = list(self._deliveries.values())
+            for delivery in deliveries:
+                try:
+                    extended = self.queue.extend(delivery.job, self.visibility_timeout)
+                    if extended and delivery.key is not None:
+                        extended = self.queue.renew(
+                            delivery.key, delivery.lease, self.visibility_timeout
+                        )
+                except Exception:
+                    # E.g. the database stayed locked; the job may still be extended in time.
+                    continue
+                if not extended:
+                    with self._lock:
+                        delivery.lost = True
+                        delivery.stop()
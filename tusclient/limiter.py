@@ -0,0 +1,126 @@
+"""
+Bandwidth limiting for uploads.
+
+A `BandwidthLimiter` can be attached to a `tusclient.client.TusClient`, in which
+case the bodies of all PATCH requests made by its uploaders (sync and async) are
+throttled while they are being sent.
+
+.. code:: python
+
+    from tusclient import client
+    from tusclient.limiter import BandwidthLimiter
+
+    limiter = BandwidthLimiter(rate=10 * 1024 * 1024)  # 10 MiB/s
+    my_client = client.TusClient('http://tusd.tusdemo.net/files/',
+                                 bandwidth_limiter=limiter)
+
+    # Limits may be changed at any time, also while uploads are running.
+    limiter.set_rate(2 * 1024 * 1024)
+"""
+from typing import Optional
+import threading
+import time
+
+
+class BandwidthLimiter:
+    """
+    Thread-safe token bucket shared by any number of uploads.
+
+    Tokens (bytes) are added to the bucket at `rate` bytes per second, up to a maximum
+    of `burst` bytes. Sending a block of data takes its size in tokens out of the bucket;
+    if there are not enough, the sender waits until the bucket has been refilled.
+    Waiting senders are served in the order they asked, so the total throughput never
+    exceeds the rate and capacity left unused by idle uploads is shared between the
+    active ones.
+
+    :Attributes:
+        - rate (Optional[float]):
+            The maximum number of bytes per second. If None, the limiter lets all data
+            pass without delay.
+        - burst (int):
+            The maximum number of bytes that can be sent at once after the limiter has
+            been idle. Defaults to one second worth of data.
+    :Constructor Args:
+        - rate (Optional[float])
+        - burst (Optional[int])
+    """
+
+    def __init__(self, rate: Optional[float], burst: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._rate = None
+        self._burst = 0
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self.set_rate(rate, burst)
+        self._tokens = float(self._burst)
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self._rate
+
+    @property
+    def burst(self) -> int:
+        return self._burst
+
+    def set_rate(self, rate: Optional[float], burst: Optional[int] = None):
+        """
+        Change the limits of the limiter.
+
+        The new limits apply to all data sent from now on, including data of
+        uploads that are currently in progress.
+
+        :Args:
+            - rate (Optional[float]): see the `rate` attribute.
+            - burst (Optional[int]): see the `burst` attribute.
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError("'rate' must be a positive number or None.")
+        if burst is not None and burst <= 0:
+            raise ValueError("'burst' must be a positive number.")
+
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = rate
+            self._burst = burst or int(rate or 0)
+            self._tokens = min(self._tokens, self._burst)
+
+    def consume(self, amount: int):
+        """
+        Block until `amount` bytes may be sent.
+        """
+        delay = self._reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def consume_async(self, amount: int):
+        """
+        Wait until `amount` bytes may be sent, without blocking the event loop.
+        """
+        delay = self._reserve(amount)
+        if delay > 0:
+            import asyncio
+
+            await asyncio.sleep(delay)
+
+    def _reserve(self, amount: int) -> float:
+        """
+        Take `amount` tokens out of the bucket and return how long (in seconds) the
+        caller has to wait before it may use them.
+        """
+        with self._lock:
+            if self._rate is None:
+                return 0.0
+            self._refill(time.monotonic())
+            # The bucket may go into debt, which later callers have to wait out
+            # first. This keeps waiting senders in order.
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def _refill(self, now: float):
+        if self._rate is not None:
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._last) * self._rate
+            )
+        self._last = now
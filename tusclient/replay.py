@@ -0,0 +1,298 @@
+"""
+Replay of traced uploads against a local tus server.
+
+A trace written by a <tusclient.trace.Tracer> tells how long each request of an upload
+took, and where the time went. Replaying it runs the same uploads against a
+<tusclient.testing.TusServer> paced to answer each request after the same wait, to
+read PATCH bodies at the same rate, and to fail the requests which failed, so that a
+slow upload seen in production can be reproduced and profiled locally::
+
+    python -m tusclient.replay trace.jsonl --output replayed.jsonl
+
+Uploads are replayed one after the other, each with a file of zeros of the traced size
+and the traced chunk size. Uploads which were resumed from an earlier run are first
+brought to the offset they were resumed from, without pacing.
+"""
+from typing import Dict, IO, Iterable, List, NamedTuple, Optional, Union
+from urllib.parse import urljoin
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+
+from tusclient.client import TusClient
+from tusclient.exceptions import TusCommunicationError
+from tusclient.testing import TusServer
+from tusclient.trace import Tracer
+
+
+class TracedUpload:
+    """
+    The events of one upload in a trace.
+
+    :Attributes:
+        - url (Optional[str]): The url of the upload, if it was created.
+        - events (list[dict]): The events of the upload, in order.
+    """
+
+    def __init__(self, url: Optional[str] = None):
+        self.url = url
+        self.events: List[dict] = []
+
+    @property
+    def requests(self) -> List[dict]:
+        """The events of the requests of the upload, leaving out retry decisions."""
+        return [event for event in self.events if "duration" in event]
+
+    @property
+    def patches(self) -> List[dict]:
+        """The events of the PATCH requests which sent a chunk."""
+        return [
+            event
+            for event in self.events
+            if event["event"] == "PATCH" and event.get("length") is not None
+        ]
+
+    @property
+    def length(self) -> int:
+        """The size of the upload, from its creation or else from its last chunk."""
+        for event in self.events:
+            if event["event"] == "POST" and event.get("length") is not None:
+                return event["length"]
+        return max((e["offset"] + e["length"] for e in self.patches), default=0)
+
+    @property
+    def chunk_size(self) -> int:
+        """The largest chunk sent, or the size of the upload if none was sent."""
+        return max((e["length"] for e in self.patches), default=self.length) or 1
+
+    @property
+    def start_offset(self) -> int:
+        """The offset the upload was resumed from, 0 if it was created in the trace."""
+        if any(event["event"] == "POST" for event in self.events):
+            return 0
+        return min((e["offset"] for e in self.patches), default=0)
+
+    @property
+    def duration(self) -> float:
+        """The seconds from the start of the first event to the end of the last."""
+        return _span(self.events)
+
+
+class ReplayResult(NamedTuple):
+    """
+    The outcome of replaying a traced upload.
+
+    :Attributes:
+        - url (Optional[str]): The traced url of the upload.
+        - requests (int): The number of requests in the trace.
+        - traced (float): The seconds the traced upload took.
+        - replayed (float): The seconds the replayed upload took.
+        - error (Optional[str]): Why the replayed upload failed, if it did.
+    """
+
+    url: Optional[str]
+    requests: int
+    traced: float
+    replayed: float
+    error: Optional[str]
+
+
+def _span(events: List[dict]) -> float:
+    if not events:
+        return 0.0
+    start = min(event["ts"] for event in events)
+    return max(event["ts"] + event.get("duration", 0.0) for event in events) - start
+
+
+def load_trace(source: Union[str, IO[str]]) -> List[dict]:
+    """Read the events of a trace, from a path or a text stream."""
+    if isinstance(source, str):
+        with open(source) as stream:
+            return load_trace(stream)
+    return [json.loads(line) for line in source if line.strip()]
+
+
+def group_uploads(events: Iterable[dict]) -> List[TracedUpload]:
+    """
+    Split the events of a trace by upload, in the order the uploads started.
+
+    Uploads are told apart by url. Failed creation attempts belong to the upload
+    created next.
+    """
+    uploads: List[TracedUpload] = []
+    by_url: Dict[str, TracedUpload] = {}
+    creating = None
+    for event in events:
+        if event["event"] == "POST":
+            if creating is None:
+                creating = TracedUpload()
+                uploads.append(creating)
+            creating.events.append(event)
+            location = event.get("location")
+            if location:
+                creating.url = urljoin(event["url"], location)
+                by_url[creating.url] = creating
+                creating = None
+            continue
+        url = event.get("url")
+        if url is None:
+            continue
+        upload = by_url.get(url)
+        if upload is None:
+            upload = by_url[url] = TracedUpload(url)
+            uploads.append(upload)
+        upload.events.append(event)
+    return uploads
+
+
+def pace_server(server: TusServer, upload: TracedUpload):
+    """
+    Set up the server to answer the requests of the upload as they were answered in
+    the trace.
+
+    Each request is paced with the time spent waiting for its response (plus the time
+    spent connecting, which the server cannot delay), and PATCH bodies are read at the
+    rate they were sent. Requests which failed are failed again: 5xx, 409 and 423
+    statuses with the same status, and requests without a response with a reset
+    connection.
+    """
+    for event in upload.requests:
+        method = event["event"]
+        phases = event.get("phases", {})
+        latency = phases.get("wait", phases.get("request", event["duration"]))
+        latency += phases.get("connect", 0.0)
+        bandwidth = None
+        send = phases.get("send")
+        if method == "PATCH" and send and event.get("length"):
+            bandwidth = max(int(event["length"] / send), 1)
+        server.pace(method, latency=latency, bandwidth=bandwidth)
+
+        status = event.get("status")
+        if status is None and "error" in event:
+            server.inject("reset", method=method)
+        elif status is not None and status >= 500:
+            server.inject("error", method=method, status=status)
+        elif status == 409:
+            server.inject("conflict", method=method)
+        elif status == 423:
+            server.inject("lock", method=method)
+
+
+def replay_upload(
+    server: TusServer,
+    upload: TracedUpload,
+    transport=None,
+    tracer: Optional[Tracer] = None,
+) -> ReplayResult:
+    """
+    Replay a traced upload against the server, and compare the time it took.
+
+    :Args:
+        - server (<tusclient.testing.TusServer>): The server, which is reset first.
+        - upload (<tusclient.replay.TracedUpload>)
+        - transport (Optional[<tusclient.transport.interface.Transport>]):
+            The transport of the replayed upload. Defaults to that of
+            <tusclient.client.TusClient>.
+        - tracer (Optional[<tusclient.trace.Tracer>]):
+            A tracer to write the events of the replayed upload to, if any.
+    :Returns: <tusclient.replay.ReplayResult>
+    """
+    server.reset()
+    retries = [event for event in upload.events if event["event"] == "retry"]
+    options = dict(
+        chunk_size=upload.chunk_size,
+        retries=len(retries),
+        retry_delay=max((event.get("delay") or 0 for event in retries), default=0),
+    )
+    captured = io.StringIO()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "upload")
+        with open(path, "wb") as stream:
+            stream.truncate(upload.length)
+
+        url = None
+        if upload.start_offset:
+            setup = TusClient(server.url, transport=transport).uploader(path, **options)
+            setup.upload(stop_at=upload.start_offset)
+            url = setup.url
+
+        pace_server(server, upload)
+        client = TusClient(server.url, transport=transport, tracer=Tracer(captured))
+        error = None
+        try:
+            client.uploader(path, url=url, **options).upload()
+        except TusCommunicationError as exc:
+            error = str(exc)
+
+    events = load_trace(io.StringIO(captured.getvalue()))
+    if tracer is not None:
+        for event in events:
+            tracer.write(event)
+    return ReplayResult(
+        url=upload.url,
+        requests=len(upload.requests),
+        traced=upload.duration,
+        replayed=_span(events),
+        error=error,
+    )
+
+
+def replay(
+    events: Iterable[dict], transport=None, tracer: Optional[Tracer] = None
+) -> List[ReplayResult]:
+    """
+    Replay every upload of a trace against a local <tusclient.testing.TusServer>, one
+    after the other.
+
+    :Args:
+        - events (Iterable[dict]): The events of the trace, see `load_trace`.
+        - transport (Optional[<tusclient.transport.interface.Transport>])
+        - tracer (Optional[<tusclient.trace.Tracer>]):
+            A tracer to write the events of the replayed uploads to, if any.
+    :Returns: list[<tusclient.replay.ReplayResult>], one per upload.
+    """
+    with TusServer() as server:
+        return [
+            replay_upload(server, upload, transport=transport, tracer=tracer)
+            for upload in group_uploads(events)
+        ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from tusclient.cli import TRANSPORTS, make_transport
+
+    parser = argparse.ArgumentParser(
+        prog="python -m tusclient.replay",
+        description="Replay a trace of uploads against a local tus server.",
+    )
+    parser.add_argument("trace", help="the JSONL trace to replay")
+    parser.add_argument(
+        "--transport", choices=TRANSPORTS, default="sendfile",
+        help="HTTP implementation (sendfile)",
+    )
+    parser.add_argument("--output", metavar="FILE", help="trace the replay to FILE")
+    args = parser.parse_args(argv)
+
+    transport = make_transport(args.transport)
+    tracer = Tracer(args.output) if args.output else None
+    try:
+        results = replay(load_trace(args.trace), transport=transport, tracer=tracer)
+    finally:
+        transport.close()
+        if tracer is not None:
+            tracer.close()
+    for result in results:
+        line = "{}: {} requests, traced {:.3f}s, replayed {:.3f}s".format(
+            result.url or "(not created)", result.requests, result.traced, result.replayed
+        )
+        if result.error is not None:
+            line += ", failed: {}".format(result.error)
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
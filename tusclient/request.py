@@ -1,13 +1,23 @@
-from typing import Optional
+from typing import Dict, IO, Optional, TYPE_CHECKING
 import base64
-import asyncio
+import contextvars
+import io
+import os
+import stat
+import threading
+import weakref
 from functools import wraps
 
-import requests
-import aiohttp
-import ssl
-
+from tusclient import trace
+from tusclient.bufferpool import read_into
 from tusclient.exceptions import TusUploadFailed, TusCommunicationError
+from tusclient.limiter import BandwidthLimiter
+from tusclient.streams import FileSection, MemoryStream
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from tusclient.uploader.prefetch import Chunk
 
 
 # Catches requests exceptions and throws custom tuspy errors.
@@ -16,6 +26,9 @@ def catch_requests_error(func):
 
     @wraps(func)
     def _wrapper(*args, **kwargs):
+        # requests is only imported once a request has been made with it.
+        import requests
+
         try:
             return func(*args, **kwargs)
         except requests.exceptions.RequestException as error:
@@ -24,6 +37,210 @@ def catch_requests_error(func):
     return _wrapper
 
 
+def encode_checksum(algorithm_name: str, algorithm, chunk: bytes) -> str:
+    """Return the value of the Upload-Checksum header for the chunk."""
+    return " ".join(
+        (
+            algorithm_name,
+            base64.b64encode(algorithm(chunk).digest()).decode("ascii"),
+        )
+    )
+
+
+# Windows has no `os.pread`; the file is then seeked and read under a lock per file.
+_os_pread = getattr(os, "pread", None)
+_file_locks: "weakref.WeakKeyDictionary[IO, threading.Lock]" = weakref.WeakKeyDictionary()
+_file_locks_lock = threading.Lock()
+
+
+def _pread(file: IO, size: int, offset: int) -> bytes:
+    """
+    Read up to `size` bytes of the file at `offset`, leaving its position unchanged.
+    """
+    if _os_pread is not None:
+        return _os_pread(file.fileno(), size, offset)
+    with _file_locks_lock:
+        lock = _file_locks.setdefault(file, threading.Lock())
+    with lock:
+        position = file.tell()
+        try:
+            file.seek(offset)
+            return file.read(size)
+        finally:
+            file.seek(position)
+
+
+class ThrottledBody:
+    """
+    File-like request body which is throttled by a bandwidth limiter while it is
+    being sent.
+
+    It can be read in blocks by synchronous transports and iterated over by
+    asynchronous ones. Its length is the Content-Length of the request. Without a
+    limiter, it only serves to send a chunk held in a shared buffer (see
+    <tusclient.bufferpool.BufferPool>) in small blocks, which every transport accepts.
+
+    :Constructor Args:
+        - chunk (bytes | memoryview): The data to be sent.
+        - limiter (Optional[<tusclient.limiter.BandwidthLimiter>]):
+            Or a <tusclient.watchdog.TransferMonitor>.
+    """
+
+    BLOCK_SIZE = 65536
+
+    def __init__(self, chunk: bytes, limiter: Optional[BandwidthLimiter]):
+        self._view = memoryview(chunk)
+        self._position = 0
+        self._limiter = limiter
+
+    def __len__(self):
+        return len(self._view)
+
+    def _next_block(self, size: int) -> memoryview:
+        if size < 0 or size > self.BLOCK_SIZE:
+            size = self.BLOCK_SIZE
+        # A view of the chunk, which the transports send without copying it.
+        block = self._view[self._position : self._position + size]
+        self._position += len(block)
+        return block
+
+    def read(self, size: int = -1) -> memoryview:
+        block = self._next_block(size)
+        if block and self._limiter is not None:
+            self._limiter.consume(len(block))
+        return block
+
+    async def __aiter__(self):
+        while True:
+            block = self._next_block(self.BLOCK_SIZE)
+            if not block:
+                return
+            if self._limiter is not None:
+                await self._limiter.consume_async(len(block))
+            yield block
+
+
+class FileRangeBody:
+    """
+    Request body made of a range of a regular file.
+
+    Transports which support it (see <tusclient.transport.interface.Transport>) send
+    the range straight from the file to the socket, e.g. with `os.sendfile`, without
+    reading it into memory. Others can read it like any other file-like body.
+
+    :Attributes:
+        - file (file): The file, which must have a file descriptor.
+        - offset (int): The position in the file at which the range starts.
+        - limiter (Optional[<tusclient.limiter.BandwidthLimiter>]):
+            The limiter throttling the body while it is being sent, if any, or a
+            <tusclient.watchdog.TransferMonitor>.
+    :Constructor Args:
+        - file (file)
+        - offset (int)
+        - length (int)
+        - limiter (Optional[<tusclient.limiter.BandwidthLimiter>])
+    """
+
+    BLOCK_SIZE = 65536
+
+    def __init__(
+        self, file: IO, offset: int, length: int, limiter: Optional[BandwidthLimiter] = None
+    ):
+        self.file = file
+        self.offset = offset
+        self.limiter = limiter
+        self._length = length
+        self._position = 0
+
+    def __len__(self):
+        return self._length
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def _next_block(self, size: int) -> bytes:
+        if size < 0 or size > self.BLOCK_SIZE:
+            size = self.BLOCK_SIZE
+        size = min(size, self._length - self._position)
+        if size <= 0:
+            return b""
+        block = _pread(self.file, size, self.offset + self._position)
+        self._position += len(block)
+        return block
+
+    def read(self, size: int = -1) -> bytes:
+        block = self._next_block(size)
+        if block and self.limiter is not None:
+            self.limiter.consume(len(block))
+        return block
+
+    async def __aiter__(self):
+        while True:
+            block = self._next_block(self.BLOCK_SIZE)
+            if not block:
+                return
+            if self.limiter is not None:
+                await self.limiter.consume_async(len(block))
+            yield block
+
+
+class ChecksumTrailerBody:
+    """
+    Request body streamed from a file, whose checksum is computed while it is being
+    sent and sent as the Upload-Checksum trailer of the request.
+
+    Only the block being sent is held in memory. Transports supporting trailers (see
+    <tusclient.transport.interface.Transport>) send it with chunked transfer encoding,
+    announce its `TRAILERS` in a Trailer header, and send `trailers()` once it has
+    been read.
+
+    :Constructor Args:
+        - file (file): The file, positioned at the start of the chunk.
+        - length (int): The length of the chunk. Less is sent if the file ends before.
+        - algorithm_name (str): The name of the checksum algorithm, e.g. "sha1".
+        - algorithm: The `hashlib` constructor of the checksum algorithm.
+        - limiter (Optional[<tusclient.limiter.BandwidthLimiter>]):
+            Or a <tusclient.watchdog.TransferMonitor>.
+    """
+
+    BLOCK_SIZE = 65536
+    TRAILERS = ("Upload-Checksum",)
+
+    def __init__(
+        self,
+        file: IO,
+        length: int,
+        algorithm_name: str,
+        algorithm,
+        limiter: Optional[BandwidthLimiter] = None,
+    ):
+        self.file = file
+        self.limiter = limiter
+        self._length = length
+        self._left = length
+        self._algorithm_name = algorithm_name
+        self._hasher = algorithm()
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.BLOCK_SIZE:
+            size = self.BLOCK_SIZE
+        block = self.file.read(min(size, self._left)) if self._left > 0 else b""
+        if block:
+            self._left -= len(block)
+            self._hasher.update(block)
+            if self.limiter is not None:
+                self.limiter.consume(len(block))
+        return block
+
+    def trailers(self) -> Dict[str, str]:
+        """Return the trailers of the request, once the body has been read."""
+        digest = base64.b64encode(self._hasher.digest()).decode("ascii")
+        return {"Upload-Checksum": " ".join((self._algorithm_name, digest))}
+
+
 class BaseTusRequest:
     """
     Http Request Abstraction.
@@ -31,111 +248,308 @@ class BaseTusRequest:
     Sets up tus custom http request on instantiation.
 
     requires argument 'uploader' an instance of tusclient.uploader.Uploader
-    on instantiation.
+    on instantiation. Optionally, a chunk which has already been read ahead
+    (<tusclient.uploader.prefetch.Chunk>) can be passed as 'chunk', in which case
+    the file is not read by the request.
 
     :Attributes:
         - response_headers (dict)
         - file (file):
-            The file that is being uploaded.
+            The file that is being uploaded. None if the chunk was read ahead.
+        - offset (int):
+            The offset at which the chunk of the request starts.
+        - data (Optional[bytes | memoryview]):
+            The chunk sent by the request, once it has been read. None if it was sent
+            without being read (see <tusclient.request.FileRangeBody>), or after `close`.
+            Chunks read into a buffer of the uploader's buffer pool are memoryviews of the
+            buffer, which are only valid until the request is closed.
     """
 
-    def __init__(self, uploader):
+    BUFFER_WAIT_INTERVAL = 0.1
+
+    def __init__(self, uploader, chunk: Optional["Chunk"] = None):
         self._url = uploader.url
         self.status_code = None
         self.response_headers = {}
         self.response_content = None
         self.stream_eof = False
         self.verify_tls_cert = bool(uploader.verify_tls_cert)
-        self.file = uploader.get_file_stream()
-        self.file.seek(uploader.offset)
+        self._chunk = chunk
+        if chunk is None:
+            self.file = uploader.get_file_stream()
+            self.file.seek(uploader.offset)
+        else:
+            self.file = None
         self.client_cert = uploader.client_cert
+        self.bandwidth_limiter = uploader.bandwidth_limiter
+        # Set by the subclasses, see `BaseUploader.get_transfer_monitor`.
+        self._monitor = None
 
         self._request_headers = {
             "upload-offset": str(uploader.offset),
             "Content-Type": "application/offset+octet-stream",
         }
-        self._offset = uploader.offset
+        self._offset = self.offset = uploader.offset
+        self.data = None
+        self._buffer = None
+        self._buffer_pool = uploader.buffer_pool
+        self._buffer_size = uploader.chunk_size
+        self._check_cancelled = uploader._check_cancelled
+        self._upload_length = uploader.file_size
         self._upload_length_deferred = uploader.upload_length_deferred
         self._request_headers.update(uploader.get_headers())
         self._content_length = uploader.get_request_length()
         self._upload_checksum = uploader.upload_checksum
+        self._checksum_trailer = uploader.checksum_trailer
         self._checksum_algorithm = uploader.checksum_algorithm
         self._checksum_algorithm_name = uploader.checksum_algorithm_name
+        self._get_precomputed_checksum = uploader.get_precomputed_checksum
+        self._needs_data = uploader.digest_algorithm is not None
+        self._send_digest = uploader.send_digest
+        self._get_final_digest = uploader.get_final_digest
+        self._tracer = uploader.tracer
 
     def add_checksum(self, chunk: bytes):
         if self._upload_checksum:
-            self._request_headers["upload-checksum"] = " ".join(
-                (
-                    self._checksum_algorithm_name,
-                    base64.b64encode(self._checksum_algorithm(chunk).digest()).decode(
-                        "ascii"
-                    ),
-                )
+            self._request_headers["upload-checksum"] = encode_checksum(
+                self._checksum_algorithm_name, self._checksum_algorithm, chunk
             )
 
+    def read_chunk(self) -> bytes:
+        """
+        Return the data to be uploaded and add its checksum to the request headers.
+        """
+        if self._chunk is None:
+            with trace.phase("read"):
+                if self._uses_buffer_pool():
+                    self._buffer = self._acquire_buffer()
+                    view = memoryview(self._buffer)[: self._content_length]
+                    self.data = view[: read_into(self.file, view)]
+                else:
+                    self.data = self.file.read(self._content_length)
+            if self._upload_checksum:
+                with trace.phase("checksum"):
+                    self.add_checksum(self.data)
+        else:
+            if self._upload_checksum:
+                self._request_headers["upload-checksum"] = self._chunk.checksum
+            self.data = self._chunk.data
+        return self.data
+
+    def _acquire_buffer(self) -> bytearray:
+        # The pool may be shared by many uploads, so its buffers are waited for in
+        # short steps to stop promptly once the upload is cancelled.
+        while True:
+            self._check_cancelled()
+            buffer = self._buffer_pool.acquire(
+                self._buffer_size, timeout=self.BUFFER_WAIT_INTERVAL
+            )
+            if buffer is not None:
+                return buffer
+
+    def _uses_buffer_pool(self) -> bool:
+        # Chunks larger than the whole pool (e.g. with the default, unbounded chunk
+        # size) are read as before. In-memory sources need no buffer at all.
+        return (
+            self._buffer_pool is not None
+            and self._buffer_size <= self._buffer_pool.max_memory
+            and not isinstance(self.file, MemoryStream)
+        )
+
+    def close(self):
+        """
+        Give the buffer the chunk was read into back to the buffer pool, if any.
+        """
+        if self._buffer is not None:
+            self.data = None
+            self._buffer_pool.release(self._buffer)
+            self._buffer = None
+
+    def add_digest(self, stream_eof: bool):
+        """
+        Add the digest of the whole file to the request headers if the chunk which has
+        been read is the last one and the uploader is configured to send it.
+        """
+        if not self._send_digest or self.data is None:
+            return
+        end = self._offset + len(self.data)
+        if stream_eof or end == self._upload_length:
+            digest = self._get_final_digest(self._offset, self.data)
+            if digest is not None:
+                self._request_headers["repr-digest"] = digest
+
+    def get_file_range(self) -> Optional[FileRangeBody]:
+        """
+        Return the chunk as a <tusclient.request.FileRangeBody> if the transport can
+        send it without reading it, or None if the chunk has to be read.
+
+        This is the case if the upload is read from a regular file and no checksum
+        has to be computed from the data, i.e. checksums are disabled or a precomputed
+        one is available (see `BaseUploader.get_precomputed_checksum`).
+        """
+        if self.file is None or not getattr(self.transport, "supports_sendfile", False):
+            return None
+        if self._needs_data:
+            # The uploader's running digest has to see the data.
+            return None
+        file, offset, end = self.file, self._offset, None
+        if isinstance(file, FileSection):
+            # Sections are sent from the file they are part of.
+            file, offset = file.file, file.start + offset
+            end = self.file.start + self.file.length
+        try:
+            file_stat = os.fstat(file.fileno())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+        if not stat.S_ISREG(file_stat.st_mode):
+            return None
+
+        end = file_stat.st_size if end is None else min(end, file_stat.st_size)
+        length = max(0, min(self._content_length, end - offset))
+        if self._upload_checksum:
+            checksum = self._get_precomputed_checksum(self._offset, length)
+            if checksum is None:
+                return None
+            self._request_headers["upload-checksum"] = checksum
+        return FileRangeBody(file, offset, length, self._body_limiter())
+
+    def get_trailer_body(self) -> Optional[ChecksumTrailerBody]:
+        """
+        Return the chunk as a <tusclient.request.ChecksumTrailerBody> if the uploader
+        sends its checksums as trailers (see `checksum_trailer`) and the transport can
+        send them, or None if the chunk has to be read before it is sent.
+
+        Chunks which have already been read (e.g. read ahead), uploads of deferred
+        length and uploads computing a digest of the file are sent as usual.
+        """
+        if not (self._upload_checksum and self._checksum_trailer) or self.file is None:
+            return None
+        if not getattr(self.transport, "supports_trailers", False):
+            return None
+        if self._needs_data or self._upload_length_deferred:
+            return None
+        return ChecksumTrailerBody(
+            self.file,
+            self._content_length,
+            self._checksum_algorithm_name,
+            self._checksum_algorithm,
+            self._body_limiter(),
+        )
+
+    def check_stream_eof(self, chunk: bytes) -> bool:
+        """
+        Return whether the chunk is the last one of the stream, and declare the
+        upload length in that case if it was deferred.
+        """
+        stream_eof = len(chunk) < self._content_length
+        if stream_eof and self._upload_length_deferred:
+            self._request_headers["upload-length"] = str(self._offset + len(chunk))
+        return stream_eof
+
+    def _body_limiter(self):
+        return self._monitor if self._monitor is not None else self.bandwidth_limiter
+
+    def get_body(self, chunk: bytes):
+        """
+        Return the request body for the chunk, throttled if a bandwidth limiter
+        is configured, and watched by the transfer monitor of the uploader, if any.
+        """
+        limiter = self._body_limiter()
+        if limiter is None and not isinstance(chunk, memoryview):
+            return chunk
+        return ThrottledBody(chunk, limiter)
+
 
 class TusRequest(BaseTusRequest):
-    """Class to handle async Tus upload requests"""
+    """Class to handle Tus upload requests"""
+
+    def __init__(self, uploader, chunk: Optional["Chunk"] = None):
+        super().__init__(uploader, chunk)
+        self.transport = uploader.transport
+        self._monitor = uploader.get_transfer_monitor(cancellable=True)
 
     def perform(self):
         """
         Perform actual request.
         """
         try:
-            chunk = self.file.read(self._content_length)
-            stream_eof = len(chunk) < self._content_length
-            self.add_checksum(chunk)
-            headers = self._request_headers
-            if stream_eof and self._upload_length_deferred:
-                headers["upload-length"] = str(self._offset + len(chunk))
-            resp = requests.patch(
-                self._url,
-                data=chunk,
-                headers=headers,
-                verify=self.verify_tls_cert,
-                stream=True,
-                cert=self.client_cert
-            )
-            self.status_code = resp.status_code
-            self.response_content = resp.content
-            self.response_headers = {k.lower(): v for k, v in resp.headers.items()}
-            self.stream_eof = stream_eof
-        except requests.exceptions.RequestException as error:
+            with trace.span(self._tracer, "PATCH", url=self._url, offset=self.offset) as span:
+                body = self.get_file_range()
+                if body is None:
+                    body = self.get_trailer_body()
+                if body is None:
+                    chunk = self.read_chunk()
+                    body = self.get_body(chunk)
+                else:
+                    chunk = body
+                stream_eof = self.check_stream_eof(chunk)
+                self.add_digest(stream_eof)
+                span.set(length=len(chunk))
+                with trace.phase("request"):
+                    resp = self.transport.request(
+                        "PATCH",
+                        self._url,
+                        self._request_headers,
+                        data=body,
+                        verify=self.verify_tls_cert,
+                        cert=self.client_cert,
+                    )
+                span.set(status=resp.status_code)
+        except TusCommunicationError as error:
             raise TusUploadFailed(error)
+        self.status_code = resp.status_code
+        self.response_content = resp.content
+        self.response_headers = resp.headers
+        self.stream_eof = stream_eof
 
 
 class AsyncTusRequest(BaseTusRequest):
     """Class to handle async Tus upload requests"""
 
     def __init__(
-        self, *args, io_loop: Optional[asyncio.AbstractEventLoop] = None, **kwargs
+        self,
+        uploader,
+        chunk: Optional["Chunk"] = None,
+        io_loop: Optional["asyncio.AbstractEventLoop"] = None,
     ):
         self.io_loop = io_loop
-        super().__init__(*args, **kwargs)
+        super().__init__(uploader, chunk)
+        self.transport = uploader.async_transport
+        # Async uploads are cancelled through their task.
+        self._monitor = uploader.get_transfer_monitor(cancellable=False)
 
     async def perform(self):
         """
         Perform actual request.
         """
-        chunk = self.file.read(self._content_length)
-        self.add_checksum(chunk)
         try:
-            ssl_ctx = ssl.create_default_context()
-            if (self.client_cert is not None):
-                if self.client_cert is str:
-                    ssl_ctx.load_cert_chain(certfile=self.client_cert)
+            with trace.span(self._tracer, "PATCH", url=self._url, offset=self.offset) as span:
+                if self._uses_buffer_pool():
+                    # Waiting for a free buffer must not block the event loop.
+                    import asyncio
+
+                    # The chunk is read in the context of the span, to trace its phases.
+                    chunk = await asyncio.get_running_loop().run_in_executor(
+                        None, contextvars.copy_context().run, self.read_chunk
+                    )
                 else:
-                    ssl_ctx.load_cert_chain(certfile=self.client_cert[0], keyfile=self.client_cert[1])
-            conn = aiohttp.TCPConnector(ssl=ssl_ctx)
-            async with aiohttp.ClientSession(loop=self.io_loop, connector=conn) as session:
-                verify_tls_cert = None if self.verify_tls_cert else False
-                async with session.patch(
-                    self._url, data=chunk, headers=self._request_headers, ssl=verify_tls_cert
-                ) as resp:
-                    self.status_code = resp.status
-                    self.response_headers = {
-                        k.lower(): v for k, v in resp.headers.items()
-                    }
-                    self.response_content = await resp.content.read()
-        except aiohttp.ClientError as error:
+                    chunk = self.read_chunk()
+                stream_eof = self.check_stream_eof(chunk)
+                self.add_digest(stream_eof)
+                span.set(length=len(chunk))
+                with trace.phase("request"):
+                    resp = await self.transport.request(
+                        "PATCH",
+                        self._url,
+                        self._request_headers,
+                        data=self.get_body(chunk),
+                        verify=self.verify_tls_cert,
+                        cert=self.client_cert,
+                    )
+                span.set(status=resp.status_code)
+        except TusCommunicationError as error:
             raise TusUploadFailed(error)
+        self.status_code = resp.status_code
+        self.response_content = resp.content
+        self.response_headers = resp.headers
+        self.stream_eof = stream_eof
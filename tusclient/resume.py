@@ -0,0 +1,162 @@
+"""
+Bulk resumption of uploads.
+
+Resuming an upload requires a HEAD request to learn its offset. Made one after the
+other, as uploaders do when they are created, these requests add up to a full round
+trip per upload before any data is sent. The functions of this module probe the
+offsets of many uploads concurrently instead, with a bounded number of requests in
+flight.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, TYPE_CHECKING
+
+from tusclient.exceptions import TusCommunicationError
+from tusclient.storage.interface import Storage
+from tusclient.uploader.baseuploader import BaseUploader
+
+if TYPE_CHECKING:
+    from tusclient.client import TusClient
+
+
+DEFAULT_MAX_WORKERS = 16
+
+
+def _default_max_workers(transport) -> int:
+    # More requests at once than the transport keeps connections for would open, and
+    # throw away, a new connection for each of the others.
+    return getattr(transport, "pool_maxsize", None) or DEFAULT_MAX_WORKERS
+
+
+class ResumeReport(NamedTuple):
+    """
+    Outcome of resuming a batch of uploads.
+
+    :Attributes:
+        - offsets (dict):
+            The offset reported by the server for each upload which can be resumed.
+        - removed (list):
+            The uploads whose stored url was no longer valid, and has been removed from
+            the url storage.
+        - errors (dict):
+            The <tusclient.exceptions.TusCommunicationError> raised for each upload whose
+            offset could not be determined for other reasons, e.g. network failures. These
+            uploads are left untouched, and may be probed again later.
+    """
+
+    offsets: Dict[Hashable, int]
+    removed: List[Hashable]
+    errors: Dict[Hashable, TusCommunicationError]
+
+
+def _probe_all(probe, items: list, max_workers: int):
+    def attempt(item):
+        try:
+            return probe(item), None
+        except TusCommunicationError as error:
+            return None, error
+
+    if max_workers < 1:
+        raise ValueError("'max_workers' must be at least 1.")
+    with ThreadPoolExecutor(max_workers=min(max_workers, max(len(items), 1))) as pool:
+        return zip(items, pool.map(attempt, items))
+
+
+def resume_uploaders(
+    uploaders: Iterable[BaseUploader], max_workers: Optional[int] = None
+) -> ResumeReport:
+    """
+    Fetch the offsets of many uploaders concurrently.
+
+    This is meant for uploaders created with `resolve_offset=False`. The `offset` of
+    each uploader with a `url` is set to the one reported by the server. Stored urls
+    which are no longer valid are removed from the url storage and reset, as
+    <tusclient.uploader.baseuploader.BaseUploader.resolve_offset> does. Uploaders
+    without a url, those already known to be `completed` and those resuming from a
+    journaled offset (see `offset_journal`) are skipped.
+
+    Only the HEAD requests are made concurrently. The uploaders and their url storage
+    are updated from the calling thread, so the storage does not need to be
+    thread-safe.
+
+    :Args:
+        - uploaders (Iterable[<tusclient.uploader.baseuploader.BaseUploader>])
+        - max_workers (Optional[int]):
+            The maximum number of requests in flight. Defaults to the number of
+            connections the transport keeps alive (`pool_maxsize`), if it tells, or 16.
+    :Returns: <tusclient.resume.ResumeReport>, keyed by uploader.
+    """
+    report = ResumeReport({}, [], {})
+    pending = [
+        u for u in uploaders if u.url and not u.completed and not u.offset_from_journal
+    ]
+    if max_workers is None:
+        max_workers = _default_max_workers(pending[0].transport if pending else None)
+    for uploader, (offset, error) in _probe_all(
+        lambda uploader: uploader.get_offset(), pending, max_workers
+    ):
+        if error is None:
+            uploader.offset = offset
+            report.offsets[uploader] = offset
+        elif uploader.storage_key is not None and uploader.is_stale_url_error(error):
+            uploader.forget_url()
+            report.removed.append(uploader)
+        else:
+            report.errors[uploader] = error
+    return report
+
+
+def probe_stored_urls(
+    client: "TusClient",
+    url_storage: Storage,
+    keys: Iterable[str],
+    max_workers: Optional[int] = None,
+    verify_tls_cert: bool = True,
+) -> ResumeReport:
+    """
+    Fetch the offsets of the uploads stored under many url storage keys concurrently.
+
+    This allows checking which uploads of a batch can be resumed before creating any
+    uploader. Keys whose url the server reports as no longer valid (any 4xx status
+    except 423) are removed from the storage. Keys without a stored url are skipped.
+
+    :Args:
+        - client (<tusclient.client.TusClient>):
+            The client whose transport, headers and certificate are used for the requests.
+        - url_storage (<tusclient.storage.interface.Storage>)
+        - keys (Iterable[str]): The keys to probe, e.g. file fingerprints.
+        - max_workers (Optional[int]):
+            The maximum number of requests in flight, see `resume_uploaders`.
+        - verify_tls_cert (bool): Whether or not to verify the TLS certificate of the server.
+    :Returns: <tusclient.resume.ResumeReport>, keyed by storage key.
+    """
+    headers = dict(BaseUploader.DEFAULT_HEADERS, **client.headers)
+    urls = {}
+    for key in keys:
+        url = url_storage.get_item(key)
+        if url:
+            urls[key] = url
+
+    def probe(key):
+        resp = client.transport.request(
+            "HEAD", urls[key], headers, verify=verify_tls_cert, cert=client.client_cert
+        )
+        offset = resp.headers.get("upload-offset")
+        if offset is None:
+            msg = "Attempt to retrieve offset fails with status {}".format(
+                resp.status_code
+            )
+            raise TusCommunicationError(msg, resp.status_code, resp.content)
+        return int(offset)
+
+    if max_workers is None:
+        max_workers = _default_max_workers(client.transport)
+    report = ResumeReport({}, [], {})
+    for key, (offset, error) in _probe_all(probe, list(urls), max_workers):
+        if error is None:
+            report.offsets[key] = offset
+        elif BaseUploader.is_stale_url_error(error):
+            url_storage.remove_item(key)
+            report.removed.append(key)
+        else:
+            report.errors[key] = error
+    return report
@@ -0,0 +1,285 @@
+"""
+Scheduling of many concurrent uploads.
+
+The scheduler runs uploads on a pool of worker threads, one chunk at a time. After each
+chunk, the worker picks the most deserving job again, so the order of the uploads and
+the share of the workers each one gets follow the scheduling policy, and newly
+submitted urgent jobs are served within the time of a single chunk.
+"""
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import heapq
+import itertools
+import threading
+
+from tusclient.uploader import Uploader
+
+
+POLICIES = ("fifo", "sjf", "wfq")
+
+
+class UploadJob:
+    """
+    An upload submitted to a <tusclient.scheduler.UploadScheduler>.
+
+    :Attributes:
+        - uploader (<tusclient.uploader.Uploader>)
+        - priority (int):
+            Jobs with a higher priority are always served before jobs with a lower one.
+        - weight (float):
+            The share of the workers the job gets relative to the other jobs of the same
+            priority under the "wfq" policy.
+        - host (str):
+            The tus endpoint the upload is sent to, as "host:port". Until the upload is
+            created, the endpoint it would be created on, see
+            <tusclient.endpoints.EndpointSelector>.
+        - future (concurrent.futures.Future):
+            Resolved with the upload url once the upload is finished, or with the error
+            that made it fail.
+    """
+
+    def __init__(self, uploader: Uploader, priority: int, weight: float):
+        if weight <= 0:
+            raise ValueError("'weight' must be positive.")
+        self.uploader = uploader
+        self.priority = priority
+        self.weight = weight
+        self.future = Future()
+        self.future.set_running_or_notify_cancel()
+        self._started = False
+        self._virtual_time = 0.0
+
+    @property
+    def host(self) -> str:
+        url = self.uploader.url
+        if url is None:
+            endpoints = getattr(self.uploader.client, "endpoints", None)
+            url = endpoints.select() if endpoints is not None else self.uploader.client.url
+        return urlsplit(url).netloc
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        """Wait for the upload to finish and return its url."""
+        return self.future.result(timeout)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    @property
+    def remaining(self) -> float:
+        """The number of bytes left to upload, or infinity if it is not known yet."""
+        if self.uploader.stop_at is None:
+            return float("inf")
+        return self.uploader.stop_at - self.uploader.offset
+
+    def _step(self) -> int:
+        """
+        Upload the next chunk and return the number of bytes it carried.
+        """
+        uploader = self.uploader
+        if not self._started:
+            self._started = True
+            created = uploader.url is None
+            uploader.begin(uploader.stop_at)
+            if created:
+                # The chunks are only scheduled once the endpoint the upload was
+                # created on, and so its host, is known.
+                return 0
+        if self._finished:
+            return 0
+        offset = uploader.offset
+        uploader.upload_chunk()
+        return uploader.offset - offset
+
+    @property
+    def _finished(self) -> bool:
+        return self._started and self.uploader.finished
+
+    def _close(self):
+        self.uploader.finish()
+
+
+class UploadScheduler:
+    """
+    Runs uploads concurrently, in an order given by their priority and a policy.
+
+    Jobs are picked by descending priority first. Among jobs of the same priority, the
+    policy decides:
+
+    - "fifo": in the order they were submitted.
+    - "sjf": shortest job first, i.e. the job with the fewest bytes left to upload
+      (according to its `file_size`) is served first. Jobs with a deferred length are
+      served last.
+    - "wfq": weighted fair queueing, i.e. the jobs share the workers in proportion to
+      their weights, by uploaded bytes.
+
+    Jobs are scheduled one chunk at a time: after each chunk, the job is put back and the
+    best job is picked again. A higher priority job submitted while all workers are busy
+    therefore starts as soon as any of the running chunks completes, and the preempted
+    upload continues later from where it stopped. Preemption is only as fine grained as
+    the `chunk_size` of the uploaders.
+
+    :Attributes:
+        - max_workers (int):
+            The maximum number of chunks uploaded at the same time.
+        - per_host (Optional[int]):
+            The maximum number of chunks uploaded to the same tus endpoint at the same time,
+            or None for no limit besides `max_workers`.
+        - policy (str):
+            One of "fifo", "sjf" and "wfq".
+    :Constructor Args:
+        - max_workers (Optional[int]): Defaults to 4.
+        - per_host (Optional[int])
+        - policy (Optional[str]): Defaults to "sjf".
+    """
+
+    def __init__(
+        self, max_workers: int = 4, per_host: Optional[int] = None, policy: str = "sjf"
+    ):
+        if max_workers < 1:
+            raise ValueError("'max_workers' must be at least 1.")
+        if per_host is not None and per_host < 1:
+            raise ValueError("'per_host' must be at least 1.")
+        if policy not in POLICIES:
+            raise ValueError("'policy' must be one of {}.".format(", ".join(POLICIES)))
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.policy = policy
+        self._condition = threading.Condition()
+        # One heap of waiting jobs per host, so that hosts at their limit can be skipped.
+        self._queues: Dict[str, list] = {}
+        self._running: Dict[str, int] = {}
+        self._pending = 0
+        self._counter = itertools.count()
+        self._virtual_time = 0.0
+        self._workers: List[threading.Thread] = []
+        self._closed = False
+
+    def submit(self, uploader: Uploader, priority: int = 0, weight: float = 1.0) -> UploadJob:
+        """
+        Schedule the upload of `uploader` and return its job.
+
+        :Args:
+            - uploader (<tusclient.uploader.Uploader>)
+            - priority (Optional[int]): Defaults to 0.
+            - weight (Optional[float]): Defaults to 1.
+        :Returns: <tusclient.scheduler.UploadJob>
+        """
+        job = UploadJob(uploader, priority, weight)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("cannot submit jobs to a closed scheduler")
+            job._virtual_time = self._virtual_time
+            self._pending += 1
+            self._push(job)
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, daemon=True)
+                self._workers.append(worker)
+                worker.start()
+        return job
+
+    def join(self):
+        """Wait until all submitted jobs are finished."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending == 0)
+
+    def close(self, wait: bool = True):
+        """
+        Stop the workers. Unless `wait` is False, the submitted jobs are finished first;
+        otherwise, jobs which are not finished yet fail with a RuntimeError.
+        """
+        if wait:
+            self.join()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+        with self._condition:
+            jobs = [entry[-1] for queue in self._queues.values() for entry in queue]
+            self._queues.clear()
+        for job in jobs:
+            job._close()
+        with self._condition:
+            for job in jobs:
+                job.future.set_exception(RuntimeError("the scheduler was closed"))
+                self._pending -= 1
+            self._condition.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _key(self, job: UploadJob):
+        if self.policy == "sjf":
+            rank = job.remaining
+        elif self.policy == "wfq":
+            rank = job._virtual_time
+        else:
+            rank = 0
+        # The counter breaks ties in submission order (for requeued jobs, in the
+        # order they were put back, which rotates them).
+        return (-job.priority, rank, next(self._counter))
+
+    def _push(self, job: UploadJob):
+        heapq.heappush(self._queues.setdefault(job.host, []), self._key(job) + (job,))
+
+    def _pop(self) -> Optional[UploadJob]:
+        best = None
+        for host, queue in self._queues.items():
+            if not queue:
+                continue
+            if self.per_host is not None and self._running.get(host, 0) >= self.per_host:
+                continue
+            if best is None or queue[0][:-1] < self._queues[best][0][:-1]:
+                best = host
+        if best is None:
+            return None
+        return heapq.heappop(self._queues[best])[-1]
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = None
+                while not self._closed:
+                    job = self._pop()
+                    if job is not None:
+                        break
+                    self._condition.wait()
+                if job is None:
+                    return
+                # The host of a job changes once its upload is created.
+                host = job.host
+                self._running[host] = self._running.get(host, 0) + 1
+                # Jobs joining later start at the current virtual time, so that they
+                # do not get to catch up on the service they did not ask for.
+                self._virtual_time = max(self._virtual_time, job._virtual_time)
+
+            error = None
+            try:
+                sent = job._step()
+            except Exception as err:
+                error = err
+            done = error is not None or job._finished
+            if done:
+                # Record the completion and close the file outside of the lock, before
+                # the job is done.
+                try:
+                    job._close()
+                except Exception as err:
+                    error = error or err
+
+            with self._condition:
+                self._running[host] -= 1
+                if not done:
+                    job._virtual_time += max(sent, 1) / job.weight
+                    self._push(job)
+                else:
+                    if error is None:
+                        job.future.set_result(job.uploader.url)
+                    else:
+                        job.future.set_exception(error)
+                    self._pending -= 1
+                self._condition.notify_all()
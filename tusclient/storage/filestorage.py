@@ -1,15 +1,45 @@
 """
 An implementation of <tusclient.storage.interface.Storage>, using a file as storage.
 """
+from typing import Optional
+import threading
+
 from tinydb import TinyDB, Query
 
 from . import interface
 
 
 class FileStorage(interface.Storage):
+    """
+    Url storage kept in a JSON file with TinyDB.
+
+    The storage may be shared by uploaders running in several threads, but not by several
+    processes: see <tusclient.storage.sqlitestorage.SQLiteStorage> for that.
+
+    Nor is it suited as an offset journal (see `offset_journal` of
+    <tusclient.uploader.baseuploader.BaseUploader>): TinyDB rewrites the whole file on
+    every write, without syncing it to disk, so journaling an offset after each chunk
+    costs time proportional to the size of the storage, and the journal may be lost
+    with the machine. <tusclient.storage.sqlitestorage.SQLiteStorage> journals offsets
+    with a single durable row update.
+
+    :Constructor Args:
+        - fp (str): The path of the file.
+    """
+
     def __init__(self, fp):
+        # TinyDB itself is not thread-safe.
+        self._lock = threading.RLock()
         self._db = TinyDB(fp)
         self._urls = Query()
+        self._completed = self._db.table("completed")
+        self._offsets = self._db.table("offsets")
+        # Completion records are looked up for every file of a tree, so they are indexed
+        # in memory by key rather than searched for in the file each time.
+        self._completed_index = {
+            record["key"]: (record.doc_id, self._completed_upload(record))
+            for record in self._completed.all()
+        }
 
     def get_item(self, key: str):
         """
@@ -19,7 +49,8 @@ class FileStorage(interface.Storage):
             - key[str]: The unique id for the stored item (in this case, url)
         :Returns: url[str]
         """
-        result = self._db.search(self._urls.key == key)
+        with self._lock:
+            result = self._db.search(self._urls.key == key)
         return result[0].get("url") if result else None
 
     def set_item(self, key: str, url: str):
@@ -30,19 +61,121 @@ class FileStorage(interface.Storage):
             - key[str]: The unique id to which the item (in this case, url) would be stored.
             - value[str]: The actual url value to be stored.
         """
-        if self._db.search(self._urls.key == key):
-            self._db.update({"url": url}, self._urls.key == key)
-        else:
-            self._db.insert({"key": key, "url": url})
+        with self._lock:
+            if self._db.search(self._urls.key == key):
+                self._db.update({"url": url}, self._urls.key == key)
+            else:
+                self._db.insert({"key": key, "url": url})
 
     def remove_item(self, key: str):
         """
         Remove/Delete the url value under the unique key from storage.
         """
-        self._db.remove(self._urls.key == key)
+        with self._lock:
+            self._db.remove(self._urls.key == key)
+
+    def get_completed(self, key: str) -> Optional[interface.CompletedUpload]:
+        """
+        Return the record of the finished upload of a file, identified by the key
+        specified, or None if the file is not known to have been uploaded.
+
+        :Args:
+            - key[str]: The unique id of the file.
+        :Returns: Optional[<tusclient.storage.interface.CompletedUpload>]
+        """
+        with self._lock:
+            entry = self._completed_index.get(key)
+        return entry[1] if entry else None
+
+    @staticmethod
+    def _completed_upload(record) -> interface.CompletedUpload:
+        return interface.CompletedUpload(
+            record["url"],
+            record["size"],
+            record.get("digest"),
+            record.get("digest_algorithm"),
+        )
+
+    def set_completed(
+        self,
+        key: str,
+        url: str,
+        size: int,
+        digest: Optional[str] = None,
+        digest_algorithm: Optional[str] = None,
+    ):
+        """
+        Record that the file identified by the key has been uploaded completely.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the finished upload.
+            - size[int]: The size of the file.
+            - digest[Optional[str]]: The hexadecimal digest of the file.
+            - digest_algorithm[Optional[str]]: The `hashlib` name of the digest's algorithm.
+        """
+        record = {
+            "url": url,
+            "size": size,
+            "digest": digest,
+            "digest_algorithm": digest_algorithm,
+        }
+        with self._lock:
+            entry = self._completed_index.get(key)
+            if entry is not None:
+                doc_id = entry[0]
+                self._completed.update(record, doc_ids=[doc_id])
+            else:
+                doc_id = self._completed.insert(dict(record, key=key))
+            self._completed_index[key] = (doc_id, self._completed_upload(record))
+
+    def remove_completed(self, key: str):
+        """
+        Remove the completion record of the file identified by the key.
+        """
+        with self._lock:
+            entry = self._completed_index.pop(key, None)
+            if entry is not None:
+                self._completed.remove(doc_ids=[entry[0]])
+
+    def get_offset(self, key: str, url: str) -> Optional[int]:
+        """
+        Return the offset journaled for the upload of the file identified by the key, if
+        it was journaled for the given upload url.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the upload.
+        :Returns: Optional[int]
+        """
+        with self._lock:
+            result = self._offsets.search(
+                (self._urls.key == key) & (self._urls.url == url)
+            )
+        return result[0]["offset"] if result else None
+
+    def set_offset(self, key: str, url: str, offset: int):
+        """
+        Journal the offset acknowledged by the server for the upload of the file
+        identified by the key.
+
+        This rewrites the whole file, see the notes on journaling above.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the upload.
+            - offset[int]: The acknowledged offset.
+        """
+        record = {"url": url, "offset": offset}
+        with self._lock:
+            if self._offsets.search(self._urls.key == key):
+                self._offsets.update(record, self._urls.key == key)
+            else:
+                self._offsets.insert(dict(record, key=key))
 
     def close(self):
         """
         Close the file storage and release all opened files.
         """
-        self._db.close()
+        with self._lock:
+            self._db.close()
@@ -1,9 +1,27 @@
 """
 Interface module defining a url storage API.
 """
+from typing import NamedTuple, Optional
 import abc
 
 
+class CompletedUpload(NamedTuple):
+    """
+    Record of a finished upload.
+
+    :Attributes:
+        - url (str): The url of the upload.
+        - size (int): The size of the uploaded file.
+        - digest (Optional[str]): The hexadecimal digest of the file, if it was computed.
+        - digest_algorithm (Optional[str]): The `hashlib` name of the digest's algorithm.
+    """
+
+    url: str
+    size: int
+    digest: Optional[str] = None
+    digest_algorithm: Optional[str] = None
+
+
 class Storage(object, metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def get_item(self, key):
@@ -33,3 +51,64 @@ class Storage(object, metaclass=abc.ABCMeta):
         Remove/Delete the url value under the unique key from storage.
         """
         pass
+
+    def get_completed(self, key) -> Optional[CompletedUpload]:
+        """
+        Return the record of the finished upload of a file, identified by the key
+        specified, or None if the file is not known to have been uploaded.
+
+        Storages that do not implement the completion records never return one, in which
+        case finished uploads are resumed through their stored url as any other.
+
+        :Args:
+            - key[str]: The unique id of the file.
+        :Returns: Optional[<tusclient.storage.interface.CompletedUpload>]
+        """
+        return None
+
+    def set_completed(self, key, url, size, digest=None, digest_algorithm=None):
+        """
+        Record that the file identified by the key has been uploaded completely.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the finished upload.
+            - size[int]: The size of the file.
+            - digest[Optional[str]]: The hexadecimal digest of the file.
+            - digest_algorithm[Optional[str]]: The `hashlib` name of the digest's algorithm.
+        """
+        pass
+
+    def remove_completed(self, key):
+        """
+        Remove the completion record of the file identified by the key, so that it is
+        uploaded again.
+        """
+        pass
+
+    def get_offset(self, key, url) -> Optional[int]:
+        """
+        Return the offset last acknowledged by the server for the upload of the file
+        identified by the key, if it was journaled for the given upload url.
+
+        Storages that do not implement the offset journal never return one, in which case
+        the offset of resumed uploads is always asked from the server.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the upload.
+        :Returns: Optional[int]
+        """
+        return None
+
+    def set_offset(self, key, url, offset):
+        """
+        Journal the offset acknowledged by the server for the upload of the file
+        identified by the key.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the upload.
+            - offset[int]: The acknowledged offset.
+        """
+        pass
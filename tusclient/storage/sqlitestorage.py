@@ -0,0 +1,245 @@
+"""
+An implementation of <tusclient.storage.interface.Storage>, using an SQLite database as
+storage, which may be shared by several processes.
+"""
+from typing import Callable, Optional
+import sqlite3
+import threading
+import time
+
+from . import interface
+
+
+class SQLiteStorage(interface.Storage):
+    """
+    Url storage kept in an SQLite database.
+
+    Unlike <tusclient.storage.filestorage.FileStorage>, the storage may be shared by
+    several processes, each opening the database file with its own instance, as well as
+    by uploaders running in several threads. Writes are serialized by SQLite's file
+    locks; a process waits up to `timeout` seconds for another one to finish writing.
+
+    The storage also keeps leases, with which workers sharing it claim uploads so that
+    each one is uploaded by a single worker at a time (see <tusclient.workers>). A lease
+    expires unless its owner renews it, so that the uploads of crashed workers can be
+    claimed by others.
+
+    :Constructor Args:
+        - path (str): The path of the database file.
+        - timeout (Optional[float]):
+            The number of seconds to wait for the database to be unlocked. Defaults to 30.
+        - clock (Optional[Callable[[], float]]):
+            The clock of the lease expiry times. It must agree between all processes
+            sharing the storage. Defaults to `time.time`.
+    """
+
+    def __init__(
+        self, path: str, timeout: float = 30.0, clock: Callable[[], float] = time.time
+    ):
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            path, timeout=timeout, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            with self._transaction():
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS urls (key TEXT PRIMARY KEY, url TEXT NOT NULL)"
+                )
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS completed (key TEXT PRIMARY KEY, "
+                    "url TEXT NOT NULL, size INTEGER NOT NULL, digest TEXT, "
+                    "digest_algorithm TEXT)"
+                )
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS offsets (key TEXT PRIMARY KEY, "
+                    "url TEXT NOT NULL, upload_offset INTEGER NOT NULL)"
+                )
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, "
+                    "owner TEXT NOT NULL, expires REAL NOT NULL)"
+                )
+
+    def get_item(self, key: str):
+        """
+        Return the tus url of a file, identified by the key specified.
+
+        :Args:
+            - key[str]: The unique id for the stored item (in this case, url)
+        :Returns: url[str]
+        """
+        with self._lock:
+            row = self._db.execute("SELECT url FROM urls WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_item(self, key: str, url: str):
+        """
+        Store the url value under the unique key.
+
+        :Args:
+            - key[str]: The unique id to which the item (in this case, url) would be stored.
+            - value[str]: The actual url value to be stored.
+        """
+        with self._lock:
+            if url is None:
+                self._db.execute("DELETE FROM urls WHERE key = ?", (key,))
+            else:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO urls (key, url) VALUES (?, ?)", (key, url)
+                )
+
+    def remove_item(self, key: str):
+        """
+        Remove/Delete the url value under the unique key from storage.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM urls WHERE key = ?", (key,))
+
+    def get_completed(self, key: str) -> Optional[interface.CompletedUpload]:
+        """
+        Return the record of the finished upload of a file, identified by the key
+        specified, or None if the file is not known to have been uploaded.
+
+        :Args:
+            - key[str]: The unique id of the file.
+        :Returns: Optional[<tusclient.storage.interface.CompletedUpload>]
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, size, digest, digest_algorithm FROM completed WHERE key = ?",
+                (key,),
+            ).fetchone()
+        return interface.CompletedUpload(*row) if row else None
+
+    def set_completed(
+        self,
+        key: str,
+        url: str,
+        size: int,
+        digest: Optional[str] = None,
+        digest_algorithm: Optional[str] = None,
+    ):
+        """
+        Record that the file identified by the key has been uploaded completely.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the finished upload.
+            - size[int]: The size of the file.
+            - digest[Optional[str]]: The hexadecimal digest of the file.
+            - digest_algorithm[Optional[str]]: The `hashlib` name of the digest's algorithm.
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO completed (key, url, size, digest, digest_algorithm) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, url, size, digest, digest_algorithm),
+            )
+
+    def remove_completed(self, key: str):
+        """
+        Remove the completion record of the file identified by the key.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM completed WHERE key = ?", (key,))
+
+    def get_offset(self, key: str, url: str) -> Optional[int]:
+        """
+        Return the offset journaled for the upload of the file identified by the key, if
+        it was journaled for the given upload url.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the upload.
+        :Returns: Optional[int]
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT upload_offset FROM offsets WHERE key = ? AND url = ?", (key, url)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_offset(self, key: str, url: str, offset: int):
+        """
+        Journal the offset acknowledged by the server for the upload of the file
+        identified by the key.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the upload.
+            - offset[int]: The acknowledged offset.
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO offsets (key, url, upload_offset) VALUES (?, ?, ?)",
+                (key, url, offset),
+            )
+
+    def claim(self, key: str, owner: str, ttl: float) -> bool:
+        """
+        Take the lease of the upload identified by the key for `ttl` seconds, unless
+        another owner holds an unexpired lease on it.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - owner[str]: The unique id of the worker claiming the upload.
+            - ttl[float]: The number of seconds after which the lease expires.
+        :Returns: bool, whether the lease was taken.
+        """
+        with self._lock, self._transaction(immediate=True):
+            now = self._clock()
+            row = self._db.execute(
+                "SELECT owner, expires FROM leases WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] != owner and row[1] > now:
+                return False
+            self._db.execute(
+                "INSERT OR REPLACE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                (key, owner, now + ttl),
+            )
+        return True
+
+    def renew(self, key: str, owner: str, ttl: float) -> bool:
+        """
+        Extend a lease held by the owner to `ttl` seconds from now.
+
+        :Returns: bool, False if the lease was lost, i.e. it expired and was taken by
+            another owner.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE leases SET expires = ? WHERE key = ? AND owner = ?",
+                (self._clock() + ttl, key, owner),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, key: str, owner: str):
+        """
+        Give up a lease, if it is still held by the owner.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def _transaction(self, immediate: bool = False):
+        # The connection is in autocommit mode; batches are grouped explicitly.
+        return _Transaction(self._db, immediate)
+
+
+class _Transaction:
+    def __init__(self, db: sqlite3.Connection, immediate: bool = False):
+        self._db = db
+        self._immediate = immediate
+
+    def __enter__(self):
+        # An immediate transaction takes the write lock before reading, so that no
+        # other process can change what was read before it is written.
+        self._db.execute("BEGIN IMMEDIATE" if self._immediate else "BEGIN")
+
+    def __exit__(self, exc_type, exc, tb):
+        self._db.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -0,0 +1,256 @@
+"""
+Stream helpers for the data sources an upload can be read from.
+"""
+from typing import IO, Iterable, Union
+import io
+import os
+import threading
+
+
+def is_seekable(stream) -> bool:
+    """
+    Return whether the file stream supports random access.
+
+    Iterables which are not file-like at all are never seekable.
+    """
+    if not hasattr(stream, "read"):
+        return False
+    seekable = getattr(stream, "seekable", None)
+    if seekable is None:
+        return hasattr(stream, "seek")
+    try:
+        return bool(seekable())
+    except ValueError:
+        # e.g. the stream has been closed.
+        return False
+
+
+def is_buffer(source) -> bool:
+    """
+    Return whether the source is an in-memory buffer (an object supporting the buffer
+    protocol, e.g. bytes, bytearray, memoryview or a numpy array) rather than a stream.
+    """
+    if hasattr(source, "read"):
+        return False
+    try:
+        memoryview(source).release()
+    except TypeError:
+        return False
+    return True
+
+
+class MemoryStream:
+    """
+    Read-only, seekable file-like view of an in-memory buffer.
+
+    `read` returns `memoryview` slices of the buffer instead of copies, so that chunks
+    are checksummed and sent straight from the caller's memory. The buffer must not
+    be modified while it is being uploaded.
+
+    :Attributes:
+        - nbytes (int): The size of the buffer in bytes.
+    :Constructor Args:
+        - source: Any C-contiguous object supporting the buffer protocol.
+    """
+
+    def __init__(self, source):
+        view = memoryview(source)
+        if not view.c_contiguous:
+            raise ValueError("The buffer to upload must be C-contiguous.")
+        self._view = view.cast("B") if view.ndim != 1 or view.format != "B" else view
+        self.nbytes = self._view.nbytes
+        self._position = 0
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.nbytes
+        if offset < 0:
+            raise ValueError("negative seek position {}".format(offset))
+        self._position = offset
+        return offset
+
+    def read(self, size: int = -1) -> memoryview:
+        end = self.nbytes if size is None or size < 0 else self._position + size
+        data = self._view[self._position : end]
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        memoryview(buffer).cast("B")[: len(data)] = data
+        return len(data)
+
+
+class FileSection:
+    """
+    Read-only, seekable file-like view of the byte range [start, start + length) of a
+    file, which is uploaded as if it were the whole file.
+
+    Transports sending chunks with `sendfile` send sections straight from the
+    underlying file, see <tusclient.request.TusRequest.get_file_range>.
+
+    :Attributes:
+        - file (file): The underlying file, opened in binary mode.
+        - start (int): The position of the section in the file.
+        - length (int): The size of the section in bytes.
+    :Constructor Args:
+        - file (file)
+        - start (int)
+        - length (int):
+            Clamped to the end of the file, so that sections of a growing file can be
+            given in advance.
+    """
+
+    def __init__(self, file: IO, start: int, length: int):
+        if start < 0 or length < 0:
+            raise ValueError("The start and length of a section cannot be negative.")
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        self.file = file
+        self.start = start
+        self.length = max(0, min(length, size - start))
+        self._position = 0
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.length
+        if offset < 0:
+            raise ValueError("negative seek position {}".format(offset))
+        self._position = offset
+        return offset
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = max(0, self.length - self._position)
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        self.file.seek(self.start + self._position)
+        data = self.file.read(size)
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        remaining = max(0, self.length - self._position)
+        self.file.seek(self.start + self._position)
+        count = self.file.readinto(view[: min(len(view), remaining)])
+        self._position += count
+        return count
+
+    def close(self):
+        self.file.close()
+
+
+class ReplayBuffer:
+    """
+    Read-only file-like wrapper making a non-seekable source replayable.
+
+    Data read from the source is kept in memory until it is released, which the
+    uploader does once the server has acknowledged it. Until then, the stream can be
+    seeked back to any offset which has not been released, so that a failed chunk can
+    be sent again from the offset the server reports. Memory use is therefore bounded
+    by the amount of data which has been read but not yet acknowledged, i.e. usually
+    a single chunk.
+
+    :Attributes:
+        - start (int):
+            The first offset that can still be read.
+    :Constructor Args:
+        - source (IO | Iterable[bytes]):
+            A readable, non-seekable stream (e.g. stdin, a pipe or a socket file) or an
+            iterable (e.g. a generator) of bytes.
+    """
+
+    # Largest amount of data requested from the source at once.
+    READ_SIZE = 1024 * 1024
+
+    def __init__(self, source: Union[IO, Iterable[bytes]]):
+        if hasattr(source, "read"):
+            self._read_source = source.read
+        else:
+            self._iterator = iter(source)
+            self._read_source = self._read_iterator
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self.start = 0
+        self._position = 0
+        self._eof = False
+
+    def seekable(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """
+        Move to `offset`, which must not have been released already.
+        """
+        if whence != os.SEEK_SET:
+            raise io.UnsupportedOperation("only absolute seeks are supported")
+        with self._lock:
+            if offset < self.start:
+                raise ValueError(
+                    "Cannot replay data before offset {} as it has already been "
+                    "released.".format(self.start)
+                )
+            self._position = offset
+        return offset
+
+    def read(self, size: int = -1) -> bytes:
+        with self._lock:
+            end = None if size is None or size < 0 else self._position + size
+            self._fill(end)
+            buffer_end = self.start + len(self._buffer)
+            end = buffer_end if end is None else min(end, buffer_end)
+            if end <= self._position:
+                return b""
+            with memoryview(self._buffer) as view:
+                data = bytes(view[self._position - self.start : end - self.start])
+            self._position = end
+            return data
+
+    def release(self, offset: int):
+        """
+        Drop the buffered data before `offset`, which will never be read again.
+        """
+        with self._lock:
+            offset = min(offset, self.start + len(self._buffer))
+            if offset > self.start:
+                del self._buffer[: offset - self.start]
+                self.start = offset
+
+    def _fill(self, end):
+        while not self._eof:
+            missing = None if end is None else end - self.start - len(self._buffer)
+            if missing is not None and missing <= 0:
+                return
+            block = self._read_source(
+                self.READ_SIZE if missing is None else min(missing, self.READ_SIZE)
+            )
+            if not block:
+                self._eof = True
+            else:
+                self._buffer.extend(block)
+
+    def _read_iterator(self, size: int) -> bytes:
+        # Iterables produce blocks of their own choosing, so `size` is only a hint.
+        for block in self._iterator:
+            if block:
+                return block
+        return b""
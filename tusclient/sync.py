@@ -0,0 +1,354 @@
+"""
+Incremental upload of directory trees.
+
+A <tusclient.sync.SyncManifest> remembers the device, inode, size and modification time of
+every file of a tree along with the state of its upload. Syncing the tree again only costs a
+`stat` per file: files whose metadata is unchanged since they were uploaded are skipped
+without being opened, and only new or modified files are uploaded. Interrupted uploads
+are resumed from the url recorded in the manifest.
+"""
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+import contextlib
+import os
+import sqlite3
+import threading
+
+from tusclient.fingerprint.statfingerprint import StatFingerprint, stat_key
+from tusclient.resume import resume_uploaders
+from tusclient.storage import interface
+
+if TYPE_CHECKING:
+    from tusclient.client import TusClient
+
+
+class SyncManifest(interface.Storage):
+    """
+    Manifest of the files of a tree, kept in an SQLite database.
+
+    Each file is recorded under its path relative to the tree, with its
+    <tusclient.fingerprint.statfingerprint.StatFingerprint>. The manifest is also the url
+    storage of the uploads it tracks, so that their urls and completion are recorded as
+    they progress. It may be shared by uploaders running in several threads.
+
+    :Constructor Args:
+        - path (str): The path of the database file.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, key TEXT NOT NULL, url TEXT, completed_url TEXT, "
+                "size INTEGER, digest TEXT, digest_algorithm TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS files_key ON files (key)")
+
+    def entries(self) -> Dict[str, Tuple[str, bool]]:
+        """
+        Return the fingerprint of every tracked file, and whether it has been uploaded,
+        by path.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT path, key, completed_url FROM files").fetchall()
+        return {path: (key, url is not None) for path, key, url in rows}
+
+    def track(self, files: List[Tuple[str, str]]):
+        """
+        Record new or modified files, as (path, fingerprint) pairs, forgetting the state
+        of their previous uploads. Hard links of tracked files take the state of their
+        upload.
+        """
+        with self._lock, self._transaction():
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files "
+                "(path, key, url, completed_url, size, digest, digest_algorithm) "
+                "SELECT :path, :key, f.url, f.completed_url, f.size, f.digest, "
+                "f.digest_algorithm FROM (SELECT 1) "
+                "LEFT JOIN files AS f ON f.key = :key AND f.path != :path "
+                "ORDER BY f.completed_url IS NULL LIMIT 1",
+                ({"path": path, "key": key} for path, key in files),
+            )
+
+    def untrack(self, paths: List[str]):
+        """Forget files which were removed from the tree."""
+        with self._lock, self._transaction():
+            self._db.executemany("DELETE FROM files WHERE path = ?", ((p,) for p in paths))
+
+    def get_item(self, key: str):
+        """
+        Return the tus url of a file, identified by the key specified.
+
+        :Args:
+            - key[str]: The unique id for the stored item (in this case, url)
+        :Returns: url[str]
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url FROM files WHERE key = ? AND url IS NOT NULL", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_item(self, key: str, url: str):
+        """
+        Store the url value under the unique key. Only files tracked by the manifest are
+        stored.
+
+        :Args:
+            - key[str]: The unique id to which the item (in this case, url) would be stored.
+            - value[str]: The actual url value to be stored.
+        """
+        with self._lock:
+            self._db.execute("UPDATE files SET url = ? WHERE key = ?", (url, key))
+
+    def remove_item(self, key: str):
+        """
+        Remove/Delete the url value under the unique key from storage.
+        """
+        with self._lock:
+            self._db.execute("UPDATE files SET url = NULL WHERE key = ?", (key,))
+
+    def get_completed(self, key: str) -> Optional[interface.CompletedUpload]:
+        """
+        Return the record of the finished upload of a file, identified by the key
+        specified, or None if the file is not known to have been uploaded.
+
+        :Args:
+            - key[str]: The unique id of the file.
+        :Returns: Optional[<tusclient.storage.interface.CompletedUpload>]
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT completed_url, size, digest, digest_algorithm FROM files "
+                "WHERE key = ? AND completed_url IS NOT NULL",
+                (key,),
+            ).fetchone()
+        return interface.CompletedUpload(*row) if row else None
+
+    def set_completed(
+        self,
+        key: str,
+        url: str,
+        size: int,
+        digest: Optional[str] = None,
+        digest_algorithm: Optional[str] = None,
+    ):
+        """
+        Record that the file identified by the key has been uploaded completely.
+
+        :Args:
+            - key[str]: The unique id of the file.
+            - url[str]: The url of the finished upload.
+            - size[int]: The size of the file.
+            - digest[Optional[str]]: The hexadecimal digest of the file.
+            - digest_algorithm[Optional[str]]: The `hashlib` name of the digest's algorithm.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE files SET completed_url = ?, size = ?, digest = ?, "
+                "digest_algorithm = ? WHERE key = ?",
+                (url, size, digest, digest_algorithm, key),
+            )
+
+    def remove_completed(self, key: str):
+        """
+        Remove the completion record of the file identified by the key.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE files SET completed_url = NULL, size = NULL, digest = NULL, "
+                "digest_algorithm = NULL WHERE key = ?",
+                (key,),
+            )
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # The connection is in autocommit mode; batches are grouped explicitly.
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+
+class ScanResult(NamedTuple):
+    """
+    Changes of a tree since it was last synced.
+
+    :Attributes:
+        - changed (list): The paths of the files to upload: new, modified or not uploaded yet.
+        - unchanged (int): The number of files uploaded before and not modified since.
+        - deleted (list): The paths of the files which were removed from the tree.
+    """
+
+    changed: List[str]
+    unchanged: int
+    deleted: List[str]
+
+
+class SyncReport(NamedTuple):
+    """
+    Outcome of syncing a tree.
+
+    :Attributes:
+        - uploaded (list): The paths of the files which were uploaded.
+        - unchanged (int): The number of files skipped because they were uploaded before.
+        - deleted (list): The paths of the files which were removed from the tree.
+        - errors (dict): The error which made the upload of each failed file fail, by path.
+    """
+
+    uploaded: List[str]
+    unchanged: int
+    deleted: List[str]
+    errors: Dict[str, Exception]
+
+
+def _walk(root: str, prefix: str = "") -> Iterator[Tuple[str, str]]:
+    """Yield the relative path and fingerprint of every file of a tree, in order."""
+    try:
+        entries = sorted(os.scandir(os.path.join(root, prefix)), key=lambda e: e.name)
+    except OSError:
+        return
+    for entry in entries:
+        path = os.path.join(prefix, entry.name)
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(root, path)
+            elif entry.is_file():
+                stat = entry.stat()
+                if not stat.st_ino:
+                    # The stat of directory entries has no device and inode on Windows.
+                    stat = os.stat(entry.path)
+                yield path, stat_key(
+                    stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+                )
+        except OSError:
+            # The file was removed while scanning.
+            continue
+
+
+def scan(root: str, manifest: SyncManifest) -> ScanResult:
+    """
+    Compare a tree with its manifest, and record the new and modified files in it.
+
+    Files are only `stat`-ed, not opened.
+
+    :Args:
+        - root (str): The directory at the root of the tree.
+        - manifest (<tusclient.sync.SyncManifest>)
+    :Returns: <tusclient.sync.ScanResult>, with paths relative to `root`.
+    """
+    known = manifest.entries()
+    changed = []
+    unchanged = 0
+    modified = []
+    for path, key in _walk(root):
+        previous = known.pop(path, None)
+        if previous == (key, True):
+            unchanged += 1
+            continue
+        changed.append(path)
+        if previous is None or previous[0] != key:
+            modified.append((path, key))
+    deleted = sorted(known)
+    manifest.track(modified)
+    manifest.untrack(deleted)
+    return ScanResult(changed, unchanged, deleted)
+
+
+def sync_directory(
+    client: "TusClient",
+    root: str,
+    manifest: SyncManifest,
+    max_workers: int = 4,
+    policy: str = "fifo",
+    per_host: Optional[int] = None,
+    **uploader_kwargs
+) -> SyncReport:
+    """
+    Upload the new and modified files of a tree.
+
+    The uploads are resumed concurrently (see <tusclient.resume.resume_uploaders>) and
+    run on a <tusclient.scheduler.UploadScheduler>. Each file is uploaded with its
+    relative path as `relativePath` and its name as `filename` metadata.
+
+    Hard links of a file are uploaded once, with the metadata of the first of their paths,
+    and their other paths are reported along with it.
+
+    :Args:
+        - client (<tusclient.client.TusClient>)
+        - root (str): The directory at the root of the tree.
+        - manifest (<tusclient.sync.SyncManifest>)
+        - max_workers (int):
+            The number of concurrent uploads, and of concurrent offset requests while
+            resuming them. Defaults to 4.
+        - policy (str): The scheduling policy. Defaults to "fifo".
+        - per_host (Optional[int]): The maximum number of requests in flight to the server.
+        - uploader_kwargs: Further arguments of the uploaders, e.g. `chunk_size`.
+    :Returns: <tusclient.sync.SyncReport>
+    """
+    result = scan(root, manifest)
+    errors: Dict[str, Exception] = {}
+    uploaders = {}
+    # The path each file is uploaded under, by key, and the paths of its other hard
+    # links, which share its upload.
+    paths: Dict[str, str] = {}
+    links: Dict[str, str] = {}
+    metadata = uploader_kwargs.pop("metadata", None) or {}
+    for path in result.changed:
+        try:
+            uploader = client.uploader(
+                os.path.join(root, path),
+                metadata=dict(
+                    metadata,
+                    filename=os.path.basename(path),
+                    relativePath=path.replace(os.sep, "/"),
+                ),
+                store_url=True,
+                url_storage=manifest,
+                fingerprinter=StatFingerprint(),
+                resolve_offset=False,
+                **uploader_kwargs
+            )
+        except (OSError, ValueError) as error:
+            errors[path] = error
+            continue
+        # Do not hold a descriptor for every file until its upload starts.
+        uploader.close()
+        if uploader.storage_key in paths:
+            # Uploading a file twice at once would race for its stored url.
+            links[path] = paths[uploader.storage_key]
+            continue
+        paths[uploader.storage_key] = path
+        uploaders[path] = uploader
+
+    report = resume_uploaders(uploaders.values(), max_workers=max_workers)
+    jobs = {}
+    with client.scheduler(
+        max_workers=max_workers, per_host=per_host, policy=policy
+    ) as scheduler:
+        for path, uploader in uploaders.items():
+            if uploader in report.errors:
+                errors[path] = report.errors[uploader]
+            elif not uploader.completed:
+                jobs[path] = scheduler.submit(uploader)
+
+    uploaded = []
+    for path in result.changed:
+        job = jobs.get(links.get(path, path))
+        if job is not None and job.future.exception() is not None:
+            errors[path] = job.future.exception()
+        elif path in links and links[path] in errors:
+            errors[path] = errors[links[path]]
+        elif path not in errors:
+            uploaded.append(path)
+    return SyncReport(uploaded, result.unchanged, result.deleted, errors)
@@ -0,0 +1,598 @@
+"""
+A local tus server for exercising the client against real network trouble.
+
+The server implements the parts of the tus protocol used by this client
+(creation, HEAD, PATCH, deferred length, checksums, also as trailers of chunked
+bodies, and concatenation) on top of
+`http.server`, and can inject faults into the requests it receives:
+
+    - latency: a fixed delay before every response.
+    - bandwidth: a cap (bytes per second) on how fast request bodies are read.
+    - reset: close the connection (with a TCP reset) part way through a body.
+    - conflict: answer with 409, as for an offset mismatch.
+    - lock: answer with 423, as for a locked upload.
+    - error: answer with a 5xx status code.
+
+Every PATCH is recorded, so that after an upload the server can report how long
+the client took to recover from the injected faults and how many bytes it had
+to send again.
+
+.. code:: python
+
+    from tusclient import client
+    from tusclient.testing import TusServer
+
+    with TusServer() as server:
+        server.inject("error", count=3, status=503)
+        uploader = client.TusClient(server.url).uploader(
+            "path/to/file.ext", chunk_size=1024, retries=5, retry_delay=0
+        )
+        uploader.upload()
+        print(server.report())
+"""
+from typing import Dict, List, NamedTuple, Optional
+from base64 import b64decode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+import collections
+import hashlib
+import socket
+import ssl
+import struct
+import sys
+import threading
+import time
+import uuid
+
+FAULT_KINDS = ("reset", "conflict", "lock", "error")
+
+# SO_LINGER with a zero timeout makes closing the socket send a RST. The layout of
+# `struct linger` is two ints on POSIX systems but two u_shorts on Windows.
+_LINGER_RESET = struct.pack("HH" if sys.platform == "win32" else "ii", 1, 0)
+
+
+class Fault:
+    """
+    A fault to be injected into upcoming requests.
+
+    :Attributes:
+        - kind (str):
+            One of 'reset', 'conflict', 'lock' or 'error'.
+        - count (int):
+            How many consecutive requests the fault applies to.
+        - method (str):
+            The HTTP method of the requests the fault applies to. Defaults to 'PATCH'.
+        - status (int):
+            The status code sent for 'error' faults. Defaults to 500.
+        - after_bytes (int):
+            How many body bytes are read before the connection is reset for 'reset'
+            faults. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        count: int = 1,
+        method: str = "PATCH",
+        status: int = 500,
+        after_bytes: int = 0,
+    ):
+        if kind not in FAULT_KINDS:
+            raise ValueError("unknown fault kind {}".format(kind))
+        self.kind = kind
+        self.count = count
+        self.method = method
+        self.status = status
+        self.after_bytes = after_bytes
+
+
+class RequestRecord(NamedTuple):
+    """A request received by the server."""
+
+    method: str
+    path: str
+    start: float
+    end: float
+    status: Optional[int]
+    body_bytes: int
+    fault: Optional[str]
+
+
+class RecoveryReport(NamedTuple):
+    """
+    Summary of how an upload fared against the injected faults.
+
+    :Attributes:
+        - faults (int):
+            Number of requests a fault was injected into.
+        - recoveries (list[float]):
+            For every run of consecutive faulted requests, the time (in seconds) from
+            the start of its first faulted request to the end of the next
+            successful PATCH.
+        - time_to_recover (float):
+            Sum of `recoveries`.
+        - bytes_sent (int):
+            Number of body bytes the server received with PATCH requests.
+        - bytes_stored (int):
+            Number of bytes that ended up stored in uploads.
+        - bytes_resent (int):
+            Number of body bytes which were received but had to be discarded, i.e.
+            bytes the client sent more than once.
+        - requests (int):
+            Total number of requests received.
+    """
+
+    faults: int
+    recoveries: List[float]
+    time_to_recover: float
+    bytes_sent: int
+    bytes_stored: int
+    bytes_resent: int
+    requests: int
+
+
+class _Upload:
+    def __init__(self, length: Optional[int], metadata: str, concat: Optional[str] = None):
+        self.length = length
+        self.metadata = metadata
+        self.concat = concat
+        self.data = bytearray()
+        # Held by the PATCH writing to the upload. Like tusd, a new PATCH asks it to
+        # stop (`release`) and takes over, e.g. after a client gave up on a stalled
+        # request whose data is still arriving.
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+
+
+class TusServer:
+    """
+    Threaded local tus server with fault injection.
+
+    :Attributes:
+        - latency (float):
+            Seconds to wait before sending every response. Defaults to 0.
+        - bandwidth (Optional[int]):
+            Maximum number of body bytes read per second by each request.
+            Unlimited if None.
+        - uploads (dict):
+            The uploads created on the server, by upload id.
+        - records (list[RequestRecord]):
+            Every request received so far.
+    :Constructor Args:
+        - host (Optional[str])
+        - port (Optional[int]): 0 picks a free port.
+        - latency (Optional[float])
+        - bandwidth (Optional[int])
+        - ssl_context (Optional[ssl.SSLContext]):
+            A server side context to serve HTTPS with, e.g. to require client certificates.
+    """
+
+    READ_BLOCK_SIZE = 16384
+    LOCK_TIMEOUT = 5.0
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        bandwidth: Optional[int] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.uploads: Dict[str, _Upload] = {}
+        self.records: List[RequestRecord] = []
+        self._faults = collections.deque()
+        self._paces: Dict[str, collections.deque] = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), _TusHandler)
+        self._httpd.tus_server = self
+        if ssl_context is not None:
+            # Handshakes are made by the request threads, on first read.
+            self._httpd.socket = ssl_context.wrap_socket(
+                self._httpd.socket, server_side=True, do_handshake_on_connect=False
+            )
+        self._scheme = "http" if ssl_context is None else "https"
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """The creation url of the server."""
+        host, port = self._httpd.server_address[:2]
+        return "{}://{}:{}/files/".format(self._scheme, host, port)
+
+    def start(self):
+        """Start serving requests in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server and release its socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def inject(self, kind: str, count: int = 1, **options):
+        """
+        Inject a fault into the next `count` matching requests.
+
+        Faults are applied in the order they were injected.
+
+        :Args:
+            - kind (str): see `Fault`.
+            - count (Optional[int]): see `Fault`.
+            - options: further `Fault` arguments.
+        """
+        with self._lock:
+            self._faults.append(Fault(kind, count, **options))
+
+    def pace(self, method: str, latency: float = 0.0, bandwidth: Optional[int] = None):
+        """
+        Set the latency and bandwidth of a single upcoming request with the given
+        method, instead of the server's `latency` and `bandwidth`.
+
+        The paces set for a method apply to its next requests, one each, in the order
+        they were set, e.g. to reproduce the timings of a trace (see <tusclient.replay>).
+        """
+        with self._lock:
+            self._paces[method].append((latency, bandwidth))
+
+    def reset(self):
+        """Forget all uploads, records, pending faults and paces."""
+        with self._lock:
+            self.uploads.clear()
+            self.records.clear()
+            self._faults.clear()
+            self._paces.clear()
+
+    def get_upload_data(self, url: str) -> bytes:
+        """Return the bytes stored for the upload at `url`."""
+        return bytes(self.uploads[_upload_id(url)].data)
+
+    def report(self) -> RecoveryReport:
+        """Summarise the requests received so far."""
+        with self._lock:
+            records = list(self.records)
+            bytes_stored = sum(len(upload.data) for upload in self.uploads.values())
+
+        recoveries = []
+        episode_start = None
+        faults = 0
+        for record in records:
+            if record.fault is not None:
+                faults += 1
+                if episode_start is None:
+                    episode_start = record.start
+            elif (
+                episode_start is not None
+                and record.method == "PATCH"
+                and record.status is not None
+                and 200 <= record.status < 300
+            ):
+                recoveries.append(record.end - episode_start)
+                episode_start = None
+
+        bytes_sent = sum(r.body_bytes for r in records if r.method == "PATCH")
+        return RecoveryReport(
+            faults=faults,
+            recoveries=recoveries,
+            time_to_recover=sum(recoveries),
+            bytes_sent=bytes_sent,
+            bytes_stored=bytes_stored,
+            bytes_resent=bytes_sent - bytes_stored,
+            requests=len(records),
+        )
+
+    def _next_pace(self, method: str):
+        with self._lock:
+            paces = self._paces.get(method)
+            if paces:
+                return paces.popleft()
+        return self.latency, self.bandwidth
+
+    def _next_fault(self, method: str) -> Optional[Fault]:
+        with self._lock:
+            if not self._faults or self._faults[0].method != method:
+                return None
+            fault = self._faults[0]
+            fault.count -= 1
+            if fault.count <= 0:
+                self._faults.popleft()
+            return fault
+
+    def _record(self, record: RequestRecord):
+        with self._lock:
+            self.records.append(record)
+
+
+def _upload_id(path: str) -> str:
+    return urlsplit(path).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+class _ConnectionReset(Exception):
+    pass
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 makes concurrent clients wait for SYN retries.
+    request_queue_size = 128
+
+
+class _TusHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    @property
+    def tus_server(self) -> TusServer:
+        return self.server.tus_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self._handle(self._create)
+
+    def do_HEAD(self):
+        self._handle(self._head)
+
+    def do_PATCH(self):
+        self._handle(self._patch)
+
+    def _handle(self, handler):
+        self._start = time.monotonic()
+        self._body_bytes = 0
+        self._recorded = False
+        self._fault_kind = None
+        self._release = None
+        self._chunk_left = 0
+        self._body_done = False
+        self._trailers: Dict[str, str] = {}
+        self._latency, self._bandwidth = self.tus_server._next_pace(self.command)
+        fault = self.tus_server._next_fault(self.command)
+        try:
+            if fault is None:
+                handler()
+            else:
+                self._fault_kind = fault.kind
+                self._fault(fault)
+        except (_ConnectionReset, OSError):
+            self.close_connection = True
+            self._record(None)
+
+    def _record(self, status: Optional[int]):
+        # Requests are recorded before their response is sent, so that a
+        # client never observes a response the report does not know about.
+        if self._recorded:
+            return
+        self._recorded = True
+        self.tus_server._record(
+            RequestRecord(
+                method=self.command,
+                path=self.path,
+                start=self._start,
+                end=time.monotonic(),
+                status=status,
+                body_bytes=self._body_bytes,
+                fault=self._fault_kind,
+            )
+        )
+
+    def _fault(self, fault: Fault):
+        if fault.kind == "reset":
+            self._read_body(limit=fault.after_bytes)
+            self._reset()
+        if fault.kind == "conflict":
+            status = 409
+        elif fault.kind == "lock":
+            status = 423
+        else:
+            status = fault.status
+        self._read_body()
+        self._respond(status)
+
+    def _create(self):
+        server = self.tus_server
+        length = self.headers.get("upload-length")
+        concat = self.headers.get("upload-concat")
+        if concat is not None and concat.startswith("final;"):
+            self._read_body()
+            self._create_final(concat)
+            return
+        if length is None and self.headers.get("upload-defer-length") != "1":
+            self._read_body()
+            self._respond(400)
+            return
+        upload_id = uuid.uuid4().hex
+        with server._lock:
+            server.uploads[upload_id] = _Upload(
+                int(length) if length is not None else None,
+                self.headers.get("upload-metadata", ""),
+                "partial" if concat == "partial" else None,
+            )
+        self._read_body()
+        self._respond(201, {"Location": "{}{}".format(urlsplit(server.url).path, upload_id)})
+
+    def _create_final(self, concat: str):
+        server = self.tus_server
+        upload_id = None
+        with server._lock:
+            parts = [
+                server.uploads.get(_upload_id(url))
+                for url in concat[len("final;"):].split()
+            ]
+            # Only finished partial uploads can be concatenated.
+            if parts and all(
+                part is not None
+                and part.concat == "partial"
+                and part.length is not None
+                and len(part.data) == part.length
+                for part in parts
+            ):
+                upload = _Upload(
+                    sum(part.length for part in parts),
+                    self.headers.get("upload-metadata", ""),
+                    concat,
+                )
+                for part in parts:
+                    upload.data.extend(part.data)
+                upload_id = uuid.uuid4().hex
+                server.uploads[upload_id] = upload
+        if upload_id is None:
+            self._respond(400)
+            return
+        self._respond(201, {"Location": "{}{}".format(urlsplit(server.url).path, upload_id)})
+
+    def _head(self):
+        upload = self.tus_server.uploads.get(_upload_id(self.path))
+        if upload is None:
+            self._respond(404)
+            return
+        headers = {"Upload-Offset": str(len(upload.data)), "Cache-Control": "no-store"}
+        if upload.length is None:
+            headers["Upload-Defer-Length"] = "1"
+        else:
+            headers["Upload-Length"] = str(upload.length)
+        if upload.concat is not None:
+            headers["Upload-Concat"] = upload.concat
+        self._respond(200, headers)
+
+    def _patch(self):
+        upload = self.tus_server.uploads.get(_upload_id(self.path))
+        if upload is None:
+            self._read_body()
+            self._respond(404)
+            return
+        if upload.concat is not None and upload.concat != "partial":
+            # Final uploads cannot be patched.
+            self._read_body()
+            self._respond(403)
+            return
+        if not upload.lock.acquire(blocking=False):
+            upload.release.set()
+            if not upload.lock.acquire(timeout=TusServer.LOCK_TIMEOUT):
+                self._read_body()
+                self._respond(423)
+                return
+        upload.release.clear()
+        self._release = upload.release
+        try:
+            self._patch_locked(upload)
+        finally:
+            self._release = None
+            upload.lock.release()
+
+    def _patch_locked(self, upload: _Upload):
+        offset = int(self.headers.get("upload-offset", -1))
+        if offset != len(upload.data):
+            self._read_body()
+            self._respond(409)
+            return
+        if upload.length is None and self.headers.get("upload-length") is not None:
+            upload.length = int(self.headers["upload-length"])
+
+        checksum = self.headers.get("upload-checksum")
+        trailers = [name.strip().lower() for name in self.headers.get("trailer", "").split(",")]
+        if checksum is None and "upload-checksum" not in trailers:
+            # Like tusd, keep what was received even if the connection drops.
+            self._read_body(sink=upload.data)
+        else:
+            body = bytearray()
+            self._read_body(sink=body)
+            checksum = checksum or self._trailers.get("upload-checksum")
+            if checksum is None:
+                self._respond(400)
+                return
+            algorithm, digest = checksum.split(" ", 1)
+            if hashlib.new(algorithm, body).digest() != b64decode(digest):
+                self._respond(460)
+                return
+            upload.data.extend(body)
+
+        if upload.length is not None and len(upload.data) > upload.length:
+            del upload.data[upload.length:]
+            self._respond(400)
+            return
+        self._respond(204, {"Upload-Offset": str(len(upload.data))})
+
+    def _read_body(self, sink: Optional[bytearray] = None, limit: Optional[int] = None):
+        if self.headers.get("transfer-encoding", "").lower() == "chunked":
+            self._read_chunked_body(sink, limit)
+            return
+        remaining = int(self.headers.get("content-length", 0)) - self._body_bytes
+        if limit is not None:
+            remaining = min(remaining, limit - self._body_bytes)
+        self._read_data(remaining, sink)
+
+    def _read_chunked_body(self, sink: Optional[bytearray], limit: Optional[int]):
+        while not self._body_done:
+            if self._chunk_left == 0:
+                line = self.rfile.readline(TusServer.READ_BLOCK_SIZE)
+                if not line:
+                    raise _ConnectionReset()
+                self._chunk_left = int(line.split(b";", 1)[0], 16)
+                if self._chunk_left == 0:
+                    self._read_trailers()
+                    self._body_done = True
+                    return
+            count = self._chunk_left
+            if limit is not None:
+                count = min(count, limit - self._body_bytes)
+                if count <= 0:
+                    return
+            self._read_data(count, sink)
+            self._chunk_left -= count
+            if self._chunk_left == 0:
+                self.rfile.readline(TusServer.READ_BLOCK_SIZE)
+
+    def _read_trailers(self):
+        while True:
+            line = self.rfile.readline(TusServer.READ_BLOCK_SIZE)
+            if not line:
+                raise _ConnectionReset()
+            if not line.strip():
+                return
+            name, _, value = line.decode("latin-1").partition(":")
+            self._trailers[name.strip().lower()] = value.strip()
+
+    def _read_data(self, remaining: int, sink: Optional[bytearray]):
+        bandwidth = self._bandwidth
+        while remaining > 0:
+            block = self.rfile.read(min(TusServer.READ_BLOCK_SIZE, remaining))
+            if not block:
+                raise _ConnectionReset()
+            remaining -= len(block)
+            self._body_bytes += len(block)
+            if sink is not None:
+                sink.extend(block)
+            if bandwidth:
+                time.sleep(len(block) / bandwidth)
+            if self._release is not None and self._release.is_set():
+                self._reset()
+
+    def _reset(self):
+        self.connection.setsockopt(
+            socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RESET
+        )
+        self.close_connection = True
+        self.connection.close()
+        raise _ConnectionReset()
+
+    def _respond(self, status: int, headers: Optional[Dict[str, str]] = None):
+        if self._latency:
+            time.sleep(self._latency)
+        self._record(status)
+        self.send_response(status)
+        self.send_header("Tus-Resumable", "1.0.0")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
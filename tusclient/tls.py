@@ -0,0 +1,85 @@
+"""
+Shared TLS contexts.
+
+Building an `ssl.SSLContext` loads the system's CA certificates, and the client
+certificate of mutual TLS is parsed from its PEM files every time it is loaded. Done
+for each request or connection, this is a noticeable part of the cost of small chunks.
+The transports of a <tusclient.client.TusClient> instead share a
+<tusclient.tls.SSLContextCache>, in which each context is built once.
+"""
+from typing import Dict, Optional, Tuple, Union, TYPE_CHECKING
+import threading
+
+if TYPE_CHECKING:
+    import ssl
+
+
+def create_ssl_context(
+    verify: bool = True,
+    cert: Optional[Union[str, Tuple[str, str]]] = None,
+    options: int = 0,
+) -> "ssl.SSLContext":
+    """
+    Return a new client side SSL context.
+
+    :Args:
+        - verify (bool): Whether or not to verify the TLS certificate of the server.
+        - cert (Optional[str | Tuple[str, str]]): The client certificate, see
+          <tusclient.client.TusClient>.
+        - options (int): Further `ssl.OP_*` flags to set.
+    :Returns: ssl.SSLContext
+    """
+    # Imported here, so that clients without TLS do not pay for it.
+    import ssl
+
+    context = ssl.create_default_context()
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if isinstance(cert, str):
+        context.load_cert_chain(certfile=cert)
+    elif cert is not None:
+        context.load_cert_chain(certfile=cert[0], keyfile=cert[1])
+    context.options |= options
+    return context
+
+
+class SSLContextCache:
+    """
+    Thread-safe cache of client side SSL contexts, one per combination of TLS
+    verification, client certificate and options.
+
+    Contexts are not modified once built, so they may be used by any number of
+    connections at once.
+    """
+
+    def __init__(self):
+        self._contexts: Dict[tuple, "ssl.SSLContext"] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+        options: int = 0,
+    ) -> "ssl.SSLContext":
+        """
+        Return the context for the given arguments, building it on first use.
+
+        :Args:
+            see <tusclient.tls.create_ssl_context>.
+        :Returns: ssl.SSLContext
+        """
+        key = (verify, cert, options)
+        context = self._contexts.get(key)
+        if context is None:
+            with self._lock:
+                context = self._contexts.get(key)
+                if context is None:
+                    context = self._contexts[key] = create_ssl_context(verify, cert, options)
+        return context
+
+    def clear(self):
+        """Drop all contexts, e.g. after the certificate files were renewed."""
+        with self._lock:
+            self._contexts.clear()
@@ -0,0 +1,178 @@
+"""
+Tracing of the requests made by uploaders.
+
+A <tusclient.trace.Tracer> set on a <tusclient.client.TusClient> writes an event for
+every request of its uploaders (creation, HEAD and PATCH), and for every retry decision,
+as one JSON object per line. Request events break the time spent down into phases:
+
+- read: reading the chunk from the file.
+- checksum: computing its Upload-Checksum.
+- request: the whole HTTP request, as seen by the transport.
+- connect, send, wait: within `request`, opening the connection, sending the request
+  and its body, and waiting for and reading the response. Only transports which can
+  tell them apart record these:
+  <tusclient.transport.sendfiletransport.SendfileTransport> and
+  <tusclient.transport.requeststransport.RequestsTransport>, unless given its own
+  session.
+
+Chunks read ahead (see `read_ahead`) are read and checksummed in the background, so
+their `read` and `checksum` phases are not part of the request. Traces can be replayed
+against a local server with the same timings, see <tusclient.replay>.
+
+.. code:: python
+
+    with Tracer('trace.jsonl') as tracer:
+        my_client = client.TusClient('http://tusd.tusdemo.net/files/', tracer=tracer)
+        my_client.uploader('path/to/file.ext', chunk_size=200).upload()
+"""
+from contextvars import ContextVar
+from typing import IO, Dict, Optional, Union
+import contextlib
+import json
+import threading
+import time
+
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("tusclient_span", default=None)
+_no_phase = contextlib.nullcontext()
+
+
+def phase(name: str):
+    """
+    Return a context manager timing the named phase of the request being traced in the
+    current thread or task, or doing nothing if no request is being traced.
+
+    Transports call it to report the phases only they can measure.
+    """
+    span = _current_span.get()
+    return _no_phase if span is None else span.phase(name)
+
+
+class _Phase:
+    def __init__(self, span: "Span", name: str):
+        self._span = span
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *args):
+        phases = self._span.phases
+        phases[self._name] = phases.get(self._name, 0.0) + time.perf_counter() - self._start
+
+
+class Span:
+    """
+    A request being traced, written as an event by its tracer once it ends.
+
+    It is used as a context manager, around the request. While it is active, the
+    phases reported with <tusclient.trace.phase> are added to it.
+
+    :Attributes:
+        - event (str): The name of the event, e.g. "PATCH".
+        - fields (dict): The fields of the event, e.g. "url" and "offset".
+        - phases (dict): The seconds spent in each phase so far.
+    """
+
+    def __init__(self, tracer: "Tracer", event: str, **fields):
+        self.event = event
+        self.fields = fields
+        self.phases: Dict[str, float] = {}
+        self._tracer = tracer
+
+    def phase(self, name: str) -> _Phase:
+        """Return a context manager adding the time spent in it to the named phase."""
+        return _Phase(self, name)
+
+    def set(self, **fields):
+        """Add fields to the event, e.g. the status of the response."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self._wall = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.fields["error"] = str(exc) or exc_type.__name__
+        self._tracer.write(
+            {
+                "ts": round(self._wall, 6),
+                "event": self.event,
+                **self.fields,
+                "duration": round(duration, 6),
+                "phases": {name: round(value, 6) for name, value in self.phases.items()},
+            }
+        )
+
+
+class Tracer:
+    """
+    Thread-safe writer of trace events, as JSON lines.
+
+    :Constructor Args:
+        - target (str | file):
+            The path of the file to append the events to, or a text stream.
+    """
+
+    def __init__(self, target: Union[str, IO[str]]):
+        if isinstance(target, str):
+            self._stream = open(target, "a")
+            self._owned = True
+        else:
+            self._stream = target
+            self._owned = False
+        self._lock = threading.Lock()
+
+    def span(self, event: str, **fields) -> Span:
+        """
+        Return a <tusclient.trace.Span> for a request, e.g. `span("PATCH", url=...)`.
+        """
+        return Span(self, event, **fields)
+
+    def event(self, event: str, **fields):
+        """Write an event which is not a request, e.g. a retry decision."""
+        self.write({"ts": round(time.time(), 6), "event": event, **fields})
+
+    def write(self, event: dict):
+        """Write an event as one line of compact JSON."""
+        line = json.dumps(event, separators=(",", ":"))
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    def close(self):
+        """Close the trace file, if the tracer opened it."""
+        if self._owned:
+            self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _NullSpan:
+    def set(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_null_span = _NullSpan()
+
+
+def span(tracer: Optional[Tracer], event: str, **fields):
+    """
+    Return a span for a request if a tracer is configured, else one doing nothing.
+    """
+    return _null_span if tracer is None else tracer.span(event, **fields)
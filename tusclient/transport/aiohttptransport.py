@@ -0,0 +1,146 @@
+"""
+An implementation of <tusclient.transport.interface.AsyncTransport>, using `aiohttp`.
+
+This is the default asynchronous transport of <tusclient.client.TusClient>.
+"""
+from typing import Dict, Optional, Tuple, Union
+import asyncio
+
+import aiohttp
+
+from tusclient.exceptions import TusCommunicationError
+from . import interface
+
+
+class _WatchedBody:
+    """
+    Request body handed to aiohttp block by block, noting when it last took a block.
+
+    aiohttp only takes the next block once the previous one was written, so a body
+    which was not finished and whose last block was taken long ago is stuck, e.g.
+    because the server stopped reading it.
+    """
+
+    BLOCK_SIZE = 65536
+
+    def __init__(self, data):
+        self._data = data
+        self.last_progress = asyncio.get_running_loop().time()
+        self.finished = False
+
+    def __len__(self):
+        return len(self._data)
+
+    async def _blocks(self):
+        if hasattr(self._data, "__aiter__"):
+            async for block in self._data:
+                yield block
+        else:
+            view = memoryview(self._data)
+            for start in range(0, len(view), self.BLOCK_SIZE):
+                yield view[start : start + self.BLOCK_SIZE]
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        async for block in self._blocks():
+            self.last_progress = loop.time()
+            yield block
+        self.finished = True
+
+
+class AiohttpTransport(interface.AsyncTransport):
+    """
+    Transport sending requests through `aiohttp`.
+
+    While the transport is entered (see <tusclient.transport.interface.AsyncTransport>),
+    all requests made from the same event loop share one `aiohttp.ClientSession`.
+    Requests made outside of it use a session of their own.
+
+    :Constructor Args:
+        - timeout (float | Tuple[float, float] | <tusclient.transport.interface.Timeouts>):
+            The connect and read timeouts of the requests in seconds, or a single value
+            for both. None waits forever. Defaults to
+            <tusclient.transport.interface.DEFAULT_TIMEOUTS>.
+    """
+
+    def __init__(self, timeout: interface.TimeoutsType = interface.DEFAULT_TIMEOUTS):
+        self.timeout = interface.to_timeouts(timeout)
+        # Uploads of large chunks may take long, so only idle connections time out.
+        # aiohttp has no timeout for writes; bodies are watched for that instead.
+        self._client_timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=self.timeout.connect, sock_read=self.timeout.read
+        )
+        self._session = None
+        self._loop = None
+        self._users = 0
+
+    async def __aenter__(self):
+        if self._users == 0:
+            self._session = aiohttp.ClientSession(timeout=self._client_timeout)
+            self._loop = asyncio.get_running_loop()
+        self._users += 1
+        return self
+
+    async def __aexit__(self, *args):
+        self._users -= 1
+        if self._users == 0:
+            session, self._session, self._loop = self._session, None, None
+            await session.close()
+
+    def _get_ssl(self, verify: bool, cert):
+        if cert is None:
+            # aiohttp keeps its own default contexts.
+            return verify
+        return self.get_ssl_context(verify, cert)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        data=None,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+    ) -> interface.Response:
+        if data is not None:
+            # Streamed bodies would otherwise be sent with chunked encoding.
+            headers = dict(headers, **{"Content-Length": str(len(data))})
+        try:
+            if self._session is not None and self._loop is asyncio.get_running_loop():
+                return await self._request(
+                    self._session, method, url, headers, data, verify, cert
+                )
+            async with aiohttp.ClientSession(timeout=self._client_timeout) as session:
+                return await self._request(session, method, url, headers, data, verify, cert)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            raise TusCommunicationError(error)
+
+    async def _request(self, session, method, url, headers, data, verify, cert):
+        if data is None or self.timeout.read is None:
+            return await self._send(session, method, url, headers, data, verify, cert)
+        body = _WatchedBody(data)
+        loop = asyncio.get_running_loop()
+        sending = asyncio.ensure_future(
+            self._send(session, method, url, headers, body, verify, cert)
+        )
+        try:
+            # Once the body is sent, the read timeout of the session applies.
+            while not body.finished:
+                idle = loop.time() - body.last_progress
+                if idle >= self.timeout.read:
+                    raise asyncio.TimeoutError("The server stopped reading the request body.")
+                done, _ = await asyncio.wait({sending}, timeout=self.timeout.read - idle)
+                if done:
+                    break
+            return await sending
+        finally:
+            if not sending.done():
+                sending.cancel()
+                await asyncio.wait({sending})
+
+    async def _send(self, session, method, url, headers, data, verify, cert):
+        async with session.request(
+            method, url, headers=headers, data=data, ssl=self._get_ssl(verify, cert)
+        ) as resp:
+            content = await resp.content.read()
+            return interface.Response(resp.status, resp.headers, content)
@@ -0,0 +1,195 @@
+"""
+Implementations of <tusclient.transport.interface.Transport> and
+<tusclient.transport.interface.AsyncTransport>, using `httpx`.
+
+With `http2=True`, requests to the same server are multiplexed over a single
+HTTP/2 connection. This transport requires the optional dependencies of the
+`http2` extra (`pip install tuspy[http2]`).
+"""
+from typing import Dict, Optional, Tuple, Union
+import threading
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from tusclient.exceptions import TusCommunicationError
+from . import interface
+
+
+def _check_httpx():
+    if httpx is None:
+        raise ImportError(
+            "The httpx transport requires httpx, install it with 'pip install tuspy[http2]'."
+        )
+
+
+def _get_verify(transport, verify: bool, cert):
+    if cert is None:
+        return verify
+    return transport.get_ssl_context(verify, cert)
+
+
+def _client_kwargs(timeout: interface.TimeoutsType, client_kwargs: dict):
+    timeout = interface.to_timeouts(timeout)
+    # Writes are bounded like reads, and waiting for a pooled connection is not.
+    client_kwargs.setdefault(
+        "timeout", httpx.Timeout(timeout.read, connect=timeout.connect, pool=None)
+    )
+    return timeout, client_kwargs
+
+
+def _to_response(resp) -> interface.Response:
+    return interface.Response(resp.status_code, resp.headers, resp.content)
+
+
+def _iter_body(data):
+    while True:
+        block = data.read(data.BLOCK_SIZE)
+        if not block:
+            return
+        yield block
+
+
+def _prepare(headers: Dict[str, str], data):
+    # httpx takes raw bodies through `content`, which must be bytes or an
+    # iterator; file-like bodies are turned into an iterator of their blocks.
+    if data is None or isinstance(data, bytes):
+        return headers, data
+    if isinstance(data, (bytearray, memoryview)):
+        return headers, bytes(data)
+    return dict(headers, **{"Content-Length": str(len(data))}), data
+
+
+class HttpxTransport(interface.Transport):
+    """
+    Synchronous transport based on `httpx.Client`.
+
+    One client is kept per combination of TLS verification and client certificate.
+
+    :Constructor Args:
+        - http2 (Optional[bool]): Whether to use HTTP/2 where the server supports it.
+          Defaults to True.
+        - timeout (float | Tuple[float, float] | <tusclient.transport.interface.Timeouts>):
+            The connect and read timeouts of the requests in seconds, or a single value
+            for both. None waits forever. Defaults to
+            <tusclient.transport.interface.DEFAULT_TIMEOUTS>.
+        - client_kwargs: Further arguments passed to every `httpx.Client`.
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        timeout: interface.TimeoutsType = interface.DEFAULT_TIMEOUTS,
+        **client_kwargs
+    ):
+        _check_httpx()
+        self.http2 = http2
+        self.timeout, self._client_kwargs = _client_kwargs(timeout, client_kwargs)
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _get_client(self, verify: bool, cert):
+        key = (verify, cert)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = httpx.Client(
+                    http2=self.http2,
+                    verify=_get_verify(self, verify, cert),
+                    **self._client_kwargs
+                )
+            return client
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        data=None,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+    ) -> interface.Response:
+        headers, content = _prepare(headers, data)
+        if hasattr(content, "read"):
+            content = _iter_body(content)
+        try:
+            resp = self._get_client(verify, cert).request(
+                method, url, headers=headers, content=content
+            )
+        except httpx.HTTPError as error:
+            raise TusCommunicationError(error)
+        return _to_response(resp)
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+class AsyncHttpxTransport(interface.AsyncTransport):
+    """
+    Asynchronous transport based on `httpx.AsyncClient`.
+
+    While the transport is entered (see <tusclient.transport.interface.AsyncTransport>),
+    clients are kept and reused between requests. Requests made outside of it use a
+    client of their own.
+
+    :Constructor Args:
+        see <tusclient.transport.httpxtransport.HttpxTransport>.
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        timeout: interface.TimeoutsType = interface.DEFAULT_TIMEOUTS,
+        **client_kwargs
+    ):
+        _check_httpx()
+        self.http2 = http2
+        self.timeout, self._client_kwargs = _client_kwargs(timeout, client_kwargs)
+        self._clients = {}
+        self._users = 0
+
+    async def __aenter__(self):
+        self._users += 1
+        return self
+
+    async def __aexit__(self, *args):
+        self._users -= 1
+        if self._users == 0:
+            clients, self._clients = self._clients, {}
+            for client in clients.values():
+                await client.aclose()
+
+    def _create_client(self, verify: bool, cert):
+        return httpx.AsyncClient(
+            http2=self.http2, verify=_get_verify(self, verify, cert), **self._client_kwargs
+        )
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        data=None,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+    ) -> interface.Response:
+        headers, content = _prepare(headers, data)
+        try:
+            if self._users == 0:
+                async with self._create_client(verify, cert) as client:
+                    resp = await client.request(method, url, headers=headers, content=content)
+            else:
+                key = (verify, cert)
+                if key not in self._clients:
+                    self._clients[key] = self._create_client(verify, cert)
+                resp = await self._clients[key].request(
+                    method, url, headers=headers, content=content
+                )
+        except httpx.HTTPError as error:
+            raise TusCommunicationError(error)
+        return _to_response(resp)
@@ -0,0 +1,197 @@
+"""
+Interface module defining the HTTP transport API used by uploaders.
+
+A transport performs the actual HTTP requests of the tus protocol. Implementations
+must convert connection level failures (refused connections, resets, timeouts, ...)
+into <tusclient.exceptions.TusCommunicationError>. HTTP error responses are not
+failures at this level and are returned as any other response.
+
+Transports should also apply connect and read timeouts (see
+<tusclient.transport.interface.Timeouts>), so that a request on a dead connection fails
+instead of hanging forever.
+"""
+from typing import Dict, NamedTuple, Optional, Tuple, Union, TYPE_CHECKING
+import abc
+import threading
+
+if TYPE_CHECKING:
+    import ssl
+
+    from tusclient.tls import SSLContextCache
+
+
+_ssl_contexts_lock = threading.Lock()
+
+
+class Timeouts(NamedTuple):
+    """
+    Timeouts of the requests of a transport, in seconds. None waits forever.
+
+    :Attributes:
+        - connect (Optional[float]):
+            How long to wait for a connection to the server to be established.
+        - read (Optional[float]):
+            How long the connection may stay idle while a request is sent or its response
+            read, i.e. how long the server may stop accepting data or stay silent. Slow
+            but steady transfers are not affected, see `min_rate` of the uploaders for
+            those.
+    """
+
+    connect: Optional[float]
+    read: Optional[float]
+
+
+DEFAULT_TIMEOUTS = Timeouts(connect=30.0, read=120.0)
+
+TimeoutsType = Union[None, float, Tuple[Optional[float], Optional[float]], Timeouts]
+
+
+def to_timeouts(timeout: TimeoutsType) -> Timeouts:
+    """
+    Return the <tusclient.transport.interface.Timeouts> given as a number of seconds
+    (for both timeouts), a (connect, read) pair, or None (no timeouts).
+    """
+    if timeout is None or isinstance(timeout, (int, float)):
+        return Timeouts(timeout, timeout)
+    return Timeouts(*timeout)
+
+
+class Response:
+    """
+    HTTP response as returned by a transport.
+
+    :Attributes:
+        - status_code (int)
+        - headers (dict):
+            The response headers, with lower case names.
+        - content (bytes)
+    """
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes = b""):
+        self.status_code = status_code
+        self.headers = {k.lower(): v for k, v in headers.items()}
+        self.content = content
+
+
+class _SharedSSLContexts:
+    ssl_contexts: Optional["SSLContextCache"] = None
+
+    def get_ssl_context(
+        self,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+        options: int = 0,
+    ) -> "ssl.SSLContext":
+        """
+        Return the SSL context for the given arguments from `ssl_contexts`, which is
+        created if the transport has none yet.
+
+        :Args:
+            see <tusclient.tls.create_ssl_context>.
+        :Returns: ssl.SSLContext
+        """
+        if self.ssl_contexts is None:
+            # ssl is only imported by transports which use TLS.
+            from tusclient.tls import SSLContextCache
+
+            with _ssl_contexts_lock:
+                if self.ssl_contexts is None:
+                    self.ssl_contexts = SSLContextCache()
+        return self.ssl_contexts.get(verify, cert, options)
+
+
+class Transport(_SharedSSLContexts, abc.ABC):
+    """
+    A synchronous HTTP transport.
+
+    Transports which build their own SSL contexts should take them from
+    `get_ssl_context`, so that they are built once.
+
+    :Attributes:
+        - ssl_contexts (<tusclient.tls.SSLContextCache>):
+            The SSL contexts of the transport. <tusclient.client.TusClient> sets the same
+            cache on its sync and async transports.
+        - supports_sendfile (bool):
+            Whether the transport can send <tusclient.request.FileRangeBody> bodies
+            without reading them into memory. If set, chunks of uploads from regular
+            files are passed to `request` as such bodies whenever possible.
+        - supports_trailers (bool):
+            Whether the transport can send <tusclient.request.ChecksumTrailerBody> bodies,
+            with chunked transfer encoding followed by their trailers. If set, uploaders
+            with `checksum_trailer` pass their chunks to `request` as such bodies whenever
+            possible.
+    """
+
+    supports_sendfile = False
+    supports_trailers = False
+
+    @abc.abstractmethod
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        data=None,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+    ) -> Response:
+        """
+        Perform a request and return its response.
+
+        :Args:
+            - method (str): The HTTP method.
+            - url (str): The absolute url of the request.
+            - headers (dict): The request headers.
+            - data (Optional[bytes | file]): The request body. Besides bytes, this may be
+              a file-like object with a `read` method and a length (see
+              <tusclient.request.ThrottledBody>), which must be streamed with a
+              Content-Length header.
+            - verify (bool): Whether or not to verify the TLS certificate of the server.
+            - cert (Optional[str | Tuple[str, str]]): The client certificate, see
+              <tusclient.client.TusClient>.
+        :Returns: <tusclient.transport.interface.Response>
+        """
+
+    def close(self):
+        """Release the connections held by the transport."""
+
+
+class AsyncTransport(_SharedSSLContexts, abc.ABC):
+    """
+    An asynchronous HTTP transport.
+
+    SSL contexts are handled as for <tusclient.transport.interface.Transport>.
+
+    Asynchronous connections are bound to the event loop they were opened in, so
+    they can only be kept alive for as long as the code using them runs. For this,
+    a transport is an async context manager: while it is entered, connections are
+    reused between requests, and they are closed when the last user exits.
+    `AsyncUploader.upload` enters the transport of its client for the duration of
+    the upload. Entering it again around several uploads keeps the connections
+    alive between them.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    @abc.abstractmethod
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        data=None,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+    ) -> Response:
+        """
+        Perform a request and return its response.
+
+        :Args:
+            see <tusclient.transport.interface.Transport.request>. File-like bodies
+            given as `data` also support asynchronous iteration.
+        :Returns: <tusclient.transport.interface.Response>
+        """
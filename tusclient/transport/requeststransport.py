@@ -0,0 +1,154 @@
+"""
+An implementation of <tusclient.transport.interface.Transport>, using `requests`.
+
+This is the default transport of <tusclient.client.TusClient>.
+"""
+from typing import Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import connection, connectionpool
+
+from tusclient import trace
+from tusclient.exceptions import TusCommunicationError
+from . import interface
+
+
+class _TracedConnection(connection.HTTPConnection):
+    """
+    Connection recording the connect, send and wait phases of the traced request, see
+    <tusclient.trace>.
+    """
+
+    def connect(self):
+        with trace.phase("connect"):
+            super().connect()
+
+    def request(self, *args, **kwargs):
+        # Plain HTTP connections are otherwise opened while the request is sent.
+        if self.sock is None:
+            self.connect()
+        with trace.phase("send"):
+            return super().request(*args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        with trace.phase("wait"):
+            return super().getresponse(*args, **kwargs)
+
+
+class _TracedHTTPSConnection(_TracedConnection, connection.HTTPSConnection):
+    pass
+
+
+class _TracedConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = _TracedConnection
+
+
+class _TracedHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+
+class _TransportAdapter(HTTPAdapter):
+    """
+    Adapter connecting with the SSL contexts of a transport, and tracing the phases of
+    its requests. Otherwise urllib3 loads the CA bundle, and the client certificate,
+    into a new context for every connection.
+    """
+
+    def __init__(self, transport: interface.Transport, **kwargs):
+        self._transport = transport
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TracedConnectionPool,
+            "https": _TracedHTTPSConnectionPool,
+        }
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(
+            request, verify, cert
+        )
+        # A path to a CA bundle, e.g. from REQUESTS_CA_BUNDLE, is left to requests.
+        if isinstance(verify, bool):
+            pool_kwargs.pop("cert_file", None)
+            pool_kwargs.pop("key_file", None)
+            pool_kwargs["ssl_context"] = self._transport.get_ssl_context(verify, cert)
+        return host_params, pool_kwargs
+
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        if isinstance(verify, bool):
+            # Already loaded into the context of the pool.
+            conn.ca_certs = conn.ca_cert_dir = None
+            conn.cert_file = conn.key_file = None
+
+
+class RequestsTransport(interface.Transport):
+    """
+    Transport sending requests through a `requests.Session`, which keeps
+    connections to the server alive between requests.
+
+    :Attributes:
+        - pool_maxsize (Optional[int]):
+            How many connections to each server are kept alive, i.e. how many threads
+            can make requests at once without opening new connections. None for a given
+            session.
+    :Constructor Args:
+        - session (Optional[requests.Session]):
+            The session to use, e.g. to configure proxies or adapters. A new session is
+            created if not specified, whose adapters take their SSL contexts from
+            `get_ssl_context` and trace the connect, send and wait phases of requests
+            (see <tusclient.trace>). The adapters of a given session are kept as they
+            are, so only the whole request is traced.
+        - timeout (float | Tuple[float, float] | <tusclient.transport.interface.Timeouts>):
+            The connect and read timeouts of the requests in seconds, or a single value
+            for both. None waits forever. Defaults to
+            <tusclient.transport.interface.DEFAULT_TIMEOUTS>.
+        - pool_maxsize (int):
+            The `pool_maxsize` of a new session. Defaults to 16, as many as the requests
+            made at once by <tusclient.resume>.
+    """
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        timeout: interface.TimeoutsType = interface.DEFAULT_TIMEOUTS,
+        pool_maxsize: int = 16,
+    ):
+        self.pool_maxsize = None
+        if session is None:
+            session = requests.Session()
+            adapter = _TransportAdapter(self, pool_maxsize=pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self.pool_maxsize = pool_maxsize
+        self.session = session
+        self.timeout = interface.to_timeouts(timeout)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        data=None,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+    ) -> interface.Response:
+        try:
+            resp = self.session.request(
+                method,
+                url,
+                headers=headers,
+                data=data,
+                verify=verify,
+                cert=cert,
+                timeout=tuple(self.timeout),
+            )
+        except requests.exceptions.RequestException as error:
+            raise TusCommunicationError(error)
+        return interface.Response(resp.status_code, resp.headers, resp.content)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,247 @@
+"""
+An implementation of <tusclient.transport.interface.Transport>, sending chunks of
+regular files with the kernel's `sendfile`.
+
+Chunks passed as <tusclient.request.FileRangeBody> are copied from the page cache
+straight to the socket, without being read into user space. This removes a copy of
+every uploaded byte and keeps memory use flat, whatever the chunk size. Over TLS,
+`sendfile` can only bypass user space with kernel TLS offload (`ssl.OP_ENABLE_KTLS`,
+Python 3.12+ on Linux with OpenSSL 3); without it, the data is sent through the
+regular `send` path, which is still correct.
+
+New TLS connections resume the session of an earlier connection to the same server
+where possible, which saves a full handshake.
+
+Chunks whose checksum is sent as a trailer (<tusclient.request.ChecksumTrailerBody>) are
+sent with chunked transfer encoding, followed by the trailer.
+"""
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+import http.client
+import ssl
+import threading
+
+from tusclient import trace
+from tusclient.exceptions import TusCommunicationError
+from tusclient.request import ChecksumTrailerBody, FileRangeBody
+from . import interface
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS connection resuming a TLS session given on construction."""
+
+    def __init__(self, *args, session: Optional[ssl.SSLSession] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = session
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=self.host, session=self.session
+        )
+
+
+class SendfileTransport(interface.Transport):
+    """
+    Transport using `http.client` connections and `socket.sendfile` for file bodies.
+
+    Connections are kept alive and reused, one per thread and server, and TLS sessions
+    are shared between them.
+
+    :Attributes:
+        - timeout (<tusclient.transport.interface.Timeouts>):
+            The connect timeout of the connections, and the timeout of every read from and
+            write to their sockets, in seconds.
+    :Constructor Args:
+        - timeout (float | Tuple[float, float] | <tusclient.transport.interface.Timeouts>):
+            The connect and read timeouts, or a single value for both. None waits forever.
+            Defaults to <tusclient.transport.interface.DEFAULT_TIMEOUTS>.
+    """
+
+    supports_sendfile = True
+    supports_trailers = True
+    # Without throttling, file ranges are sent in blocks large enough to keep the
+    # number of calls low, and small enough for stalls and cancellations (see
+    # <tusclient.watchdog.TransferMonitor>) to be noticed soon.
+    SENDFILE_BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, timeout: interface.TimeoutsType = interface.DEFAULT_TIMEOUTS):
+        self.timeout = interface.to_timeouts(timeout)
+        self._local = threading.local()
+        self._connections = []
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> dict:
+        pool = getattr(self._local, "connections", None)
+        if pool is None:
+            pool = self._local.connections = {}
+        return pool
+
+    def _new_connection(self, key: tuple):
+        scheme, host, port, verify, cert = key
+        if scheme == "https":
+            context = self.get_ssl_context(
+                verify, cert, getattr(ssl, "OP_ENABLE_KTLS", 0)
+            )
+            conn = _HTTPSConnection(
+                host,
+                port,
+                timeout=self.timeout.connect,
+                context=context,
+                session=self._sessions.get(key),
+            )
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout.connect)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _closed_before_response(error: Exception, sent: bool) -> bool:
+        """
+        Return whether the error means that the server had closed the connection before
+        the request, rather than that the request failed, e.g. timed out.
+        """
+        if isinstance(error, http.client.RemoteDisconnected):
+            # Closed without sending a single byte of the response.
+            return True
+        return not sent and isinstance(error, (ConnectionResetError, BrokenPipeError))
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        data=None,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+    ) -> interface.Response:
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        key = (parts.scheme, parts.hostname, parts.port, verify, cert)
+        pool = self._get_pool()
+
+        # A kept-alive connection may have been closed by the server in the meantime,
+        # which only shows once it is used. Such requests are sent again once on a fresh
+        # connection, unless they create an upload, which must not happen twice, or
+        # their body is read while being sent and cannot be sent again.
+        reused = key in pool
+        retry = (
+            reused
+            and method != "POST"
+            and (isinstance(data, FileRangeBody) or not hasattr(data, "read"))
+        )
+        while True:
+            conn = pool.get(key)
+            if conn is None:
+                conn = pool[key] = self._new_connection(key)
+            sent = False
+            try:
+                if conn.sock is None:
+                    with trace.phase("connect"):
+                        conn.connect()
+                    conn.sock.settimeout(self.timeout.read)
+                with trace.phase("send"):
+                    self._send(conn, method, path, headers, data)
+                sent = True
+                with trace.phase("wait"):
+                    resp = conn.getresponse()
+                    content = resp.read()
+            except (OSError, http.client.HTTPException) as error:
+                self._discard(pool, key)
+                if retry and self._closed_before_response(error, sent):
+                    retry = reused = False
+                    continue
+                raise TusCommunicationError(error)
+            except BaseException:
+                # E.g. a stalled or cancelled body: the request was left half sent.
+                self._discard(pool, key)
+                raise
+            if not reused:
+                self._save_session(key, conn)
+            if resp.will_close:
+                self._discard(pool, key)
+            return interface.Response(resp.status, dict(resp.getheaders()), content)
+
+    def _save_session(self, key: tuple, conn):
+        # TLS 1.3 session tickets arrive after the handshake, so the session is only
+        # taken once a response has been read.
+        session = getattr(conn.sock, "session", None)
+        if session is not None:
+            self._sessions[key] = session
+
+    def _discard(self, pool: dict, key):
+        conn = pool.pop(key)
+        conn.close()
+        with self._lock:
+            self._connections.remove(conn)
+
+    def _send(self, conn, method: str, path: str, headers: Dict[str, str], data):
+        conn.putrequest(method, path, skip_accept_encoding=True)
+        chunked = isinstance(data, ChecksumTrailerBody)
+        has_length = False
+        for name, value in headers.items():
+            has_length = has_length or name.lower() == "content-length"
+            conn.putheader(name, value)
+        if chunked:
+            conn.putheader("Transfer-Encoding", "chunked")
+            conn.putheader("Trailer", ", ".join(data.TRAILERS))
+        elif not has_length and (data is not None or method in ("POST", "PATCH")):
+            conn.putheader("Content-Length", str(0 if data is None else len(data)))
+        conn.endheaders()
+
+        if data is None:
+            return
+        if chunked:
+            self._send_chunked(conn, data)
+        elif isinstance(data, FileRangeBody):
+            self._sendfile(conn, data)
+        elif hasattr(data, "read"):
+            while True:
+                block = data.read(FileRangeBody.BLOCK_SIZE)
+                if not block:
+                    break
+                conn.send(block)
+        else:
+            conn.send(data)
+
+    def _send_chunked(self, conn, body: ChecksumTrailerBody):
+        while True:
+            block = body.read(body.BLOCK_SIZE)
+            if not block:
+                break
+            conn.send(b"".join((b"%x\r\n" % len(block), block, b"\r\n")))
+        trailers = "".join(
+            "{}: {}\r\n".format(name, value) for name, value in body.trailers().items()
+        )
+        conn.send(b"0\r\n" + trailers.encode("latin-1") + b"\r\n")
+
+    def _sendfile(self, conn, body: FileRangeBody):
+        sock = conn.sock
+        if body.limiter is None:
+            block_size = len(body)
+        elif body.limiter.rate is None:
+            block_size = self.SENDFILE_BLOCK_SIZE
+        else:
+            block_size = body.BLOCK_SIZE
+        offset = body.offset
+        end = body.offset + len(body)
+        while offset < end:
+            count = min(block_size, end - offset)
+            if body.limiter is not None:
+                body.limiter.consume(count)
+            sent = sock.sendfile(body.file, offset, count)
+            if sent < count:
+                raise OSError("file ended before the announced length was sent")
+            offset += sent
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._sessions.clear()
+        self._local = threading.local()
@@ -0,0 +1,81 @@
+"""
+An implementation of <tusclient.transport.interface.Transport>, using `urllib3`
+directly.
+
+Skipping the session, hook and adapter machinery of `requests` makes each request
+noticeably cheaper, which matters for uploads made of many small chunks.
+"""
+from typing import Dict, Optional, Tuple, Union
+import threading
+
+import urllib3
+
+from tusclient.exceptions import TusCommunicationError
+from . import interface
+
+
+class Urllib3Transport(interface.Transport):
+    """
+    Transport sending requests through `urllib3` connection pools.
+
+    One pool manager is kept per combination of TLS verification and client
+    certificate.
+
+    :Constructor Args:
+        - timeout (float | Tuple[float, float] | <tusclient.transport.interface.Timeouts>):
+            The connect and read timeouts of the requests in seconds, or a single value
+            for both. None waits forever. Defaults to
+            <tusclient.transport.interface.DEFAULT_TIMEOUTS>.
+        - pool_kwargs: Further arguments passed to every `urllib3.PoolManager`,
+          e.g. `maxsize`.
+    """
+
+    def __init__(
+        self, timeout: interface.TimeoutsType = interface.DEFAULT_TIMEOUTS, **pool_kwargs
+    ):
+        timeout = interface.to_timeouts(timeout)
+        self.timeout = timeout
+        self._timeout = urllib3.Timeout(connect=timeout.connect, read=timeout.read)
+        self._pool_kwargs = pool_kwargs
+        self._managers = {}
+        self._lock = threading.Lock()
+
+    def _get_manager(self, verify: bool, cert) -> urllib3.PoolManager:
+        key = (verify, cert)
+        with self._lock:
+            manager = self._managers.get(key)
+            if manager is None:
+                kwargs = dict(self._pool_kwargs)
+                if not verify:
+                    kwargs["cert_reqs"] = "CERT_NONE"
+                # Otherwise urllib3 builds a context, and loads the certificates, for
+                # every connection.
+                kwargs.setdefault("ssl_context", self.get_ssl_context(verify, cert))
+                manager = self._managers[key] = urllib3.PoolManager(**kwargs)
+            return manager
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        data=None,
+        verify: bool = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+    ) -> interface.Response:
+        if data is not None and not any(k.lower() == "content-length" for k in headers):
+            # Streamed bodies would otherwise be sent with chunked encoding.
+            headers = dict(headers, **{"Content-Length": str(len(data))})
+        try:
+            resp = self._get_manager(verify, cert).request(
+                method, url, headers=headers, body=data, retries=False, timeout=self._timeout
+            )
+        except urllib3.exceptions.HTTPError as error:
+            raise TusCommunicationError(error)
+        return interface.Response(resp.status, resp.headers, resp.data)
+
+    def close(self):
+        with self._lock:
+            for manager in self._managers.values():
+                manager.clear()
+            self._managers.clear()
@@ -1,21 +1,49 @@
-from typing import Optional, IO, Dict, Tuple, TYPE_CHECKING, Union
+from typing import Optional, IO, Iterable, Dict, List, Tuple, TYPE_CHECKING, Union
+from urllib.parse import urljoin
+import contextlib
 import os
 import re
+import threading
+import time
 from base64 import b64encode
 from sys import maxsize as MAXSIZE
 import hashlib
 
-import requests
-
-from tusclient.exceptions import TusCommunicationError
-from tusclient.request import TusRequest, catch_requests_error
+from tusclient import trace
+from tusclient.exceptions import TusCommunicationError, TusUploadCancelled
+from tusclient.request import TusRequest
+from tusclient.streams import MemoryStream, ReplayBuffer, is_buffer, is_seekable
 from tusclient.fingerprint import fingerprint, interface
 from tusclient.storage.interface import Storage
+from tusclient.uploader.prefetch import Chunk, ChunkPrefetcher
+from tusclient.transport.interface import AsyncTransport, Transport
+from tusclient.watchdog import TransferMonitor
 
 if TYPE_CHECKING:
     from tusclient.client import TusClient
 
 
+def encode_metadata(metadata: Dict, encoding: str = "utf-8") -> List[str]:
+    """
+    Return the list of the Upload-Metadata entries of the metadata, as defined by the
+    Tus protocol.
+    """
+    encoded_list = []
+    for key, value in metadata.items():
+        key_str = str(key)  # dict keys may be of any object type.
+
+        # confirm that the key does not contain unwanted characters.
+        if re.search(r"^$|[\s,]+", key_str):
+            msg = 'Upload-metadata key "{}" cannot be empty nor contain spaces or commas.'
+            raise ValueError(msg.format(key_str))
+
+        value_bytes = value.encode(encoding)
+        encoded_list.append(
+            "{} {}".format(key_str, b64encode(value_bytes).decode("ascii"))
+        )
+    return encoded_list
+
+
 class BaseUploader:
     """
     Object to control upload related functions.
@@ -24,10 +52,23 @@ class BaseUploader:
         - file_path (str):
             This is the path(absolute/relative) to the file that is intended for upload
             to the tus server. On instantiation this attribute is required.
+            The file is opened once when its data is first needed and the same handle is
+            reused for all chunks. It is closed when `upload` returns, or by calling `close`
+            (the uploader can also be used as a context manager).
         - file_stream (file):
             As an alternative to the `file_path`, an instance of the file to be uploaded
             can be passed to the constructor as `file_stream`. Do note that either the
             `file_stream` or the `file_path` must be passed on instantiation.
+            The stream may also be non-seekable (e.g. stdin, a pipe or a socket) or a plain
+            iterable of bytes (e.g. a generator), in which case `upload_length_deferred` must be
+            set and `store_url` is not supported. Such sources are wrapped in a
+            <tusclient.streams.ReplayBuffer>, which keeps the data not yet acknowledged by the
+            server in memory, so that failed chunks can be retried. The memory used is bounded
+            by the `chunk_size` (times `read_ahead` + 2 when reading ahead).
+            Data already in memory can be passed as is, as any object supporting the buffer
+            protocol (bytes, bytearray, memoryview, numpy arrays, ...). It is wrapped in a
+            <tusclient.streams.MemoryStream>, and chunks are checksummed and sent from
+            memoryview slices of it, without being copied.
         -  url (str):
             If the upload url for the file is known, it can be passed to the constructor.
             This may happen when you resume an upload.
@@ -61,6 +102,10 @@ class BaseUploader:
             If not specified, it defaults to True.
         - store_url (bool):
             Determines whether or not url should be stored, and uploads should be resumed.
+            Once an upload is finished, its url and size are also recorded as completed in the
+            url storage (see <tusclient.storage.interface.Storage.set_completed>). Uploaders
+            created later for the same file are then complete from the start, without any
+            request to the server.
         - url_storage (<tusclient.storage.interface.Storage>):
             An implementation of <tusclient.storage.interface.Storage> which is an API for URL storage.
             This value must be set if store_url is set to true. A ready to use implementation exists atbe used out of the box. But you can
@@ -70,13 +115,71 @@ class BaseUploader:
             a unique fingerprint for the uploaded file. This is used for url storage when resumability is enabled.
             if store_url is set to true, the default fingerprint module (<tusclient.fingerprint.fingerprint.Fingerprint>)
             would be used. But you can set your own custom fingerprint module by passing it to the constructor.
+        - completed (bool):
+            Whether the whole file is known to have been uploaded, either by this uploader or,
+            according to the url storage, by an earlier one.
+        - storage_key (Optional[str]):
+            The key under which the upload is recorded in the url storage, i.e. the
+            fingerprint of the file. None if `store_url` is not set.
+        - finished (bool):
+            Whether the upload has been created and every chunk up to `stop_at` has been
+            uploaded.
+        - partial (bool):
+            Whether or not to create the upload as a partial upload of the concatenation
+            extension (`Upload-Concat: partial`), to be concatenated with others into a final
+            upload, see <tusclient.concat>. Defaults to False.
+        - offset_journal (bool):
+            Whether or not to journal the offset acknowledged by the server in the url storage
+            after each chunk (see <tusclient.storage.interface.Storage.set_offset>), and to
+            resume a stored upload from its journaled offset without asking the server for
+            it. If the server rejects the journaled offset, e.g. with 409 Conflict because
+            it received more data than was journaled, the offset is fetched with a HEAD
+            request and the chunk is sent again. Requires `store_url` and `url_storage`.
+            Defaults to False.
+        - offset_from_journal (bool):
+            Whether the `offset` was taken from the journal and is not confirmed by the
+            server yet.
+        - digest_algorithm (Optional[str]):
+            The name of a `hashlib` algorithm (e.g. "sha256") to compute a digest of the whole
+            file with while it is uploaded, see `digest`. The data is hashed as the server
+            acknowledges it, so the file is not read a second time. After a resume, the part
+            uploaded earlier is read and hashed once when the upload continues, as hash states cannot be
+            stored. Defaults to None, i.e. no digest is computed.
+        - send_digest (bool):
+            Whether or not to send the digest of the whole file with the last chunk, in a
+            `Repr-Digest` header (RFC 9530), so that servers supporting it can verify the
+            upload. Requires `digest_algorithm`. Defaults to False.
         - upload_checksum (bool):
             Whether or not to supply the Upload-Checksum header along with each
             chunk. Defaults to False.
+        - checksum_trailer (bool):
+            Whether or not to send the Upload-Checksum as a trailer, after the chunk, instead
+            of as a header (the `checksum-trailer` extension of the tus protocol). Chunks are
+            then streamed from the file with chunked transfer encoding and hashed while they
+            are sent, so they are never held in memory as a whole. Requires `upload_checksum`
+            and a transport supporting trailers, such as
+            <tusclient.transport.sendfiletransport.SendfileTransport>; otherwise, and for
+            chunks read ahead, uploads of deferred length and uploads computing a digest,
+            the checksum is sent as a header. Defaults to False.
         - upload_length_deferred (bool):
             Whether or not to declare the upload length when finished reading the file stream instead of when the upload is started. This is useful
             when uploading from a streaming resource, where the total file size isn't available when the upload is created
             but only becomes known when the stream finishes. The server must support the `creation-defer-length` extension.
+        - read_ahead (int):
+            The number of chunks to read ahead during `upload`. If greater than 0, a background thread
+            reads (and, if `upload_checksum` is set, hashes) the following chunks while the current one is
+            being sent, so that reading the file and sending it overlap. At most this many chunks are
+            held in memory in addition to the chunk being sent. Defaults to 0, i.e. chunks are only read
+            when they are about to be sent.
+        - min_rate (Optional[float]):
+            The minimum rate, in bytes per second, at which the data of a chunk must be sent,
+            measured over `stall_window`. Slower requests are aborted as stalled
+            (<tusclient.exceptions.TusUploadStalled>) and retried from the offset of the server,
+            as any failed request (see `retries`). Defaults to None, i.e. no minimum.
+        - stall_window (float):
+            The number of seconds the rate is measured over for `min_rate`. Defaults to 10.
+        - cancelled (bool):
+            Whether `cancel` was called.
 
     :Constructor Args:
         - file_path (str)
@@ -93,10 +196,26 @@ class BaseUploader:
         - url_storage (Optinal [<tusclient.storage.interface.Storage>])
         - fingerprinter (Optional [<tusclient.fingerprint.interface.Fingerprint>])
         - upload_checksum (Optional[bool])
+        - checksum_trailer (Optional[bool])
         - upload_length_deferred (Optional[bool])
+        - read_ahead (Optional[int])
+        - digest_algorithm (Optional[str])
+        - send_digest (Optional[bool])
+        - partial (Optional[bool])
+        - offset_journal (Optional[bool])
+        - min_rate (Optional[float])
+        - stall_window (Optional[float])
+        - resolve_offset (Optional[bool]):
+            Whether or not to fetch the offset of an existing upload (see `url` and `store_url`)
+            from the server while the uploader is created. Defaults to True. Pass False when
+            creating many uploaders at once, and resolve their offsets concurrently afterwards with
+            <tusclient.resume.resume_uploaders>.
     """
 
     DEFAULT_HEADERS = {"Tus-Resumable": "1.0.0"}
+    DIGEST_BLOCK_SIZE = 1024 * 1024
+    # Names of the hashlib algorithms in the HTTP digest fields registry.
+    DIGEST_FIELD_NAMES = {"sha256": "sha-256", "sha512": "sha-512", "sha1": "sha", "md5": "md5"}
     DEFAULT_CHUNK_SIZE = MAXSIZE
     CHECKSUM_ALGORITHM_PAIR = (
         "sha1",
@@ -106,7 +225,7 @@ class BaseUploader:
     def __init__(
         self,
         file_path: Optional[str] = None,
-        file_stream: Optional[IO] = None,
+        file_stream: Optional[Union[IO, Iterable[bytes]]] = None,
         url: Optional[str] = None,
         client: Optional["TusClient"] = None,
         chunk_size: int = MAXSIZE,
@@ -120,6 +239,15 @@ class BaseUploader:
         fingerprinter: Optional[interface.Fingerprint] = None,
         upload_checksum=False,
         upload_length_deferred=False,
+        read_ahead: int = 0,
+        resolve_offset: bool = True,
+        digest_algorithm: Optional[str] = None,
+        send_digest: bool = False,
+        partial: bool = False,
+        offset_journal: bool = False,
+        min_rate: Optional[float] = None,
+        stall_window: float = 10.0,
+        checksum_trailer: bool = False,
     ):
         if file_path is None and file_stream is None:
             raise ValueError("Either 'file_path' or 'file_stream' cannot be None.")
@@ -132,6 +260,25 @@ class BaseUploader:
                 "Please specify a storage instance to enable resumablility."
             )
 
+        if offset_journal and not store_url:
+            raise ValueError("Journaling the offset requires 'store_url' and 'url_storage'.")
+
+        if file_stream is not None and is_buffer(file_stream):
+            file_stream = MemoryStream(file_stream)
+        elif file_stream is not None and not is_seekable(file_stream):
+            if not upload_length_deferred:
+                raise ValueError(
+                    "Uploading from a non-seekable stream requires 'upload_length_deferred'."
+                )
+            if store_url:
+                raise ValueError(
+                    "Resumability is not supported for non-seekable streams."
+                )
+            file_stream = ReplayBuffer(file_stream)
+
+        self._transport = None
+        self._async_transport = None
+        self._file_handle = None
         self.verify_tls_cert = verify_tls_cert
         self.file_path = file_path
         self.file_stream = file_stream
@@ -145,14 +292,36 @@ class BaseUploader:
         self.fingerprinter = fingerprinter or fingerprint.Fingerprint()
         self.offset = 0
         self.url = None
-        self.__init_url_and_offset(url)
+        self._storage_key = None
+        self.completed = False
+        self.digest_algorithm = digest_algorithm
+        self.send_digest = send_digest
+        self._digest_hasher = hashlib.new(digest_algorithm) if digest_algorithm else None
+        self._digest_offset = 0
+        self._digest = None
+        self.partial = partial
+        self.offset_journal = offset_journal
+        self.offset_from_journal = False
+        try:
+            self.__init_url_and_offset(url, resolve_offset)
+        finally:
+            # Don't keep the file open while the uploader is idle, nor once it failed.
+            self.close()
         self.chunk_size = chunk_size
         self.retries = retries
         self.request = None
         self._retried = 0
         self.retry_delay = retry_delay
         self.upload_checksum = upload_checksum
+        self.checksum_trailer = checksum_trailer
         self.upload_length_deferred = upload_length_deferred
+        self.read_ahead = read_ahead
+        self._prefetcher = None
+        self.min_rate = min_rate
+        self.stall_window = stall_window
+        self._cancelled = threading.Event()
+        self._task = None
+        self._loop = None
         (
             self.__checksum_algorithm_name,
             self.__checksum_algorithm,
@@ -174,8 +343,39 @@ class BaseUploader:
         else:
             headers["upload-length"] = str(self.file_size)
         headers["upload-metadata"] = ",".join(self.encode_metadata())
+        if self.partial:
+            headers["upload-concat"] = "partial"
         return headers
 
+    def _creation_urls(self) -> List[str]:
+        """
+        Return the creation urls to try, in order. With several endpoints (see
+        <tusclient.endpoints.EndpointSelector>), the next one is tried if one fails.
+        """
+        endpoints = getattr(self.client, "endpoints", None)
+        return endpoints.candidates() if endpoints is not None else [self.client.url]
+
+    def _creation_failed(self, creation_url: str, started: float, resp=None) -> bool:
+        """
+        Record the outcome of a creation request with the client's endpoint selector,
+        and return whether it failed because of the endpoint, i.e. the connection failed
+        (`resp` is None) or the server answered with a 5xx status.
+        """
+        endpoints = getattr(self.client, "endpoints", None)
+        failed = resp is None or resp.status_code >= 500
+        if endpoints is not None:
+            endpoints.record(creation_url, time.monotonic() - started, not failed)
+        return failed
+
+    def _parse_creation_response(self, creation_url: str, resp) -> str:
+        url = resp.headers.get("location")
+        if url is None:
+            msg = "Attempt to retrieve create file url with status {}".format(
+                resp.status_code
+            )
+            raise TusCommunicationError(msg, resp.status_code, resp.content)
+        return urljoin(creation_url, url)
+
     @property
     def checksum_algorithm(self):
         """The checksum algorithm to be used for the Upload-Checksum extension."""
@@ -193,7 +393,60 @@ class BaseUploader:
         """The client certificate used for the configured client"""
         return self.client.client_cert if self.client is not None else None
 
-    @catch_requests_error
+    @property
+    def bandwidth_limiter(self):
+        """The bandwidth limiter of the configured client, if any"""
+        return self.client.bandwidth_limiter if self.client is not None else None
+
+    @property
+    def tracer(self):
+        """The <tusclient.trace.Tracer> of the client, if any."""
+        return getattr(self.client, "tracer", None)
+
+    @property
+    def buffer_pool(self):
+        """The buffer pool of the configured client, if any"""
+        return self.client.buffer_pool if self.client is not None else None
+
+    @property
+    def transport(self) -> Transport:
+        """
+        The transport used for synchronous requests, which is the one of the configured
+        client. Uploaders without a client use a <tusclient.transport.requeststransport.RequestsTransport>.
+        """
+        if self.client is not None:
+            return self.client.transport
+        if self._transport is None:
+            from tusclient.transport.requeststransport import RequestsTransport
+
+            self._transport = RequestsTransport()
+        return self._transport
+
+    @property
+    def async_transport(self) -> AsyncTransport:
+        """
+        The transport used for asynchronous requests, which is the one of the configured
+        client. Uploaders without a client use a <tusclient.transport.aiohttptransport.AiohttpTransport>.
+        """
+        if self.client is not None:
+            return self.client.async_transport
+        if self._async_transport is None:
+            from tusclient.transport.aiohttptransport import AiohttpTransport
+
+            self._async_transport = AiohttpTransport()
+        return self._async_transport
+
+    def get_precomputed_checksum(self, offset: int, length: int) -> Optional[str]:
+        """
+        Return the value of the Upload-Checksum header for the chunk of `length` bytes
+        starting at `offset`, if it is known without reading the chunk.
+
+        By default this returns None, in which case the checksum is computed from the
+        data. Subclasses may override it to take checksums from a precomputed source,
+        which allows transports supporting it to send such chunks with `sendfile`.
+        """
+        return None
+
     def get_offset(self):
         """
         Return offset from tus server.
@@ -201,9 +454,23 @@ class BaseUploader:
         This is different from the instance attribute 'offset' because this makes an
         http request to the tus server to retrieve the offset.
         """
-        resp = requests.head(
-            self.url, headers=self.get_headers(), verify=self.verify_tls_cert, cert=self.client_cert
-        )
+        with trace.span(self.tracer, "HEAD", url=self.url) as span:
+            with trace.phase("request"):
+                resp = self.transport.request(
+                    "HEAD",
+                    self.url,
+                    self.get_headers(),
+                    verify=self.verify_tls_cert,
+                    cert=self.client_cert,
+                )
+            span.set(status=resp.status_code, offset=resp.headers.get("upload-offset"))
+        return self._offset_from_response(resp)
+
+    @staticmethod
+    def _offset_from_response(resp) -> int:
+        """
+        Return the offset reported by the response to a HEAD request.
+        """
         offset = resp.headers.get("upload-offset")
         if offset is None:
             msg = "Attempt to retrieve offset fails with status {}".format(
@@ -216,63 +483,333 @@ class BaseUploader:
         """
         Return list of encoded metadata as defined by the Tus protocol.
         """
-        encoded_list = []
-        for key, value in self.metadata.items():
-            key_str = str(key)  # dict keys may be of any object type.
-
-            # confirm that the key does not contain unwanted characters.
-            if re.search(r"^$|[\s,]+", key_str):
-                msg = 'Upload-metadata key "{}" cannot be empty nor contain spaces or commas.'
-                raise ValueError(msg.format(key_str))
-
-            value_bytes = value.encode(self.metadata_encoding)
-            encoded_list.append(
-                "{} {}".format(key_str, b64encode(value_bytes).decode("ascii"))
-            )
-        return encoded_list
+        return encode_metadata(self.metadata, self.metadata_encoding)
 
-    def __init_url_and_offset(self, url: Optional[str] = None):
+    def __init_url_and_offset(self, url: Optional[str] = None, resolve_offset=True):
         """
         Return the tus upload url.
 
         If resumability is enabled, this would try to get the url from storage if available,
         otherwise it would request a new upload url from the tus server.
         """
-        key = None
         if url:
             self.set_url(url)
 
         if self.store_url and self.url_storage:
-            key = self._get_fingerprint()
-            self.set_url(self.url_storage.get_item(key))
-
-        if self.url:
-            try:
-                self.offset = self.get_offset()
-            except TusCommunicationError as error:
-                # Special cases where url is still considered valid with given response code.
-                special_case_codes = [423]
-                # Process case where stored url is no longer valid.
-                if (
-                    key
-                    and 400 <= error.status_code <= 499
-                    and error.status_code not in special_case_codes
-                ):
-                    self.url = None
-                    self.url_storage.remove_item(key)
-                else:
-                    raise error
+            if self._storage_key is None:
+                self._storage_key = self._get_fingerprint()
+            completed = self.url_storage.get_completed(self._storage_key)
+            if completed is not None and self.file_size in (None, completed.size):
+                # The file has been uploaded already; nothing to ask the server.
+                self.url = completed.url
+                self.file_size = self.stop_at = self.offset = completed.size
+                self.completed = True
+                if completed.digest_algorithm == self.digest_algorithm:
+                    self._digest = completed.digest
+                return
+            self.set_url(self.url_storage.get_item(self._storage_key))
+            if self.url and self.offset_journal:
+                offset = self.url_storage.get_offset(self._storage_key, self.url)
+                if offset is not None:
+                    # Trusted until the server disagrees, see `_resolve_journaled_offset`.
+                    self.offset = offset
+                    self.offset_from_journal = True
+                    return
+
+        if self.url and resolve_offset:
+            self.resolve_offset()
+
+    def resolve_offset(self):
+        """
+        Set the `offset` of the upload to the one reported by the tus server.
+
+        If the url was taken from the url storage and the server reports that it is no
+        longer valid, it is removed from the storage and the `url` is reset, so that
+        `upload` starts a new upload.
+        """
+        try:
+            self.offset = self.get_offset()
+        except TusCommunicationError as error:
+            self._forget_stale_url(error)
+
+    def _forget_stale_url(self, error: TusCommunicationError):
+        """
+        Forget the stored url if the error, raised when fetching its offset, means that
+        it is no longer valid, or raise the error otherwise.
+        """
+        # Only stored urls are dropped; explicitly given ones are the caller's.
+        if self._storage_key is None or not self.is_stale_url_error(error):
+            raise error
+        self.forget_url()
+
+    @staticmethod
+    def is_stale_url_error(error: TusCommunicationError) -> bool:
+        """
+        Return whether the error, raised when fetching the offset of an upload, means
+        that its url is no longer valid.
+        """
+        # Special cases where url is still considered valid with given response code.
+        special_case_codes = [423]
+        return (
+            error.status_code is not None
+            and 400 <= error.status_code <= 499
+            and error.status_code not in special_case_codes
+        )
+
+    def forget_url(self):
+        """
+        Reset the upload url, and remove it from the url storage if it was stored.
+        """
+        self.url = None
+        self.offset = 0
+        if self._storage_key is not None:
+            self.url_storage.remove_item(self._storage_key)
+
+    @property
+    def storage_key(self) -> Optional[str]:
+        """
+        The key of the upload in the url storage, i.e. the fingerprint of the file, or
+        None if its url is not stored (see `store_url`).
+        """
+        return self._storage_key
 
     def _get_fingerprint(self):
-        with self.get_file_stream() as stream:
-            return self.fingerprinter.get_fingerprint(stream)
+        return self.fingerprinter.get_fingerprint(self.get_file_stream())
 
     def set_url(self, url: str):
         """Set the upload URL"""
         self.url = url
         if self.store_url and self.url_storage:
-            key = self._get_fingerprint()
-            self.url_storage.set_item(key, url)
+            # The file is only fingerprinted once, before chunks may be read ahead from
+            # the same stream.
+            if self._storage_key is None:
+                self._storage_key = self._get_fingerprint()
+            self.url_storage.set_item(self._storage_key, url)
+
+    def _record_offset(self):
+        """
+        Take note of the offset acknowledged by the server for the last chunk.
+        """
+        self.offset_from_journal = False
+        if self.offset_journal and self._storage_key is not None:
+            self.url_storage.set_offset(self._storage_key, self.url, self.offset)
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether `cancel` was called."""
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """
+        Stop the upload, from any thread or task.
+
+        The running `upload` (or `upload_chunk`) raises
+        <tusclient.exceptions.TusUploadCancelled>. An async upload stops at once, as its
+        task is cancelled. A sync upload stops before the next chunk is sent, or, if its
+        requests are throttled or watched for stalls, before the next block of data.
+        While it waits for a response, it stops once the response arrives or the read
+        timeout of the transport expires. Retry delays are cut short.
+
+        A cancelled uploader cannot upload anymore. The data acknowledged by the server
+        is kept, so that the upload can be resumed by a new uploader.
+        """
+        self._cancelled.set()
+        task, loop = self._task, self._loop
+        if task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise TusUploadCancelled("The upload was cancelled.")
+
+    def get_transfer_monitor(self, cancellable: bool) -> Optional[TransferMonitor]:
+        """
+        Return a <tusclient.watchdog.TransferMonitor> for the body of a request, or None
+        if the body does not need to be watched.
+
+        Bodies which are neither throttled (see `bandwidth_limiter`) nor watched for
+        stalls (see `min_rate`) are sent whole rather than block by block, so a
+        cancelled upload only stops before its next chunk.
+
+        :Args:
+            - cancellable (bool):
+                Whether the monitor should stop the body once the upload is cancelled.
+        """
+        if self.min_rate is None and (not cancellable or self.bandwidth_limiter is None):
+            return None
+        return TransferMonitor(
+            self.bandwidth_limiter,
+            self.min_rate,
+            self.stall_window,
+            self._cancelled if cancellable else None,
+        )
+
+    def _trace_retry(self, error: TusCommunicationError):
+        """
+        Trace the decision to retry the failed chunk or to give up.
+        """
+        if self.tracer is None:
+            return
+        retry = self.retries > self._retried
+        self.tracer.event(
+            "retry" if retry else "fail",
+            url=self.url,
+            offset=self.offset,
+            attempt=self._retried + 1,
+            delay=self.retry_delay if retry else None,
+            status=error.status_code,
+            error=str(error),
+        )
+
+    def _journaled_offset_rejected(self, error: TusCommunicationError) -> bool:
+        """
+        Return whether the chunk was rejected because the offset taken from the journal
+        was wrong, in which case the offset has to be fetched from the server (see
+        `_resolve_journaled_offset`) and the chunk sent again.
+        """
+        return self.offset_from_journal and self.is_stale_url_error(error)
+
+    def _resolve_journaled_offset(self):
+        """
+        Replace the offset taken from the journal by the one of the server. The url is
+        reset if it turned out to be no longer valid, in which case the upload has to
+        be created again.
+        """
+        self.offset_from_journal = False
+        self.resolve_offset()
+
+    @contextlib.contextmanager
+    def _read_ahead_paused(self):
+        """
+        Stop reading ahead while the offset of the upload is reset, and start again
+        from the new offset afterwards.
+        """
+        reading_ahead = self._prefetcher is not None
+        self._stop_read_ahead()
+        try:
+            yield
+        finally:
+            if reading_ahead:
+                self._start_read_ahead()
+
+    @property
+    def finished(self) -> bool:
+        """
+        Whether the upload has been created and every chunk up to `stop_at` has been
+        uploaded.
+        """
+        if self.url is None or self.stop_at is None:
+            return False
+        return self.offset >= self.stop_at
+
+    def finish(self):
+        """
+        End an upload driven chunk by chunk (see `begin`): stop reading ahead, record the
+        upload as completed in the url storage if the whole file has been uploaded, and
+        close the file. Call it whether the upload succeeded or not.
+        """
+        self._stop_read_ahead()
+        try:
+            if self.finished:
+                self._mark_completed()
+        finally:
+            self.close()
+
+    def _mark_completed(self):
+        """
+        Record that the upload is finished, if the whole file has been uploaded.
+        """
+        if self.completed or self.stop_at is None or self.offset < self.stop_at:
+            return
+        if self.file_size is not None and self.offset < self.file_size:
+            # Only part of the file was requested.
+            return
+        self.completed = True
+        if self._storage_key is not None:
+            self.url_storage.set_completed(
+                self._storage_key,
+                self.url,
+                self.offset,
+                self.digest,
+                self.digest_algorithm if self.digest else None,
+            )
+
+    @property
+    def digest(self) -> Optional[str]:
+        """
+        The hexadecimal digest of the whole file, computed with `digest_algorithm`, once the
+        upload is completed. None before, or if no algorithm is configured.
+        """
+        if not self.completed:
+            return None
+        if self._digest is None and self._digest_hasher is not None:
+            self._catch_up_digest(self.offset)
+            if self._digest_hasher is not None and self._digest_offset == self.offset:
+                self._digest = self._digest_hasher.hexdigest()
+        return self._digest
+
+    def get_final_digest(self, offset: int, data: bytes) -> Optional[str]:
+        """
+        Return the value of the Repr-Digest header for the last chunk, which starts at
+        `offset` and contains `data`, or None if no digest is to be sent.
+        """
+        if not self.send_digest or self._digest_hasher is None:
+            return None
+        self._catch_up_digest(offset)
+        if self._digest_hasher is None or self._digest_offset != offset:
+            return None
+        hasher = self._digest_hasher.copy()
+        hasher.update(data)
+        name = self.DIGEST_FIELD_NAMES.get(self.digest_algorithm, self.digest_algorithm)
+        return "{}=:{}:".format(name, b64encode(hasher.digest()).decode("ascii"))
+
+    def _update_digest(self):
+        """
+        Feed the data of the last request which the server has acknowledged to the
+        running digest.
+        """
+        request = self.request
+        if self._digest_hasher is None or request is None or request.data is None:
+            return
+        if request.offset > self._digest_offset:
+            # E.g. the server stored part of a chunk whose response was lost.
+            self._catch_up_digest(request.offset)
+            if self._digest_hasher is None:
+                return
+        start = self._digest_offset - request.offset
+        end = self.offset - request.offset
+        if 0 <= start < end:
+            self._digest_hasher.update(request.data[start:end])
+            self._digest_offset += end - start
+
+    def _catch_up_digest(self, target: int):
+        """
+        Hash the file up to `target`, e.g. the part uploaded before the upload was
+        resumed. If that part cannot be read anymore (non-seekable streams release the
+        acknowledged data), no digest is computed for the upload.
+        """
+        if self._digest_hasher is None or self._digest_offset >= target:
+            return
+        # Reading ahead shares the file stream, so pause it while reading here.
+        reading_ahead = self._prefetcher is not None
+        was_open = self._file_handle is not None
+        self._stop_read_ahead()
+        try:
+            stream = self.get_file_stream()
+            stream.seek(self._digest_offset)
+            while self._digest_offset < target:
+                block = stream.read(min(self.DIGEST_BLOCK_SIZE, target - self._digest_offset))
+                if not block:
+                    break
+                self._digest_hasher.update(block)
+                self._digest_offset += len(block)
+        except ValueError:
+            self._digest_hasher = None
+        finally:
+            if reading_ahead:
+                self._start_read_ahead()
+            elif not was_open:
+                self.close()
 
     def get_request_length(self):
         """
@@ -282,22 +819,73 @@ class BaseUploader:
             return self.chunk_size
         return min(self.chunk_size, self.stop_at - self.offset)
 
+    def _release_acknowledged(self):
+        """Drop buffered stream data which the server has acknowledged."""
+        if isinstance(self.file_stream, ReplayBuffer):
+            self.file_stream.release(self.offset)
+
+    def _start_read_ahead(self):
+        if self.read_ahead > 0:
+            self._prefetcher = ChunkPrefetcher(self, self.read_ahead)
+
+    def _stop_read_ahead(self):
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+
+    def _next_chunk(self) -> Optional[Chunk]:
+        """
+        Return the chunk to be uploaded next if chunks are being read ahead, or None.
+        """
+        if self._prefetcher is None:
+            return None
+        return self._prefetcher.get(self.offset, self.get_request_length())
+
     def get_file_stream(self):
         """
         Return a file stream instance of the upload.
         """
         if self.file_stream:
-            self.file_stream.seek(0)
+            # Non-seekable streams are read from wherever the upload currently is.
+            if is_seekable(self.file_stream):
+                self.file_stream.seek(0)
             return self.file_stream
-        elif os.path.isfile(self.file_path):
-            return open(self.file_path, "rb")
+
+        if self._file_handle is None or self._file_handle.closed:
+            if not os.path.isfile(self.file_path):
+                raise ValueError("invalid file {}".format(self.file_path))
+            self._file_handle = open(self.file_path, "rb")
         else:
-            raise ValueError("invalid file {}".format(self.file_path))
+            self._file_handle.seek(0)
+        return self._file_handle
 
     def get_file_size(self):
         """
         Return size of the file.
         """
+        if not self.file_stream:
+            if not os.path.isfile(self.file_path):
+                raise ValueError("invalid file {}".format(self.file_path))
+            return os.path.getsize(self.file_path)
+        if isinstance(self.file_stream, MemoryStream):
+            return self.file_stream.nbytes
         stream = self.get_file_stream()
         stream.seek(0, os.SEEK_END)
         return stream.tell()
+
+    def close(self):
+        """
+        Close the file handle the uploader opened for `file_path`.
+
+        Streams passed as `file_stream` are left open. The handle is opened again if
+        the uploader is used after being closed.
+        """
+        if self._file_handle is not None:
+            self._file_handle.close()
+            self._file_handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,194 @@
+"""
+Read-ahead of upload chunks.
+
+While a chunk is being sent to the server, a background thread reads (and, if
+checksums are enabled, hashes) the following chunks into a bounded buffer, so that
+disk and network time overlap.
+"""
+from typing import NamedTuple, Optional, TYPE_CHECKING
+import queue
+import threading
+
+from tusclient.bufferpool import read_into
+from tusclient.request import encode_checksum
+from tusclient.streams import MemoryStream
+
+if TYPE_CHECKING:
+    from tusclient.uploader.baseuploader import BaseUploader
+
+
+class Chunk(NamedTuple):
+    """
+    A chunk of the upload which has been read ahead.
+
+    :Attributes:
+        - offset (int): The offset at which the chunk starts.
+        - data (bytes | memoryview): The content of the chunk.
+        - checksum (Optional[str]): The value of the Upload-Checksum header for the chunk.
+        - length (int): The number of bytes that were requested for the chunk.
+        - buffer (Optional[bytearray]):
+            The buffer of the uploader's buffer pool which `data` is a view of, if any.
+    """
+
+    offset: int
+    data: bytes
+    checksum: Optional[str]
+    length: int
+    buffer: Optional[bytearray] = None
+
+
+class ChunkPrefetcher:
+    """
+    Reads the chunks of an upload ahead in a background thread.
+
+    At most `max_chunks` chunks are buffered at a time, in addition to the chunk
+    handed out last (which is kept so it can be sent again on a retry) and the one
+    the thread is currently reading. If the uploader has a buffer pool, the chunks are
+    read into its buffers, which are given back once the chunks are dropped.
+
+    :Constructor Args:
+        - uploader (<tusclient.uploader.baseuploader.BaseUploader>)
+        - max_chunks (int)
+    """
+
+    PUT_TIMEOUT = 0.1
+
+    def __init__(self, uploader: "BaseUploader", max_chunks: int):
+        if max_chunks < 1:
+            raise ValueError("'max_chunks' must be at least 1.")
+        self._uploader = uploader
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._stop = threading.Event()
+        self._thread = None
+        self._current = None
+
+    def get(self, offset: int, length: int) -> Chunk:
+        """
+        Return the chunk of `length` bytes starting at `offset`.
+
+        If the chunk is not the one which was read ahead (e.g. because the server
+        reported a different offset after a failure), reading restarts at `offset`.
+        Errors raised while reading the file are re-raised here.
+        """
+        if self._matches(self._current, offset, length):
+            return self._current
+        # The previous chunk will not be sent again; free its buffer before waiting,
+        # so that the pool cannot run dry with every upload holding one.
+        self._discard(self._current)
+        self._current = None
+        restarted = self._thread is None
+        if restarted:
+            self._start(offset)
+
+        while True:
+            item = self._queue.get()
+            if isinstance(item, BaseException):
+                self.close()
+                raise item
+            if self._matches(item, offset, length):
+                self._current = item
+                return item
+            self._discard(item)
+            if item is None and restarted:
+                raise ValueError("no chunk to read at offset {}".format(offset))
+            # The chunk is not the one that was read ahead; start over at
+            # the requested offset.
+            restarted = True
+            self._start(offset)
+
+    def close(self):
+        """Stop reading ahead and drop the buffered chunks."""
+        self._discard(self._current)
+        self._current = None
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._drain()
+        self._thread.join()
+        self._drain()
+        self._thread = None
+
+    def _matches(self, chunk: Optional[Chunk], offset: int, length: int) -> bool:
+        return chunk is not None and chunk.offset == offset and chunk.length == length
+
+    def _discard(self, item):
+        if isinstance(item, Chunk) and item.buffer is not None:
+            self._uploader.buffer_pool.release(item.buffer)
+
+    def _drain(self):
+        while True:
+            try:
+                self._discard(self._queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _read_chunk(self, stream, length: int, stop: threading.Event):
+        """
+        Read a chunk into a buffer of the pool, if the uploader has one.
+
+        Return the data and the buffer, which is None without pool, or (None, None) if
+        reading was stopped while waiting for a free buffer.
+        """
+        pool = self._uploader.buffer_pool
+        size = self._uploader.chunk_size
+        if pool is None or size > pool.max_memory or isinstance(stream, MemoryStream):
+            return stream.read(length), None
+        buffer = None
+        while buffer is None:
+            if stop.is_set():
+                return None, None
+            buffer = pool.acquire(size, timeout=self.PUT_TIMEOUT)
+        view = memoryview(buffer)[:length]
+        return view[: read_into(stream, view)], buffer
+
+    def _start(self, offset: int):
+        self.close()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._read, args=(offset, self._stop), daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                self._queue.put(item, timeout=self.PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self, offset: int, stop: threading.Event):
+        uploader = self._uploader
+        try:
+            stream = uploader.get_file_stream()
+            stream.seek(offset)
+            while not stop.is_set():
+                if uploader.stop_at is None:
+                    length = uploader.chunk_size
+                else:
+                    length = min(uploader.chunk_size, uploader.stop_at - offset)
+                if length <= 0:
+                    break
+                data, buffer = self._read_chunk(stream, length, stop)
+                if data is None:
+                    return
+                checksum = None
+                if uploader.upload_checksum:
+                    checksum = encode_checksum(
+                        uploader.checksum_algorithm_name,
+                        uploader.checksum_algorithm,
+                        data,
+                    )
+                chunk = Chunk(offset, data, checksum, length, buffer)
+                if not self._put(chunk, stop):
+                    self._discard(chunk)
+                    return
+                if len(data) < length:
+                    # End of the stream.
+                    break
+                offset += length
+        except Exception as error:
+            self._put(error, stop)
+        else:
+            self._put(None, stop)
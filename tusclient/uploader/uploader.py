@@ -1,16 +1,17 @@
 from typing import Optional
 import time
-import asyncio
-from urllib.parse import urljoin
-
-import requests
-import aiohttp
-import ssl
+# asyncio (like the HTTP libraries) is only imported by the code using it, so that
+# sync uploads do not pay for importing it.
 
+from tusclient import trace
 from tusclient.uploader.baseuploader import BaseUploader
 
-from tusclient.exceptions import TusUploadFailed, TusCommunicationError
-from tusclient.request import TusRequest, AsyncTusRequest, catch_requests_error
+from tusclient.exceptions import (
+    TusCommunicationError,
+    TusUploadCancelled,
+    TusUploadFailed,
+)
+from tusclient.request import TusRequest, AsyncTusRequest
 
 
 def _verify_upload(request: TusRequest):
@@ -28,12 +29,31 @@ class Uploader(BaseUploader):
         Performs continous upload of chunks of the file. The size uploaded at each cycle is
         the value of the attribute 'chunk_size'.
 
+        :Args:
+            - stop_at (Optional[int]):
+                Determines at what offset value the upload should stop. If not specified this
+                defaults to the file size.
+        """
+        try:
+            self.begin(stop_at)
+            while not self.finished:
+                self.upload_chunk()
+        finally:
+            self.finish()
+
+    def begin(self, stop_at: Optional[int] = None):
+        """
+        Prepare to upload the file chunk by chunk with `upload_chunk`, as `upload` does:
+        create the upload if it has no url yet and start reading ahead. Upload chunks
+        until `finished`, then call `finish`, whether the upload succeeded or not.
+
         :Args:
             - stop_at (Optional[int]):
                 Determines at what offset value the upload should stop. If not specified this
                 defaults to the file size.
         """
         self.stop_at = stop_at or self.file_size
+        self._check_cancelled()
 
         if not self.url:
             # Ensure the POST request is performed even for empty files.
@@ -41,14 +61,13 @@ class Uploader(BaseUploader):
             # only the POST request needs to be performed.
             self.set_url(self.create_url())
             self.offset = 0
-
-        while self.stop_at is None or (self.offset < self.stop_at):
-            self.upload_chunk()
+        self._start_read_ahead()
 
     def upload_chunk(self):
         """
         Upload chunk of file.
         """
+        self._check_cancelled()
         self._retried = 0
 
         # Ensure that we have a URL, as this is behavior we allowed previously.
@@ -57,43 +76,93 @@ class Uploader(BaseUploader):
             self.set_url(self.create_url())
             self.offset = 0
 
-        self._do_request()
-        self.offset = int(self.request.response_headers.get("upload-offset"))
+        try:
+            self._do_request()
+            self.offset = int(self.request.response_headers.get("upload-offset"))
+            self._record_offset()
+            self._update_digest()
+        finally:
+            if self.request is not None:
+                self.request.close()
+        self._release_acknowledged()
         if self.upload_length_deferred and self.request.stream_eof:
             self.stop_at = self.offset
 
-    @catch_requests_error
     def create_url(self):
         """
         Return upload url.
 
         Makes request to tus server to create a new upload url for the required file upload.
         """
-        resp = requests.post(
-            self.client.url,
-            headers=self.get_url_creation_headers(),
-            verify=self.verify_tls_cert,
-            cert=self.client_cert,
-        )
-        url = resp.headers.get("location")
-        if url is None:
-            msg = "Attempt to retrieve create file url with status {}".format(
-                resp.status_code
-            )
-            raise TusCommunicationError(msg, resp.status_code, resp.content)
-        return urljoin(self.client.url, url)
+        urls = self._creation_urls()
+        for attempt, creation_url in enumerate(urls):
+            can_fail_over = attempt < len(urls) - 1
+            started = time.monotonic()
+            try:
+                with trace.span(
+                    self.tracer, "POST", url=creation_url, length=self.file_size
+                ) as span:
+                    with trace.phase("request"):
+                        resp = self.transport.request(
+                            "POST",
+                            creation_url,
+                            self.get_url_creation_headers(),
+                            verify=self.verify_tls_cert,
+                            cert=self.client_cert,
+                        )
+                    span.set(status=resp.status_code, location=resp.headers.get("location"))
+            except TusCommunicationError:
+                self._creation_failed(creation_url, started)
+                if can_fail_over:
+                    continue
+                raise
+            if self._creation_failed(creation_url, started, resp) and can_fail_over:
+                continue
+            return self._parse_creation_response(creation_url, resp)
 
     def _do_request(self):
-        self.request = TusRequest(self)
         try:
-            self.request.perform()
-            _verify_upload(self.request)
+            self._send_chunk()
         except TusUploadFailed as error:
-            self._retry_or_cry(error)
+            if not self._journaled_offset_rejected(error):
+                self._retry_or_cry(error)
+                return
+            with self._read_ahead_paused():
+                try:
+                    self._resolve_journaled_offset()
+                except TusCommunicationError as head_error:
+                    # E.g. a 5xx response, retried like a failed chunk once reading
+                    # ahead is resumed.
+                    error = head_error
+                else:
+                    error = None
+                    if not self.url:
+                        self.set_url(self.create_url())
+                        self.offset = 0
+            if error is not None:
+                self._retry_or_cry(error)
+                return
+            # The offset is confirmed by the server now, so this happens at most once.
+            try:
+                self._send_chunk()
+            except TusUploadFailed as error:
+                self._retry_or_cry(error)
+
+    def _send_chunk(self):
+        if self.request is not None:
+            # Release the buffer of a failed attempt before reading the chunk again.
+            self.request.close()
+        self.request = TusRequest(self, chunk=self._next_chunk())
+        self.request.perform()
+        _verify_upload(self.request)
 
     def _retry_or_cry(self, error):
+        if self.cancelled:
+            raise TusUploadCancelled("The upload was cancelled.") from error
+        self._trace_retry(error)
         if self.retries > self._retried:
-            time.sleep(self.retry_delay)
+            if self._cancelled.wait(self.retry_delay):
+                raise TusUploadCancelled("The upload was cancelled.") from error
 
             self._retried += 1
             try:
@@ -122,19 +191,52 @@ class AsyncUploader(BaseUploader):
                 Determines at what offset value the upload should stop. If not specified this
                 defaults to the file size.
         """
+        import asyncio
+
+        self._check_cancelled()
+        # `cancel` cancels the task, which may run in another thread.
+        self._task = asyncio.current_task()
+        self._loop = asyncio.get_running_loop()
+        try:
+            await self._upload(stop_at)
+        except asyncio.CancelledError:
+            if not self.cancelled:
+                raise
+            uncancel = getattr(self._task, "uncancel", None)
+            if uncancel is not None:
+                uncancel()
+            raise TusUploadCancelled("The upload was cancelled.") from None
+        finally:
+            self._task = self._loop = None
+
+    async def _upload(self, stop_at: Optional[int]):
+        # Keep the transport's connections alive for the whole upload.
+        async with self.async_transport:
+            try:
+                await self.begin(stop_at)
+                while not self.finished:
+                    await self.upload_chunk()
+            finally:
+                self.finish()
+
+    async def begin(self, stop_at: Optional[int] = None):
+        """
+        Prepare to upload the file chunk by chunk with `upload_chunk`, see
+        <tusclient.uploader.Uploader.begin>.
+        """
         self.stop_at = stop_at or self.file_size
+        self._check_cancelled()
 
         if not self.url:
             self.set_url(await self.create_url())
             self.offset = 0
-
-        while self.stop_at is None or (self.offset < self.stop_at):
-            await self.upload_chunk()
+        self._start_read_ahead()
 
     async def upload_chunk(self):
         """
         Upload chunk of file.
         """
+        self._check_cancelled()
         self._retried = 0
 
         # Ensure that we have a URL, as this is behavior we allowed previously.
@@ -143,8 +245,15 @@ class AsyncUploader(BaseUploader):
             self.set_url(await self.create_url())
             self.offset = 0
 
-        await self._do_request()
-        self.offset = int(self.request.response_headers.get("upload-offset"))
+        try:
+            await self._do_request()
+            self.offset = int(self.request.response_headers.get("upload-offset"))
+            self._record_offset()
+            self._update_digest()
+        finally:
+            if self.request is not None:
+                self.request.close()
+        self._release_acknowledged()
         if self.upload_length_deferred and self.request.stream_eof:
             self.stop_at = self.offset
 
@@ -154,49 +263,115 @@ class AsyncUploader(BaseUploader):
 
         Makes request to tus server to create a new upload url for the required file upload.
         """
-        try:
-            ssl_ctx = ssl.create_default_context()
-            if (self.client_cert is not None):
-                if self.client_cert is str:
-                    ssl_ctx.load_cert_chain(certfile=self.client_cert)
-                else:
-                    ssl_ctx.load_cert_chain(certfile=self.client_cert[0], keyfile=self.client_cert[1])
-            conn = aiohttp.TCPConnector(ssl=ssl_ctx)
-            async with aiohttp.ClientSession(connector=conn) as session:
-                headers = self.get_url_creation_headers()
-                verify_tls_cert = None if self.verify_tls_cert else False
-                async with session.post(
-                    self.client.url, headers=headers, ssl=verify_tls_cert
-                ) as resp:
-                    url = resp.headers.get("location")
-                    if url is None:
-                        msg = (
-                            "Attempt to retrieve create file url with status {}".format(
-                                resp.status
-                            )
-                        )
-                        raise TusCommunicationError(
-                            msg, resp.status, await resp.content.read()
+        urls = self._creation_urls()
+        for attempt, creation_url in enumerate(urls):
+            can_fail_over = attempt < len(urls) - 1
+            started = time.monotonic()
+            try:
+                with trace.span(
+                    self.tracer, "POST", url=creation_url, length=self.file_size
+                ) as span:
+                    with trace.phase("request"):
+                        resp = await self.async_transport.request(
+                            "POST",
+                            creation_url,
+                            self.get_url_creation_headers(),
+                            verify=self.verify_tls_cert,
+                            cert=self.client_cert,
                         )
-                    return urljoin(self.client.url, url)
-        except aiohttp.ClientError as error:
-            raise TusCommunicationError(error)
+                    span.set(status=resp.status_code, location=resp.headers.get("location"))
+            except TusCommunicationError:
+                self._creation_failed(creation_url, started)
+                if can_fail_over:
+                    continue
+                raise
+            if self._creation_failed(creation_url, started, resp) and can_fail_over:
+                continue
+            return self._parse_creation_response(creation_url, resp)
 
     async def _do_request(self):
-        self.request = AsyncTusRequest(self)
         try:
-            await self.request.perform()
-            _verify_upload(self.request)
+            await self._send_chunk()
         except TusUploadFailed as error:
-            await self._retry_or_cry(error)
+            if not self._journaled_offset_rejected(error):
+                await self._retry_or_cry(error)
+                return
+            with self._read_ahead_paused():
+                try:
+                    await self._resolve_journaled_offset()
+                except TusCommunicationError as head_error:
+                    # E.g. a 5xx response, retried like a failed chunk once reading
+                    # ahead is resumed.
+                    error = head_error
+                else:
+                    error = None
+                    if not self.url:
+                        self.set_url(await self.create_url())
+                        self.offset = 0
+            if error is not None:
+                await self._retry_or_cry(error)
+                return
+            # The offset is confirmed by the server now, so this happens at most once.
+            try:
+                await self._send_chunk()
+            except TusUploadFailed as error:
+                await self._retry_or_cry(error)
+
+    async def _get_offset_async(self) -> int:
+        """
+        Return the offset from the tus server, like `get_offset`, without blocking the
+        event loop.
+        """
+        with trace.span(self.tracer, "HEAD", url=self.url) as span:
+            with trace.phase("request"):
+                resp = await self.async_transport.request(
+                    "HEAD",
+                    self.url,
+                    self.get_headers(),
+                    verify=self.verify_tls_cert,
+                    cert=self.client_cert,
+                )
+            span.set(status=resp.status_code, offset=resp.headers.get("upload-offset"))
+        return self._offset_from_response(resp)
+
+    async def _resolve_journaled_offset(self):
+        """
+        Replace the offset taken from the journal by the one of the server, see
+        <tusclient.uploader.baseuploader.BaseUploader._resolve_journaled_offset>.
+        """
+        self.offset_from_journal = False
+        try:
+            self.offset = await self._get_offset_async()
+        except TusCommunicationError as error:
+            self._forget_stale_url(error)
+
+    async def _send_chunk(self):
+        chunk = None
+        if self._prefetcher is not None:
+            # Wait for the chunk without blocking the event loop.
+            import asyncio
+
+            chunk = await asyncio.get_running_loop().run_in_executor(
+                None, self._next_chunk
+            )
+        if self.request is not None:
+            self.request.close()
+        self.request = AsyncTusRequest(self, chunk=chunk)
+        await self.request.perform()
+        _verify_upload(self.request)
 
     async def _retry_or_cry(self, error):
+        if self.cancelled:
+            raise TusUploadCancelled("The upload was cancelled.") from error
+        self._trace_retry(error)
         if self.retries > self._retried:
+            import asyncio
+
             await asyncio.sleep(self.retry_delay)
 
             self._retried += 1
             try:
-                self.offset = self.get_offset()
+                self.offset = await self._get_offset_async()
             except TusCommunicationError as err:
                 await self._retry_or_cry(err)
             else:
@@ -0,0 +1,116 @@
+"""
+Stall detection and cancellation of requests while their data is being sent.
+
+The timeouts of the transports (see <tusclient.transport.interface.Timeouts>) catch
+connections which stop moving altogether, but not those which still move a few bytes
+now and then. With `min_rate`, an uploader aborts a request whose data is sent slower
+than that, and retries it from the offset the server acknowledged, as any other failed
+request (see `retries`):
+
+.. code:: python
+
+    # Give up on chunks sent at less than 64 KiB/s over 10 seconds, and resume them.
+    uploader = my_client.uploader('path/to/file.ext', chunk_size=8 * 1024 * 1024,
+                                  min_rate=64 * 1024, retries=5, retry_delay=1)
+
+Uploads can also be cancelled from another thread or task with
+<tusclient.uploader.baseuploader.BaseUploader.cancel>.
+"""
+from typing import Optional
+import threading
+import time
+
+from tusclient.exceptions import TusUploadCancelled, TusUploadStalled
+from tusclient.limiter import BandwidthLimiter
+
+
+class TransferMonitor:
+    """
+    Watches the body of a request while it is being sent.
+
+    Request bodies (see <tusclient.request.ThrottledBody> and
+    <tusclient.request.FileRangeBody>) take it in place of their bandwidth limiter, and
+    call `consume` before each block is handed to the transport. It throttles the body
+    with the limiter, if any, raises <tusclient.exceptions.TusUploadStalled> once less
+    than `min_rate` bytes per second were sent over the last `window` seconds, and
+    raises <tusclient.exceptions.TusUploadCancelled> once `cancelled` is set. Time spent
+    waiting for the limiter does not count against the rate.
+
+    Progress is only checked between blocks. A transport blocked on a single block is
+    stopped by its read timeout.
+
+    :Attributes:
+        - limiter (Optional[<tusclient.limiter.BandwidthLimiter>])
+        - min_rate (Optional[float]):
+            The minimum rate in bytes per second, or None to not detect stalls.
+        - window (float): The number of seconds the rate is measured over.
+        - cancelled (Optional[threading.Event])
+    :Constructor Args:
+        - limiter (Optional[<tusclient.limiter.BandwidthLimiter>])
+        - min_rate (Optional[float])
+        - window (float)
+        - cancelled (Optional[threading.Event])
+    """
+
+    def __init__(
+        self,
+        limiter: Optional[BandwidthLimiter] = None,
+        min_rate: Optional[float] = None,
+        window: float = 10.0,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        if min_rate is not None and min_rate <= 0:
+            raise ValueError("'min_rate' must be a positive number or None.")
+        if window <= 0:
+            raise ValueError("'window' must be a positive number.")
+        self.limiter = limiter
+        self.min_rate = min_rate
+        self.window = window
+        self.cancelled = cancelled
+        self._throttled = 0.0
+        self._window_start = None
+        self._window_bytes = 0
+
+    @property
+    def rate(self) -> Optional[float]:
+        """The rate of the limiter, if any."""
+        return None if self.limiter is None else self.limiter.rate
+
+    def _clock(self) -> float:
+        return time.monotonic() - self._throttled
+
+    def _check(self, count: int):
+        if self.cancelled is not None and self.cancelled.is_set():
+            raise TusUploadCancelled("The upload was cancelled.")
+        if self.min_rate is None:
+            return
+        # The blocks handed over before this one have been sent by now.
+        now = self._clock()
+        if self._window_start is None:
+            self._window_start = now
+        elif now - self._window_start >= self.window:
+            rate = self._window_bytes / (now - self._window_start)
+            if rate < self.min_rate:
+                raise TusUploadStalled(
+                    "Data was sent at {:.0f} bytes per second, below the minimum of "
+                    "{:.0f}.".format(rate, self.min_rate)
+                )
+            self._window_start = now
+            self._window_bytes = 0
+        self._window_bytes += count
+
+    def consume(self, count: int):
+        """Check the transfer, then wait until `count` bytes may be sent."""
+        self._check(count)
+        if self.limiter is not None:
+            started = time.monotonic()
+            self.limiter.consume(count)
+            self._throttled += time.monotonic() - started
+
+    async def consume_async(self, count: int):
+        """Like `consume`, without blocking the event loop."""
+        self._check(count)
+        if self.limiter is not None:
+            started = time.monotonic()
+            await self.limiter.consume_async(count)
+            self._throttled += time.monotonic() - started
@@ -0,0 +1,235 @@
+"""
+Uploads coordinated between several worker processes.
+
+Worker processes on a host may share one <tusclient.storage.sqlitestorage.SQLiteStorage>
+and be given overlapping lists of files. Before uploading a file, a worker claims it in
+the storage with a lease, which it renews in the background while the upload runs, so
+that each file is uploaded by a single worker. Files claimed by other workers are
+waited for: once they are uploaded they are skipped, and if a worker crashes, its lease
+expires and another worker claims the file and resumes the upload from its stored url.
+"""
+from typing import Dict, List, NamedTuple, Optional, TYPE_CHECKING
+import os
+import socket
+import threading
+import time
+import uuid
+
+from tusclient.exceptions import TusLeaseLost
+from tusclient.fingerprint import fingerprint, interface
+from tusclient.storage.sqlitestorage import SQLiteStorage
+
+if TYPE_CHECKING:
+    from tusclient.client import TusClient
+
+
+DEFAULT_TTL = 30.0
+
+
+def default_owner() -> str:
+    """Return a unique id for a worker, as "hostname:pid:random"."""
+    return "{}:{}:{}".format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+
+
+class Lease:
+    """
+    Claim of an upload in a shared storage, renewed in the background while held.
+
+    Use it as a context manager, which acquires the lease on entry and releases it on
+    exit, or with `acquire` and `release`.
+
+    :Attributes:
+        - key (str): The storage key of the upload.
+        - owner (str): The id of the worker holding the lease.
+        - ttl (float): The number of seconds after which the lease expires unless renewed.
+        - interval (float): The number of seconds between renewals.
+    :Constructor Args:
+        - storage (<tusclient.storage.sqlitestorage.SQLiteStorage>)
+        - key (str)
+        - owner (str)
+        - ttl (Optional[float]): Defaults to 30 seconds.
+        - interval (Optional[float]): Defaults to a third of `ttl`.
+    """
+
+    def __init__(
+        self,
+        storage: SQLiteStorage,
+        key: str,
+        owner: str,
+        ttl: float = DEFAULT_TTL,
+        interval: Optional[float] = None,
+    ):
+        if ttl <= 0:
+            raise ValueError("'ttl' must be positive.")
+        self.key = key
+        self.owner = owner
+        self.ttl = ttl
+        self.interval = interval if interval is not None else ttl / 3
+        self._storage = storage
+        self._lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def lost(self) -> bool:
+        """Whether the lease expired and was taken by another worker while held."""
+        return self._lost.is_set()
+
+    def acquire(self) -> bool:
+        """
+        Claim the upload and start renewing the lease.
+
+        :Returns: bool, False if another worker holds the lease.
+        """
+        if not self._storage.claim(self.key, self.owner, self.ttl):
+            return False
+        self._lost.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
+        return True
+
+    def release(self):
+        """Stop renewing the lease and give it up."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._storage.release(self.key, self.owner)
+
+    def __enter__(self):
+        if not self.acquire():
+            raise TusLeaseLost("The upload {} is claimed by another worker.".format(self.key))
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                renewed = self._storage.renew(self.key, self.owner, self.ttl)
+            except Exception:
+                # E.g. the database stayed locked; the lease may still be renewed in time.
+                continue
+            if not renewed:
+                self._lost.set()
+                return
+
+
+class WorkerReport(NamedTuple):
+    """
+    Outcome of the uploads of a worker.
+
+    :Attributes:
+        - uploaded (list): The paths of the files this worker uploaded.
+        - skipped (list): The paths of the files found uploaded, by this or other workers.
+        - errors (dict): The error which made the upload of each failed file fail, by path.
+    """
+
+    uploaded: List[str]
+    skipped: List[str]
+    errors: Dict[str, Exception]
+
+
+def upload_files(
+    client: "TusClient",
+    paths: List[str],
+    storage: SQLiteStorage,
+    owner: Optional[str] = None,
+    ttl: float = DEFAULT_TTL,
+    poll_interval: float = 1.0,
+    fingerprinter: Optional[interface.Fingerprint] = None,
+    **uploader_kwargs
+) -> WorkerReport:
+    """
+    Upload files in coordination with the other workers sharing the storage.
+
+    Files are uploaded one after the other, each under a <tusclient.workers.Lease>. Files
+    whose lease is held by another worker are retried every `poll_interval` seconds,
+    until they turn out to be uploaded or their lease is released or expires. The
+    function returns once every file was uploaded or failed, and each worker attempts
+    each file at most once.
+
+    If the lease on a file is lost during its upload, because the worker could not
+    renew it in time, the upload stops before its next chunk with
+    <tusclient.exceptions.TusLeaseLost>, leaving it to the new owner of the lease.
+
+    :Args:
+        - client (<tusclient.client.TusClient>)
+        - paths (list[str]): The files to upload.
+        - storage (<tusclient.storage.sqlitestorage.SQLiteStorage>):
+            The storage shared with the other workers, opened by this process.
+        - owner (Optional[str]): The unique id of the worker. Defaults to a new one.
+        - ttl (float): The lifetime of the leases in seconds. Defaults to 30.
+        - poll_interval (float): Defaults to 1 second.
+        - fingerprinter (Optional[<tusclient.fingerprint.interface.Fingerprint>])
+        - uploader_kwargs: Further arguments of the uploaders, e.g. `chunk_size`.
+    :Returns: <tusclient.workers.WorkerReport>
+    """
+    owner = owner or default_owner()
+    fingerprinter = fingerprinter or fingerprint.Fingerprint()
+    report = WorkerReport([], [], {})
+
+    keys = {}
+    for path in paths:
+        try:
+            with open(path, "rb") as stream:
+                keys[path] = fingerprinter.get_fingerprint(stream)
+        except OSError as error:
+            report.errors[path] = error
+
+    waiting = [path for path in paths if path in keys]
+    while waiting:
+        claimed_elsewhere = []
+        for path in waiting:
+            key = keys[path]
+            if storage.get_completed(key) is not None:
+                report.skipped.append(path)
+                continue
+            lease = Lease(storage, key, owner, ttl)
+            if not lease.acquire():
+                claimed_elsewhere.append(path)
+                continue
+            try:
+                if _upload(client, path, storage, lease, fingerprinter, uploader_kwargs):
+                    report.uploaded.append(path)
+                else:
+                    report.skipped.append(path)
+            except Exception as error:
+                report.errors[path] = error
+            finally:
+                lease.release()
+        waiting = claimed_elsewhere
+        if waiting:
+            time.sleep(poll_interval)
+    return report
+
+
+def _upload(client, path, storage, lease, fingerprinter, uploader_kwargs) -> bool:
+    """Upload a claimed file, and return whether anything had to be uploaded."""
+    # Created under the lease, the uploader sees the url stored by a previous owner.
+    uploader = client.uploader(
+        path,
+        store_url=True,
+        url_storage=storage,
+        fingerprinter=fingerprinter,
+        **uploader_kwargs
+    )
+    if uploader.completed:
+        uploader.close()
+        return False
+
+    # Drive the upload chunk by chunk, checking the lease in between.
+    try:
+        uploader.begin()
+        while not uploader.finished:
+            if lease.lost:
+                raise TusLeaseLost(
+                    "The lease on {} was taken by another worker.".format(path)
+                )
+            uploader.upload_chunk()
+    finally:
+        uploader.finish()
+    return True